@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do validador de entradas da lista de bloqueio.
+
+Compara o custo por entrada de url_validation.validate_url_entry (e da API em
+lote validate_entries) com a implementação anterior, que recebia os padrões
+como string a cada chamada e removia os prefixos duas vezes.
+
+Uso: python bench_validation.py [número de entradas]
+"""
+
+import random
+import re
+import sys
+import time
+
+from url_validation import validate_entries, validate_url_entry
+
+
+def legacy_is_valid_ip(ip):
+    ipv4_pattern = r'^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$'
+    ipv6_pattern = r'^(?:[0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}$|^::1$|^::$'
+    return bool(re.match(ipv4_pattern, ip)) or bool(re.match(ipv6_pattern, ip))
+
+
+def legacy_is_valid_domain(domain):
+    if domain.startswith('http://') or domain.startswith('https://'):
+        domain = domain.split('://', 1)[1]
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    domain_pattern = r'^(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$'
+    return bool(re.match(domain_pattern, domain))
+
+
+def legacy_validate_url_entry(entry):
+    entry = entry.strip()
+    if not entry or entry.startswith('#'):
+        return None
+    if legacy_is_valid_ip(entry):
+        return entry
+    if legacy_is_valid_domain(entry):
+        if entry.startswith('http://') or entry.startswith('https://'):
+            domain = entry.split('://', 1)[1]
+        else:
+            domain = entry
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        return domain
+    return None
+
+
+def make_entries(count, seed=42):
+    """Gera uma mistura parecida com uma lista de ameaças real"""
+    rng = random.Random(seed)
+    tlds = ["com", "net", "org", "com.br", "io", "info"]
+    entries = []
+    for i in range(count):
+        kind = rng.random()
+        name = f"host{i}-{rng.randrange(10**6)}"
+        if kind < 0.70:
+            entries.append(f"{name}.{rng.choice(tlds)}")
+        elif kind < 0.85:
+            entries.append(f"https://www.{name}.{rng.choice(tlds)}")
+        elif kind < 0.93:
+            entries.append(".".join(str(rng.randrange(256)) for _ in range(4)))
+        elif kind < 0.97:
+            entries.append(f"2001:db8::{rng.randrange(65536):x}")
+        else:
+            entries.append(f"inválido_{name}")
+    return entries
+
+
+def bench(label, func, entries, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(entries)
+        best = min(best, time.perf_counter() - start)
+    per_entry_ns = best / len(entries) * 1e9
+    print(f"{label:<40} {per_entry_ns:8.0f} ns/entrada  ({len(entries) / best:,.0f} entradas/s)")
+    return per_entry_ns
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    entries = make_entries(count)
+
+    print(f"Validando {count} entradas (melhor de 5 execuções)")
+    legacy = bench("legado (validate_url_entry antigo)", lambda es: [legacy_validate_url_entry(e) for e in es], entries)
+    single = bench("url_validation.validate_url_entry", lambda es: [validate_url_entry(e) for e in es], entries)
+    batch = bench("url_validation.validate_entries (lote)", validate_entries, entries)
+    print(f"Ganho: {legacy / single:.1f}x por entrada, {legacy / batch:.1f}x em lote")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Helper ``external_acl_type`` do Squid que consulta a lista de bloqueio.
+
+O Squid envia uma linha por consulta com o domínio de destino (``%DST``),
+precedida do id do canal quando o helper é configurado com ``concurrency``:
+
+    12 www.example.com
+
+e o helper responde ``12 OK`` (bloqueado: a ACL casa) ou ``12 ERR``. As
+consultas são respondidas por um ``DomainIndex`` em memória, o mesmo da API,
+com as regras do ``dstdomain``.
+
+Uma thread confere a cada ``--interval`` segundos se ``blocked_sites.txt``
+mudou (inode, mtime, tamanho); se mudou, monta um índice novo ao lado e troca
+a referência de uma vez. Alterações na lista chegam ao Squid sem
+``squid -k reconfigure``.
+
+Uso (squid.conf):
+
+    external_acl_type blocklist ttl=5 negative_ttl=5 concurrency=100 %DST \\
+        /usr/bin/python3 /usr/local/lib/squid-blocklist/blocklist_helper.py /etc/squid/blocked_sites.txt
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from typing import Optional
+from urllib.parse import unquote
+
+from domain_index import DomainIndex
+
+
+DEFAULT_BLOCKLIST = "/etc/squid/blocked_sites.txt"
+DEFAULT_INTERVAL = 1.0
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class BlocklistHelper:
+    """Índice da lista de bloqueio recarregado em segundo plano quando o arquivo muda"""
+
+    def __init__(self, path, interval=DEFAULT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.index = DomainIndex()
+        self._signature = object()
+        self._stop = threading.Event()
+        self.refresh()
+
+    def _read(self):
+        """Lê o arquivo até obter um conteúdo estável (a API pode estar reescrevendo-o)"""
+        for _ in range(5):
+            before = _signature(self.path)
+            if before is None:
+                return None, []
+            with open(self.path, "r", errors="replace") as f:
+                entries = [line.strip() for line in f]
+            if _signature(self.path) == before:
+                return before, [entry for entry in entries if entry and not entry.startswith("#")]
+            time.sleep(0.05)
+        return None, None
+
+    def refresh(self):
+        """Troca o índice se o arquivo mudou; retorna True se trocou"""
+        if _signature(self.path) == self._signature:
+            return False
+        signature, entries = self._read()
+        if entries is None:
+            return False
+        # Monta ao lado e troca a referência: consultas em andamento seguem no índice antigo
+        self.index = DomainIndex(entries)
+        self._signature = signature
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if self.refresh():
+                    print(f"blocklist_helper: {len(self.index)} entradas carregadas", file=sys.stderr, flush=True)
+            except Exception as e:
+                print(f"blocklist_helper: erro ao recarregar {self.path}: {e}", file=sys.stderr, flush=True)
+
+    def start(self):
+        threading.Thread(target=self._watch, name="blocklist-watch", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def lookup(self, host) -> Optional[str]:
+        """Entrada que bloqueia ``host`` ou ``None``"""
+        host = unquote(host).strip().rstrip(".")
+        if host.startswith("[") and host.endswith("]"):
+            host = host[1:-1]
+        if not host:
+            return None
+        return self.index.match(host)
+
+    def answer(self, line):
+        """Resposta do protocolo de helper para uma linha recebida do Squid"""
+        parts = line.split()
+        if not parts:
+            return "ERR"
+        channel = None
+        if len(parts) > 1 and parts[0].isdigit():
+            channel, parts = parts[0], parts[1:]
+        try:
+            result = "OK" if self.lookup(parts[0]) is not None else "ERR"
+        except Exception as e:
+            result = f'BH message="{e}"'
+        return f"{channel} {result}" if channel is not None else result
+
+    def serve(self, stdin=sys.stdin, stdout=sys.stdout):
+        """Responde linha a linha até o Squid fechar a entrada"""
+        for line in stdin:
+            stdout.write(self.answer(line) + "\n")
+            stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Helper external_acl_type da lista de bloqueio")
+    parser.add_argument("path", nargs="?", default=DEFAULT_BLOCKLIST)
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="segundos entre verificações do arquivo")
+    args = parser.parse_args(argv)
+
+    helper = BlocklistHelper(args.path, args.interval)
+    helper.start()
+    try:
+        helper.serve()
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+    finally:
+        helper.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Fila de escrita da lista de bloqueio com reconfiguração única por lote.
+
+Inclusões e remoções enviadas dentro de uma janela curta são aplicadas juntas:
+o arquivo é gravado uma vez e o Squid é reconfigurado uma vez para o lote
+inteiro. Se a reconfiguração falhar, as alterações do lote são desfeitas
+sobre o conteúdo atual do arquivo e as requisições que alteraram a lista
+recebem a exceção.
+
+O lote é verificado e gravado dentro de ``BlocklistStore.transaction``, que
+também serializa os outros workers. Uma mutação com ``expected_version``
+(``If-Match``) só é aplicada se a lista ainda estiver nessa versão; senão
+todas as suas URLs recebem o status ``version_mismatch``.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+from blocklist_store import BlocklistStore
+from domain_index import DomainIndex
+
+
+logger = logging.getLogger(__name__)
+
+ADD = "add"
+REMOVE = "remove"
+VERSION_MISMATCH = "version_mismatch"
+
+
+class _Mutation:
+    __slots__ = ("action", "urls", "expected_version", "future", "results", "changed")
+
+    def __init__(self, action, urls, expected_version=None):
+        self.action = action
+        self.urls = list(urls)
+        self.expected_version = expected_version
+        self.future: Future = Future()
+        self.results: List[Dict] = []
+        self.changed = False
+
+
+class BlocklistWriteQueue:
+    """Acumula mutações por ``window`` segundos e as aplica em lote"""
+
+    def __init__(self, store: BlocklistStore, reload: Callable[[], None], window: float = 0.2):
+        self.store = store
+        self.reload = reload
+        self.window = window
+        self._pending: List[_Mutation] = []
+        self._cond = threading.Condition()
+        self._worker = None
+
+    def submit(self, action, urls, expected_version=None) -> Future:
+        """Enfileira uma mutação; o Future resolve com o resultado por URL
+
+        Cada resultado traz ``version``, a versão da lista depois do lote.
+        """
+        if action not in (ADD, REMOVE):
+            raise ValueError(f"Ação inválida: {action}")
+
+        mutation = _Mutation(action, urls, expected_version)
+        with self._cond:
+            self._pending.append(mutation)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="blocklist-writer", daemon=True)
+                self._worker.start()
+            self._cond.notify()
+        return mutation.future
+
+    def add(self, urls) -> List[Dict]:
+        return self.submit(ADD, urls).result()
+
+    def remove(self, urls) -> List[Dict]:
+        return self.submit(REMOVE, urls).result()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+
+            # Janela de coalescência: tudo que chegar até aqui entra no lote
+            if self.window > 0:
+                time.sleep(self.window)
+
+            with self._cond:
+                batch, self._pending = self._pending, []
+
+            try:
+                self._flush(batch)
+            except Exception as e:
+                logger.error(f"Erro ao aplicar lote da lista de bloqueio: {str(e)}")
+                for mutation in batch:
+                    if not mutation.future.done():
+                        mutation.future.set_exception(e)
+
+    def _flush(self, batch: List[_Mutation]):
+        store = self.store
+        with store.transaction():
+            version = store.version()
+            index = store.index
+            current = set(store.urls())
+            added: List[str] = []
+            added_index = DomainIndex()
+            removed = set()
+
+            for mutation in batch:
+                expected = mutation.expected_version
+                # A versão só continua a esperada se nada antes no lote mudou a lista
+                if expected is not None and (expected != version or added or removed):
+                    mutation.results = [{"url": url, "status": VERSION_MISMATCH} for url in mutation.urls]
+                    continue
+                for url in mutation.urls:
+                    if mutation.action == ADD:
+                        result = self._apply_add(url, current, index, added, added_index, removed)
+                    else:
+                        result = self._apply_remove(url, current, added, added_index, removed)
+                    if result["status"] in ("added", "removed"):
+                        mutation.changed = True
+                    mutation.results.append(result)
+
+            if added or removed:
+                store.apply(added, removed)
+                version = store.version()
+
+        if not (added or removed):
+            self._resolve(batch, version)
+            return
+
+        logger.info(f"Aplicando lote na lista de bloqueio: {len(added)} inclusões, {len(removed)} remoções")
+        try:
+            self.reload()
+        except Exception as e:
+            logger.error(f"Falha ao recarregar Squid, desfazendo lote: {str(e)}")
+            store.revert(added, removed)
+            version = store.version()
+            for mutation in batch:
+                if mutation.changed:
+                    mutation.future.set_exception(e)
+            self._resolve([mutation for mutation in batch if not mutation.changed], version)
+            return
+
+        self._resolve(batch, version)
+
+    @staticmethod
+    def _resolve(batch: List[_Mutation], version):
+        for mutation in batch:
+            for result in mutation.results:
+                result["version"] = version
+            mutation.future.set_result(mutation.results)
+
+    @staticmethod
+    def _apply_add(url, current, index, added, added_index, removed):
+        if url in current:
+            return {"url": url, "status": "exists"}
+
+        if url in removed:
+            # Removida e incluída de novo no mesmo lote: o arquivo não muda
+            removed.discard(url)
+            current.add(url)
+            return {"url": url, "status": "added"}
+
+        conflicts = [c for c in index.conflicts(url) if c not in removed]
+        conflicts.extend(added_index.conflicts(url))
+        if conflicts:
+            return {"url": url, "status": "conflict", "conflicts": conflicts}
+
+        current.add(url)
+        added.append(url)
+        added_index.add(url)
+        return {"url": url, "status": "added"}
+
+    @staticmethod
+    def _apply_remove(url, current, added, added_index, removed):
+        if url not in current:
+            # Depois da compactação a entrada pode estar na forma ".example.com"
+            alias = url[1:] if url.startswith(".") else "." + url
+            if alias not in current:
+                return {"url": url, "status": "not_found"}
+            url = alias
+
+        current.discard(url)
+        if url in added_index:
+            added.remove(url)
+            added_index.remove(url)
+        else:
+            removed.add(url)
+        return {"url": url, "status": "removed"}
@@ -0,0 +1,195 @@
+"""Snapshot binário ordenado da lista de bloqueio, aberto com ``mmap``.
+
+Com listas de milhões de entradas, ler ``blocked_sites.txt`` e montar o
+``DomainIndex`` leva segundos a cada início da API e a memória se repete em
+cada worker do uvicorn. O snapshot é gravado ao lado do arquivo de texto
+(``blocked_sites.txt.snapshot``) e refeito só quando o texto muda; aberto com
+``mmap``, as páginas são compartilhadas entre os processos e as consultas
+fazem busca binária direto no arquivo, sem criar objetos por entrada.
+
+Formato (little-endian)::
+
+    cabeçalho   MAGIC, inode, mtime_ns e tamanho do texto, quantidade N
+    offsets     N + 1 inteiros de 64 bits, início de cada registro no bloco
+    registros   chave + b"\\0" + entrada, ordenados pela chave
+
+A chave são os rótulos de ``domain_key`` do mais externo para o mais interno
+(``a.example.com`` -> ``com.example.a``), então os pais de um domínio são
+prefixos da sua chave terminados em rótulo.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+from typing import Iterable, Iterator, Optional
+
+from domain_index import domain_key
+
+
+# Muda quando a chave muda: snapshots antigos são recompilados
+MAGIC = b"SQBLSNP2"
+_HEADER = struct.Struct("<8sQQQQ")
+_OFFSET = struct.Struct("<Q")
+
+
+def snapshot_key(entry):
+    return ".".join(domain_key(entry)).encode()
+
+
+def write_snapshot(path, entries: Iterable[str], signature):
+    """Grava o snapshot de ``entries`` para o texto com ``signature`` (inode, mtime_ns, tamanho)"""
+    # Ordenação estável: entradas com a mesma chave ficam na ordem do arquivo
+    records = sorted(((snapshot_key(entry), entry.encode()) for entry in entries), key=lambda record: record[0])
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".blocklist-snapshot.", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, *signature, len(records)))
+            offset = 0
+            offsets = bytearray()
+            for key, entry in records:
+                offsets += _OFFSET.pack(offset)
+                offset += len(key) + 1 + len(entry)
+            offsets += _OFFSET.pack(offset)
+            f.write(offsets)
+            for key, entry in records:
+                f.write(key)
+                f.write(b"\0")
+                f.write(entry)
+        # Legível pelos outros processos, como o arquivo de texto
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+class BlocklistSnapshot:
+    """Consultas na lista de bloqueio por busca binária no snapshot mapeado"""
+
+    def __init__(self, mm: mmap.mmap, signature, count):
+        self.signature = signature
+        self._mm = mm
+        self._count = count
+        start = _HEADER.size
+        self._offsets = memoryview(mm)[start:start + (count + 1) * _OFFSET.size].cast("Q")
+        self._base = start + (count + 1) * _OFFSET.size
+        self._top = {}
+
+    @classmethod
+    def open(cls, path, signature=None) -> Optional["BlocklistSnapshot"]:
+        """Abre o snapshot; ``None`` se não existir, for inválido ou de outro ``signature``"""
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < _HEADER.size:
+                    return None
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        magic, ino, mtime_ns, text_size, count = _HEADER.unpack_from(mm)
+        expected = _HEADER.size + (count + 1) * _OFFSET.size
+        if magic != MAGIC or size < expected or (signature is not None and (ino, mtime_ns, text_size) != tuple(signature)):
+            mm.close()
+            return None
+        snapshot = cls(mm, (ino, mtime_ns, text_size), count)
+        if expected + snapshot._offsets[count] != size:
+            # Arquivo truncado: o último offset aponta para o fim dos registros
+            snapshot._offsets.release()
+            mm.close()
+            return None
+        return snapshot
+
+    def __len__(self):
+        return self._count
+
+    def _key(self, i):
+        start = self._base + self._offsets[i]
+        return self._mm[start:self._mm.find(b"\0", start)]
+
+    def _entry(self, i):
+        start = self._mm.find(b"\0", self._base + self._offsets[i]) + 1
+        return self._mm[start:self._base + self._offsets[i + 1]].decode()
+
+    def _lower_bound(self, key, lo=0, hi=None):
+        mm, base, offsets, find = self._mm, self._base, self._offsets, self._mm.find
+        if hi is None:
+            hi = self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = base + offsets[mid]
+            if mm[start:find(b"\0", start)] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _level(self, prefix, lo, hi):
+        """Entradas com a chave ``prefix`` e a faixa ``[lo, hi)`` das chaves abaixo dela
+
+        Retorna a primeira entrada, a primeira com ponto inicial e a faixa.
+        """
+        i = self._lower_bound(prefix, lo, hi)
+        first = dotted = None
+        while i < hi and self._key(i) == prefix:
+            entry = self._entry(i)
+            if first is None:
+                first = entry
+            if dotted is None and entry.startswith("."):
+                dotted = entry
+            i += 1
+        deeper = prefix + b"."
+        lo = self._lower_bound(deeper, i, hi)
+        if lo >= hi or not self._key(lo).startswith(deeper):
+            return first, dotted, lo, lo
+        # "prefix/" é a menor chave depois de todas as que começam com "prefix."
+        return first, dotted, lo, self._lower_bound(prefix + b"/", lo, hi)
+
+    def entries(self, url) -> Iterator[str]:
+        """Entradas com a mesma chave de ``url`` (``example.com`` e ``.example.com``)"""
+        key = snapshot_key(url)
+        i = self._lower_bound(key)
+        while i < self._count and self._key(i) == key:
+            yield self._entry(i)
+            i += 1
+
+    def __contains__(self, entry):
+        return any(existing == entry for existing in self.entries(entry))
+
+    def lookup(self, url) -> Optional[str]:
+        """Mesma regra de ``DomainIndex.lookup`` (``dstdomain``)"""
+        found = None
+        lo, hi = 0, self._count
+        labels = domain_key(url)
+        last = len(labels) - 1
+        for depth, label in enumerate(labels):
+            if depth == 0:
+                # Poucos rótulos de topo (com, net, ...): o resultado fica guardado,
+                # mas só para os que existem no snapshot, para a consulta de
+                # rótulos quaisquer não crescer o cache
+                prefix = label.encode()
+                level = self._top.get(prefix)
+                if level is None:
+                    level = self._level(prefix, lo, hi)
+                    if level[0] is not None or level[2] < level[3]:
+                        self._top[prefix] = level
+            else:
+                prefix += b"." + label.encode()
+                level = self._level(prefix, lo, hi)
+            first, dotted, lo, hi = level
+            if depth == last:
+                if first is not None:
+                    found = first
+                break
+            # Nos domínios pais só valem as entradas com ponto inicial
+            if dotted is not None:
+                found = dotted
+            # Só as chaves abaixo deste rótulo podem ser pais mais específicos
+            if lo >= hi:
+                break
+        return found
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self._entry(i)
@@ -0,0 +1,320 @@
+"""Cache em memória do arquivo da lista de bloqueio.
+
+O arquivo é lido uma única vez e mantido como lista ordenada, conjunto e
+``DomainIndex``. A cada acesso um ``stat`` barato compara inode, mtime e
+tamanho com os da última leitura; o arquivo só é relido quando foi alterado
+por fora da API (edição manual, bind mount do Squid etc.).
+
+A leitura do texto é adiada até alguém precisar da lista inteira (listagem,
+gravação, verificação de conflitos). Consultas (``in``, ``len``, ``reader``)
+feitas antes disso usam o ``BlocklistSnapshot`` mapeado com ``mmap``, que só
+é recompilado quando o texto muda.
+
+Gravações acontecem dentro de ``transaction``: além do lock da thread, um
+``flock`` exclusivo em ``blocked_sites.txt.lock`` serializa os workers do
+uvicorn (e o ``compaction.py --write``), e o arquivo é relido ao entrar, de
+modo que a verificação e a gravação veem o mesmo conteúdo. Cada gravação
+incrementa a versão guardada em ``blocked_sites.txt.version``; alterações
+feitas fora da API também geram uma versão nova quando são percebidas.
+"""
+
+import errno
+import fcntl
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple, Union
+
+from blocklist_snapshot import BlocklistSnapshot, write_snapshot
+from domain_index import DomainIndex
+from metrics import cache_result
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = ".snapshot"
+LOCK_SUFFIX = ".lock"
+VERSION_SUFFIX = ".version"
+
+
+_UNLOADED = object()
+
+
+class BlocklistStore:
+    """Lista de bloqueio servida da memória e sincronizada com o arquivo"""
+
+    def __init__(self, path, snapshot_path=None):
+        self.path = path
+        self.snapshot_path = snapshot_path or path + SNAPSHOT_SUFFIX
+        self.lock_path = path + LOCK_SUFFIX
+        self.version_path = path + VERSION_SUFFIX
+        self._lock = threading.RLock()
+        self._lock_fd = None
+        self._lock_depth = 0
+        self._seen_version = None
+        self._urls: List[str] = []
+        self._url_set = set()
+        self._index = DomainIndex()
+        self._snapshot: Optional[Tuple[str, ...]] = ()
+        self._signature = _UNLOADED
+        self._loaded = False
+        self._compiled: Optional[BlocklistSnapshot] = None
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _read(self):
+        if self._signature is None:
+            return []
+        with open(self.path, "r") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def _load(self):
+        """Lê o texto e monta a lista, o conjunto e o índice"""
+        if self._loaded:
+            return
+        urls = self._read()
+        self._urls = urls
+        self._url_set = set(urls)
+        self._index = DomainIndex(urls)
+        self._snapshot = None
+        self._loaded = True
+
+    @property
+    def lock(self):
+        """Lock reentrante que protege leitura e escrita da lista"""
+        return self._lock
+
+    def refresh(self):
+        """Relê o arquivo se ele mudou desde a última leitura; retorna True se releu"""
+        with self._lock:
+            signature = self._stat_signature()
+            if signature == self._signature:
+                cache_result("blocklist", True)
+                return False
+            cache_result("blocklist", False)
+            self._signature = signature
+            self._loaded = False
+            self._urls, self._url_set, self._index = [], set(), DomainIndex()
+            return True
+
+    @contextmanager
+    def transaction(self):
+        """Lock da thread mais ``flock`` exclusivo entre processos; relê o arquivo ao entrar"""
+        with self._lock:
+            if self._lock_depth == 0:
+                fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                self._lock_fd = fd
+                # Outro processo pode ter gravado com o mesmo inode, mtime e tamanho
+                if self._read_version()[0] != self._seen_version:
+                    self._signature = _UNLOADED
+            self._lock_depth += 1
+            try:
+                self.refresh()
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+                    os.close(self._lock_fd)
+                    self._lock_fd = None
+
+    def _read_version(self):
+        try:
+            with open(self.version_path) as f:
+                data = json.load(f)
+            signature = data.get("signature")
+            return int(data["version"]), tuple(signature) if signature is not None else None
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0, None
+
+    def _write_version(self, version):
+        data = {"version": version, "signature": self._signature}
+        tmp_path = self.version_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.version_path)
+        self._seen_version = version
+
+    def version(self):
+        """Versão atual da lista; uma alteração feita fora da API conta como versão nova"""
+        with self._lock:
+            self.refresh()
+            version, signature = self._read_version()
+            if signature == self._signature:
+                self._seen_version = version
+                return version
+            with self.transaction():
+                version, signature = self._read_version()
+                if signature != self._signature:
+                    version += 1
+                    self._write_version(version)
+                return version
+
+    def exists(self):
+        self.refresh()
+        return self._signature is not None
+
+    def urls(self) -> Tuple[str, ...]:
+        """Retorna as entradas na ordem do arquivo (tupla compartilhada, não copiar)"""
+        with self._lock:
+            self.refresh()
+            self._load()
+            if self._snapshot is None:
+                self._snapshot = tuple(self._urls)
+            return self._snapshot
+
+    def __contains__(self, url):
+        with self._lock:
+            reader = self.reader()
+            return url in (self._url_set if reader is self._index else reader)
+
+    def __len__(self):
+        with self._lock:
+            reader = self.reader()
+            return len(self._urls) if reader is self._index else len(reader)
+
+    @property
+    def index(self) -> DomainIndex:
+        with self._lock:
+            self.refresh()
+            self._load()
+            return self._index
+
+    def compiled(self) -> Optional[BlocklistSnapshot]:
+        """Snapshot binário do texto atual, recompilado se o texto mudou
+
+        Retorna ``None`` se o arquivo não existe ou o snapshot não pôde ser
+        gravado (diretório somente leitura, por exemplo).
+        """
+        with self._lock:
+            self.refresh()
+            signature = self._signature
+            if signature is None:
+                return None
+            if self._compiled is not None and self._compiled.signature == signature:
+                cache_result("blocklist_snapshot", True)
+                return self._compiled
+            # Outro worker pode já ter compilado este texto
+            self._compiled = BlocklistSnapshot.open(self.snapshot_path, signature)
+            cache_result("blocklist_snapshot", self._compiled is not None)
+            if self._compiled is None:
+                try:
+                    write_snapshot(self.snapshot_path, self._urls if self._loaded else self._read(), signature)
+                except OSError as e:
+                    logger.warning(f"Não foi possível gravar o snapshot da lista de bloqueio: {str(e)}")
+                    return None
+                self._compiled = BlocklistSnapshot.open(self.snapshot_path, signature)
+            return self._compiled
+
+    def reader(self) -> Union[DomainIndex, BlocklistSnapshot]:
+        """Objeto com ``lookup`` para consultas: o índice se a lista já foi lida, senão o snapshot"""
+        with self._lock:
+            self.refresh()
+            if not self._loaded:
+                compiled = self.compiled()
+                if compiled is not None:
+                    return compiled
+                self._load()
+            return self._index
+
+    def conflicts(self, url, exclude=None, limit=None) -> List[str]:
+        return self.index.conflicts(url, exclude=exclude, limit=limit)
+
+    def _after_write(self):
+        self._snapshot = None
+        self._signature = self._stat_signature()
+        self._compiled = None
+
+    def apply(self, added: Iterable[str] = (), removed: Iterable[str] = ()):
+        """Aplica inclusões e remoções numa única escrita do arquivo"""
+        added = list(added)
+        with self.transaction():
+            self._load()
+            removed = {url for url in removed if url in self._url_set}
+            if not added and not removed:
+                return
+
+            if removed:
+                urls = [url for url in self._urls if url not in removed]
+            else:
+                urls = list(self._urls)
+            urls.extend(added)
+            self._write(urls)
+
+            for url in self._urls:
+                if url in removed:
+                    self._index.remove(url)
+            for url in added:
+                self._index.add(url)
+            self._urls = urls
+            self._url_set -= removed
+            self._url_set.update(added)
+
+    def replace(self, urls: Iterable[str]):
+        """Reescreve o arquivo inteiro com as entradas informadas"""
+        urls = list(urls)
+        with self.transaction():
+            self._write(urls)
+            self._urls = urls
+            self._url_set = set(urls)
+            self._index = DomainIndex(urls)
+            self._loaded = True
+
+    def revert(self, added: Iterable[str] = (), removed: Iterable[str] = ()):
+        """Desfaz um ``apply`` sobre o conteúdo atual do arquivo
+
+        Não regrava uma cópia antiga da lista: o que outros workers gravaram
+        depois do ``apply`` é preservado.
+        """
+        with self.transaction():
+            self._load()
+            self.apply([url for url in removed if url not in self._url_set], added)
+
+    def _write(self, urls: List[str]):
+        """Grava num arquivo temporário e troca com os.replace (dentro de ``transaction``)
+
+        Quando o arquivo é um bind mount de arquivo único (como no
+        docker-compose), o rename falha com EBUSY; nesse caso o conteúdo é
+        reescrito no próprio arquivo para que o Squid continue enxergando-o.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        except FileNotFoundError:
+            mode = 0o644
+
+        fd, tmp_path = tempfile.mkstemp(prefix=".blocked_sites.", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.writelines(f"{url}\n" for url in urls)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, mode)
+            try:
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                if e.errno not in (errno.EBUSY, errno.EXDEV):
+                    raise
+                with open(self.path, "w") as f:
+                    f.writelines(f"{url}\n" for url in urls)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        version = self._read_version()[0]
+        self._after_write()
+        self._write_version(version + 1)
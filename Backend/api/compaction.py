@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Compactação da lista de bloqueio no formato do ``dstdomain`` do Squid.
+
+A verificação de conflitos da API só impede que ``a.example.com`` entre
+quando ``example.com`` já existe no momento da inclusão. Listas editadas à mão
+ou montadas de fora acumulam repetições, variações de caixa e subdomínios já
+cobertos por um domínio pai, e o Squid relê tudo a cada reconfigure.
+
+``compact`` não muda o que o Squid bloqueia: no ``dstdomain`` só uma entrada
+com ponto inicial (``.example.com``) cobre o domínio e os subdomínios, então
+só são removidas as entradas repetidas e as cobertas por uma dessas. Entradas
+sem ponto continuam bloqueando só o próprio host, e ``www.`` faz parte do
+nome. As entradas são normalizadas apenas em caixa e protocolo, como o
+``DomainIndex`` as compara. A ordem da primeira ocorrência de cada entrada
+mantida é preservada.
+
+Uso: python compaction.py [blocked_sites.txt] [--write | --output ARQUIVO]
+
+Com ``--write`` a lista é gravada pelo ``BlocklistStore`` (lock e versão da
+API) e o Squid é recarregado como na API (``SQUID_BLOCKLIST_MODE``); se o
+reload falhar, o conteúdo anterior volta.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from url_validation import clean_host, is_valid_hostname, is_valid_ip
+
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED = 1000
+
+
+class VersionMismatch(Exception):
+    """A lista não está mais na versão esperada (``If-Match``)"""
+
+    def __init__(self, version):
+        super().__init__(f"versão atual: {version}")
+        self.version = version
+
+
+def normalize_entry(entry):
+    """Entrada em minúsculas e sem protocolo, ou ``None`` se inválida"""
+    entry = clean_host(entry.strip())
+    if is_valid_ip(entry):
+        return entry
+    name = entry[1:] if entry.startswith('.') else entry
+    return entry if is_valid_hostname(name) else None
+
+
+def _covering_parent(entry, kept):
+    """Entrada com ponto inicial já mantida que cobre ``entry``, ou ``None``"""
+    name = entry.lstrip('.')
+    # ".example.com" também bloqueia o próprio "example.com"
+    if not entry.startswith('.') and '.' + name in kept:
+        return '.' + name
+    position = name.find('.')
+    while position != -1:
+        parent = name[position:]
+        if parent in kept:
+            return parent
+        position = name.find('.', position + 1)
+    return None
+
+
+def _size(entries):
+    return sum(len(entry) + 1 for entry in entries)
+
+
+def compact(entries: Iterable[str], max_reported=MAX_REPORTED) -> Tuple[List[str], Dict]:
+    """Retorna ``(entradas compactadas, relatório)``
+
+    O relatório traz as contagens de entradas, bytes, comentários, repetidas,
+    cobertas (com até ``max_reported`` exemplos) e inválidas.
+    """
+    entries = list(entries)
+    normalized: Dict[str, int] = {}
+    invalid = []
+    blank = comments = duplicates = 0
+
+    for raw in entries:
+        line = raw.strip()
+        if not line:
+            blank += 1
+            continue
+        if line.startswith('#'):
+            comments += 1
+            continue
+        entry = normalize_entry(line)
+        if entry is None:
+            invalid.append(raw)
+        elif entry in normalized:
+            duplicates += 1
+        else:
+            normalized[entry] = len(normalized)
+
+    # Pais antes dos filhos (e ".example.com" antes de "example.com")
+    kept = set()
+    covered = []
+    order = lambda e: (e.lstrip('.').count('.'), not e.startswith('.'))
+    for entry in sorted(normalized, key=order):
+        parent = None if is_valid_ip(entry) else _covering_parent(entry, kept)
+        if parent is None:
+            kept.add(entry)
+        else:
+            covered.append({"entry": entry, "covered_by": parent})
+
+    result = sorted(kept, key=normalized.__getitem__)
+    bytes_before = _size(entries)
+    bytes_after = _size(result)
+    report = {
+        "entries_before": len(entries),
+        "entries_after": len(result),
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "reduction": 1 - bytes_after / bytes_before if bytes_before else 0.0,
+        "blank_lines": blank,
+        "comments": comments,
+        "duplicates": duplicates,
+        "covered": len(covered),
+        "covered_entries": covered[:max_reported],
+        "invalid": len(invalid),
+        "invalid_entries": invalid[:max_reported],
+    }
+    return result, report
+
+
+def apply_compaction(store, reload: Callable[[], None], dry_run=False, expected_version=None):
+    """Compacta a lista do ``store``; retorna (relatório, se a lista mudou, versão)
+
+    Mesmo caminho das alterações da API: ``replace`` dentro de ``transaction``
+    e depois ``reload``. Se o reload falhar, o conteúdo anterior volta, a menos
+    que outra gravação já tenha alterado a lista.
+    """
+    with store.transaction():
+        version = store.version()
+        if expected_version is not None and expected_version != version:
+            raise VersionMismatch(version)
+        previous = store.urls()
+        entries, report = compact(previous)
+        changed = entries != list(previous)
+        if dry_run or not changed:
+            return report, changed, version
+        store.replace(entries)
+        version = store.version()
+
+    logger.info(f"Lista de bloqueio compactada: {report['entries_before']} -> {report['entries_after']} entradas")
+    try:
+        reload()
+    except Exception:
+        with store.transaction():
+            if store.version() == version:
+                store.replace(previous)
+            else:
+                logger.warning("Lista de bloqueio alterada durante a compactação; o conteúdo anterior não foi restaurado")
+        raise
+    return report, changed, version
+
+
+def reload_squid():
+    """Reload da API para uso fora dela: nada no modo helper, senão ``squid -k reconfigure``"""
+    if os.getenv("SQUID_BLOCKLIST_MODE", "reconfigure") == "helper":
+        return
+    from docker_client import DEFAULT_SOCKET, DockerClient
+    from squid_control import SquidController
+
+    docker = DockerClient(os.getenv("DOCKER_SOCKET", DEFAULT_SOCKET))
+    squid = SquidController(
+        docker,
+        os.getenv("SQUID_CONTAINER", "squid"),
+        os.getenv("SQUID_PROXY_HOST", "squid"),
+        int(os.getenv("SQUID_PROXY_PORT", "3128")),
+    )
+    try:
+        asyncio.run(squid.reload())
+    finally:
+        docker.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compacta a lista de bloqueio para o dstdomain do Squid")
+    parser.add_argument("path", nargs="?", default="blocked_sites.txt")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--write", action="store_true", help="reescreve o próprio arquivo")
+    target.add_argument("--output", help="grava a lista compactada em outro arquivo ('-' para a saída padrão)")
+    args = parser.parse_args(argv)
+
+    if args.write:
+        from blocklist_store import BlocklistStore
+        try:
+            report, _, _ = apply_compaction(BlocklistStore(args.path), reload_squid)
+        except Exception as e:
+            print(f"Erro ao recarregar o Squid; lista restaurada: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    with open(args.path, "r", errors="replace") as f:
+        entries, report = compact(line.rstrip("\n") for line in f)
+
+    if args.output == "-":
+        sys.stdout.writelines(f"{entry}\n" for entry in entries)
+    elif args.output:
+        with open(args.output, "w") as f:
+            f.writelines(f"{entry}\n" for entry in entries)
+
+    print(json.dumps(report, indent=2, ensure_ascii=False), file=sys.stderr if args.output == "-" else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
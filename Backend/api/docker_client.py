@@ -0,0 +1,266 @@
+"""Cliente mínimo da Docker Engine API via socket unix.
+
+Substitui as chamadas ao CLI ``docker``: as requisições HTTP vão direto para
+``/var/run/docker.sock`` (montado pelo docker-compose) usando um pool de
+conexões persistentes, sem criar processos. Cobre o que a API usa: inspeção,
+start/stop/restart, ``top``, exec (``squid -k reconfigure``/``parse``) e logs.
+
+O caminho do socket é configurável, então um servidor HTTP falso escutando
+num socket unix local pode ser usado em testes.
+"""
+
+import http.client
+import json
+import queue
+import re
+import socket
+import struct
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional
+from urllib.parse import quote, urlencode
+
+from metrics import REGISTRY
+
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "squid_api_docker_request_duration_seconds",
+    "Duração das chamadas à Docker Engine API por endpoint e resultado",
+    ("method", "endpoint", "outcome"),
+)
+
+# Ids de container e de exec viram placeholder para não explodir os labels
+_ID_SEGMENT = re.compile(r"^/(containers|exec)/[^/]+")
+
+
+def _endpoint_label(path):
+    return _ID_SEGMENT.sub(r"/\1/{id}", path)
+
+
+class DockerError(Exception):
+    """Erro retornado pelo Docker Engine ou falha ao falar com o socket"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class ExecResult(NamedTuple):
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """``HTTPConnection`` que conecta num socket unix em vez de host:porta"""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+def demux(data: bytes, tty=False):
+    """Separa stdout e stderr do fluxo multiplexado do Docker
+
+    Sem TTY cada quadro começa com 8 bytes: tipo (1 = stdout, 2 = stderr),
+    três zeros e o tamanho em big-endian.
+    """
+    if tty:
+        return data, b""
+    out, err = [], []
+    pos = 0
+    while pos + 8 <= len(data):
+        kind, size = struct.unpack_from(">BxxxL", data, pos)
+        pos += 8
+        (err if kind == 2 else out).append(data[pos:pos + size])
+        pos += size
+    return b"".join(out), b"".join(err)
+
+
+class DockerClient:
+    """Cliente HTTP da Docker Engine API com conexões reutilizáveis"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, pool_size=4, timeout=30, api_version=None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.prefix = f"/v{api_version}" if api_version else ""
+        self._pool: "queue.LifoQueue[UnixHTTPConnection]" = queue.LifoQueue(maxsize=pool_size)
+
+    def _connection(self):
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return UnixHTTPConnection(self.socket_path, timeout=self.timeout), False
+
+    def _release(self, conn, response):
+        if response.will_close:
+            conn.close()
+            return
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    @staticmethod
+    def _set_timeout(conn, timeout):
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+
+    def _send(self, method, url, payload, headers, timeout):
+        conn, reused = self._connection()
+        self._set_timeout(conn, timeout)
+        try:
+            conn.request(method, url, body=payload, headers=headers)
+            return conn, conn.getresponse()
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            conn.close()
+            if not reused:
+                raise
+        # Conexão do pool fechada pelo daemon: tenta uma vez com uma nova
+        conn = UnixHTTPConnection(self.socket_path, timeout=timeout)
+        conn.request(method, url, body=payload, headers=headers)
+        return conn, conn.getresponse()
+
+    def request(self, method, path, params=None, body=None, timeout=None):
+        """Executa a requisição e retorna ``(status, corpo)``; erros HTTP viram ``DockerError``"""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = self._request(method, path, params, body, timeout)
+            outcome = "ok"
+            return result
+        finally:
+            REQUEST_DURATION.observe(time.perf_counter() - start, method=method,
+                                     endpoint=_endpoint_label(path), outcome=outcome)
+
+    def _request(self, method, path, params, body, timeout):
+        url = self.prefix + path
+        if params:
+            url += "?" + urlencode(params)
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+
+        conn = None
+        try:
+            conn, response = self._send(method, url, payload, headers, timeout or self.timeout)
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            if conn is not None:
+                conn.close()
+            raise DockerError(f"Falha ao acessar {self.socket_path}: {str(e)}")
+        self._set_timeout(conn, self.timeout)
+        self._release(conn, response)
+
+        if response.status >= 400:
+            try:
+                message = json.loads(data).get("message", "")
+            except ValueError:
+                message = data.decode("utf-8", errors="replace")
+            raise DockerError(message or response.reason, status=response.status)
+        return response.status, data
+
+    def _json(self, method, path, params=None, body=None):
+        _, data = self.request(method, path, params=params, body=body)
+        return json.loads(data) if data else None
+
+    # Containers
+
+    def inspect(self, container) -> Dict:
+        return self._json("GET", f"/containers/{quote(container)}/json")
+
+    def start(self, container):
+        self.request("POST", f"/containers/{quote(container)}/start")
+
+    def stop(self, container, timeout=None):
+        params = {"t": timeout} if timeout is not None else None
+        self.request("POST", f"/containers/{quote(container)}/stop", params=params,
+                     timeout=self.timeout + (timeout or 10))
+
+    def restart(self, container, timeout=None):
+        params = {"t": timeout} if timeout is not None else None
+        self.request("POST", f"/containers/{quote(container)}/restart", params=params,
+                     timeout=self.timeout + (timeout or 10))
+
+    def top(self, container) -> List[Dict[str, str]]:
+        """Processos do container como dicionários (colunas do ``ps``)"""
+        data = self._json("GET", f"/containers/{quote(container)}/top")
+        titles = data.get("Titles") or []
+        return [dict(zip(titles, row)) for row in data.get("Processes") or []]
+
+    def exec(self, container, cmd: List[str], timeout=None) -> ExecResult:
+        """Executa ``cmd`` no container e espera terminar"""
+        created = self._json("POST", f"/containers/{quote(container)}/exec", body={
+            "Cmd": cmd,
+            "AttachStdout": True,
+            "AttachStderr": True,
+            "Tty": False,
+        })
+        exec_id = created["Id"]
+        _, data = self.request("POST", f"/exec/{exec_id}/start", body={"Detach": False, "Tty": False},
+                               timeout=timeout)
+        stdout, stderr = demux(data)
+        info = self._json("GET", f"/exec/{exec_id}/json")
+        return ExecResult(
+            info.get("ExitCode") if info.get("ExitCode") is not None else -1,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+        )
+
+    def logs(self, container, tail: Optional[int] = 100, tty=False) -> str:
+        """Últimas ``tail`` linhas da saída do container (stdout e stderr)"""
+        params = {"stdout": 1, "stderr": 1, "tail": tail if tail is not None else "all"}
+        _, data = self.request("GET", f"/containers/{quote(container)}/logs", params=params)
+        stdout, stderr = demux(data, tty=tty)
+        return (stdout + stderr).decode("utf-8", errors="replace")
+
+    def stream_logs(self, container, tail: Optional[int] = 0, tty=False) -> Iterator[str]:
+        """Segue a saída do container (``follow``), gerando linha a linha
+
+        Usa uma conexão própria, fechada quando o gerador é encerrado.
+        """
+        params = {"stdout": 1, "stderr": 1, "follow": 1, "tail": tail if tail is not None else "all"}
+        conn = UnixHTTPConnection(self.socket_path, timeout=None)
+        try:
+            conn.request("GET", f"{self.prefix}/containers/{quote(container)}/logs?{urlencode(params)}")
+            response = conn.getresponse()
+            if response.status >= 400:
+                raise DockerError(response.read().decode("utf-8", errors="replace"), status=response.status)
+
+            pending = b""
+            while True:
+                if tty:
+                    chunk = response.read1(64 * 1024)
+                else:
+                    header = response.read(8)
+                    if len(header) < 8:
+                        break
+                    _, size = struct.unpack(">BxxxL", header)
+                    chunk = response.read(size)
+                if not chunk:
+                    break
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    yield line.decode("utf-8", errors="replace")
+            if pending:
+                yield pending.decode("utf-8", errors="replace")
+        except OSError as e:
+            raise DockerError(f"Falha ao acessar {self.socket_path}: {str(e)}")
+        finally:
+            conn.close()
@@ -0,0 +1,162 @@
+"""Índice de domínios em trie de rótulos invertidos.
+
+Cada entrada da lista de bloqueio é guardada como o caminho dos seus rótulos
+de trás para frente (``a.example.com`` -> ``com`` / ``example`` / ``a``).
+``example.com`` e ``.example.com`` ficam no mesmo nó; o ponto inicial só
+importa para ``match``. ``www.`` é um rótulo como outro qualquer: para o
+``dstdomain`` do Squid ``www.example.com`` e ``example.com`` são nomes
+diferentes.
+Assim, descobrir se um domínio é pai ou filho de algo já bloqueado custa uma
+descida proporcional ao número de rótulos, e não uma varredura da lista.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from url_validation import clean_host
+
+
+def domain_key(url):
+    """Retorna os rótulos do domínio em ordem invertida (sem o ponto inicial)"""
+    return clean_host(url).lstrip('.').split('.')[::-1]
+
+
+class _Node:
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.entries: List[str] = []
+
+
+class DomainIndex:
+    """Trie de domínios: uma entrada conflita com as iguais, pais e filhas"""
+
+    def __init__(self, entries: Iterable[str] = ()):
+        self._root = _Node()
+        self._size = 0
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, entry):
+        node = self._find(entry)
+        return node is not None and entry in node.entries
+
+    def _find(self, url) -> Optional[_Node]:
+        node = self._root
+        for label in domain_key(url):
+            node = node.children.get(label)
+            if node is None:
+                return None
+        return node
+
+    def add(self, entry):
+        """Adiciona uma entrada (entradas repetidas são mantidas)"""
+        node = self._root
+        for label in domain_key(entry):
+            child = node.children.get(label)
+            if child is None:
+                child = node.children[label] = _Node()
+            node = child
+        node.entries.append(entry)
+        self._size += 1
+
+    def remove(self, entry):
+        """Remove uma ocorrência da entrada; retorna False se não existir"""
+        path = [self._root]
+        labels = domain_key(entry)
+        for label in labels:
+            node = path[-1].children.get(label)
+            if node is None:
+                return False
+            path.append(node)
+
+        node = path[-1]
+        try:
+            node.entries.remove(entry)
+        except ValueError:
+            return False
+        self._size -= 1
+
+        # Poda os nós que ficaram vazios
+        for depth in range(len(labels), 0, -1):
+            node = path[depth]
+            if node.entries or node.children:
+                break
+            del path[depth - 1].children[labels[depth - 1]]
+        return True
+
+    def clear(self):
+        self._root = _Node()
+        self._size = 0
+
+    def conflicts(self, url, exclude=None, limit=None) -> List[str]:
+        """Lista as entradas que são iguais, pais ou filhas de ``url``
+
+        ``exclude`` ignora entradas idênticas à string informada e ``limit``
+        interrompe a busca após esse número de resultados.
+        """
+        found = []
+
+        def collect(entries):
+            for entry in entries:
+                if entry == exclude:
+                    continue
+                found.append(entry)
+                if limit is not None and len(found) >= limit:
+                    return True
+            return False
+
+        node = self._root
+        for label in domain_key(url):
+            node = node.children.get(label)
+            if node is None:
+                return found
+            # Pais de url (e a própria url, no último rótulo)
+            if collect(node.entries):
+                return found
+
+        # Filhos de url: toda a subárvore abaixo do último rótulo
+        stack = list(node.children.values())
+        while stack:
+            current = stack.pop()
+            if collect(current.entries):
+                return found
+            stack.extend(current.children.values())
+        return found
+
+    def lookup(self, url) -> Optional[str]:
+        """Entrada mais específica que bloqueia ``url`` pelas regras do ``dstdomain``
+
+        ``example.com`` bloqueia só o próprio domínio; ``.example.com`` bloqueia
+        também todos os subdomínios. A descida para no primeiro rótulo ausente,
+        então um domínio que não está bloqueado custa uma ou duas consultas de
+        dicionário.
+        """
+        found = None
+        node = self._root
+        labels = domain_key(url)
+        last = len(labels) - 1
+        for depth, label in enumerate(labels):
+            node = node.children.get(label)
+            if node is None:
+                break
+            if depth == last:
+                if node.entries:
+                    found = node.entries[0]
+                break
+            # Nos domínios pais só valem as entradas com ponto inicial
+            for entry in node.entries:
+                if entry.startswith('.'):
+                    found = entry
+                    break
+        return found
+
+    def match(self, host) -> Optional[str]:
+        """Entrada que bloqueia ``host`` como veio do Squid (mesma regra de ``lookup``)"""
+        return self.lookup(host)
+
+    def has_conflict(self, url, exclude=None):
+        return bool(self.conflicts(url, exclude=exclude, limit=1))
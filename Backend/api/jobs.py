@@ -0,0 +1,233 @@
+"""Operações longas executadas em segundo plano e consultadas por id.
+
+``JobManager.submit`` agenda uma corrotina no loop do servidor e devolve um
+``Job`` na hora; o cliente acompanha pelo id e pode aguardar a conclusão
+(``wait``) sem que nenhuma requisição fique bloqueada enquanto isso.
+
+Com ``path`` o estado de cada job é gravado num SQLite compartilhado a cada
+transição. Assim qualquer worker do uvicorn responde por um job agendado em
+outro: o job só roda no worker que o recebeu, e os demais leem o estado do
+banco (e, para aguardar, consultam-no de novo até o job terminar).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Intervalo entre consultas ao banco ao aguardar um job de outro worker
+POLL_INTERVAL = 0.2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at);
+"""
+
+_COLUMNS = ("id", "kind", "status", "created_at", "started_at", "finished_at", "result", "error")
+
+
+class Job:
+    __slots__ = ("id", "kind", "status", "created_at", "started_at", "finished_at",
+                 "result", "error", "task")
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = PENDING
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self):
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+    def _row(self):
+        result = json.dumps(self.result) if self.result is not None else None
+        return (self.id, self.kind, self.status, self.created_at, self.started_at,
+                self.finished_at, result, self.error)
+
+    @classmethod
+    def _from_row(cls, row):
+        job = cls.__new__(cls)
+        (job.id, job.kind, job.status, job.created_at, job.started_at,
+         job.finished_at, result, job.error) = row
+        job.result = json.loads(result) if result is not None else None
+        job.task = None
+        return job
+
+
+class JobManager:
+    """Guarda os ``max_jobs`` jobs mais recentes (em memória e, com ``path``, no SQLite)"""
+
+    def __init__(self, max_jobs=200, path=None):
+        self.max_jobs = max_jobs
+        self.path = path
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    def _connection(self):
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def _save(self, job: Job):
+        if self.path is None:
+            return
+        try:
+            with self._db_lock:
+                db = self._connection()
+                with db:
+                    db.execute(
+                        f"INSERT OR REPLACE INTO jobs ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        job._row(),
+                    )
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao gravar o job {job.id}: {str(e)}")
+
+    def _load(self, job_id) -> Optional[Job]:
+        if self.path is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._connection().execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao ler o job {job_id}: {str(e)}")
+            return None
+        return Job._from_row(row) if row else None
+
+    def _prune(self):
+        """Mantém no banco só os ``max_jobs`` mais recentes, sem apagar jobs em andamento"""
+        if self.path is None:
+            return
+        try:
+            with self._db_lock:
+                db = self._connection()
+                with db:
+                    db.execute(
+                        "DELETE FROM jobs WHERE status IN (?, ?) AND created_at < ("
+                        "SELECT created_at FROM jobs ORDER BY created_at DESC LIMIT 1 OFFSET ?)",
+                        (SUCCEEDED, FAILED, self.max_jobs - 1),
+                    )
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao remover jobs antigos: {str(e)}")
+
+    def submit(self, kind, run: Callable[[], Awaitable]) -> Job:
+        """Agenda ``run()`` no loop atual; precisa ser chamado dentro do loop"""
+        job = Job(kind)
+        self._save(job)
+        job.task = asyncio.get_running_loop().create_task(self._execute(job, run))
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.max_jobs:
+            oldest = next(iter(self._jobs.values()))
+            if not oldest.done:
+                break
+            self._jobs.popitem(last=False)
+        self._prune()
+        return job
+
+    async def _execute(self, job: Job, run):
+        job.status = RUNNING
+        job.started_at = time.time()
+        self._save(job)
+        try:
+            job.result = await run()
+            job.status = SUCCEEDED
+        except asyncio.CancelledError:
+            # Sem isso os outros workers veriam o job "running" para sempre
+            job.error = "Job cancelado"
+            job.status = FAILED
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.kind} ({job.id}) falhou: {str(e)}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            self._save(job)
+
+    def get(self, job_id) -> Optional[Job]:
+        """Job deste worker ou, se não for daqui, o estado gravado no banco"""
+        job = self._jobs.get(job_id)
+        return job if job is not None else self._load(job_id)
+
+    async def wait(self, job: Job, timeout: float):
+        """Aguarda o job terminar por até ``timeout`` segundos"""
+        if job.done or timeout <= 0:
+            return job
+        if job.task is None:
+            return await self._poll(job, timeout)
+        try:
+            await asyncio.wait_for(asyncio.shield(job.task), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    async def _poll(self, job: Job, timeout: float):
+        """Aguarda um job que roda em outro worker relendo o banco"""
+        deadline = time.monotonic() + timeout
+        while not job.done:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(POLL_INTERVAL, remaining))
+            job = self._load(job.id) or job
+        return job
+
+    def cancel_all(self):
+        for job in self._jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,311 @@
+"""Busca no histórico do access.log, incluindo os arquivos rotacionados.
+
+A rotação do Squid gera ``access.log.1``, ``access.log.2.gz`` e assim por
+diante. ``LogArchive.search`` distribui a varredura desses arquivos (e do
+``access.log`` atual) entre processos, um por arquivo ou por trecho de
+arquivo grande não comprimido, aplica em cada linha o mesmo
+``AccessLogQuery`` dos endpoints ao vivo e junta os resultados por horário
+com ``heapq.merge``.
+
+Para cada arquivo rotacionado é guardado um índice lateral pequeno (intervalo
+de horário, quantidade de linhas e clientes distintos) em ``index_dir``,
+identificado pelo inode, tamanho e mtime do arquivo. Arquivos cujo índice
+mostra que não há nada no intervalo ou no cliente pedidos são pulados sem
+serem abertos nem descomprimidos.
+"""
+
+import asyncio
+import gzip
+import heapq
+import ipaddress
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+from log_parser import parse_access_line
+from metrics import REGISTRY, cache_result
+from log_query import AccessLogQuery
+from log_reader import complete_end, seek_time
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024 * 1024
+MAX_INDEX_CLIENTS = 4096
+
+ARCHIVE_FILES = REGISTRY.counter(
+    "squid_api_log_archive_files_total",
+    "Arquivos de log considerados nas buscas do histórico, varridos ou pulados",
+    ("result",),
+)
+
+
+def _new_index():
+    return {"first_ts": None, "last_ts": None, "lines": 0, "clients": set()}
+
+
+def _merge_index(total, part):
+    """Soma o índice de um trecho ao índice do arquivo"""
+    for key, pick in (("first_ts", min), ("last_ts", max)):
+        if part[key] is not None:
+            total[key] = part[key] if total[key] is None else pick(total[key], part[key])
+    total["lines"] += part["lines"]
+    if total["clients"] is None or part["clients"] is None:
+        total["clients"] = None
+    else:
+        total["clients"] |= part["clients"]
+        if len(total["clients"]) > MAX_INDEX_CLIENTS:
+            total["clients"] = None
+
+
+def scan_file(path, start, end, query: AccessLogQuery, limit, build_index=False):
+    """Varre as linhas que começam em ``[start, end)`` de ``path``
+
+    Executado nos processos do pool. Retorna as ``limit`` últimas entradas que
+    atendem ao ``query`` como ``(horário, linha)`` e, se ``build_index``, o
+    índice do trecho. ``end=None`` lê até o fim (obrigatório para ``.gz``).
+    """
+    matched = deque(maxlen=limit)
+    index = _new_index() if build_index else None
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        position = start
+        if start > 0:
+            f.seek(start - 1)
+            position += len(f.readline()) - 1
+        for line in f:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            text = line.decode("utf-8", errors="replace").strip()
+            if not text:
+                continue
+            record = parse_access_line(text)
+            if index is not None and not record.parse_error:
+                index["lines"] += 1
+                if record.ts is not None:
+                    if index["first_ts"] is None or record.ts < index["first_ts"]:
+                        index["first_ts"] = record.ts
+                    if index["last_ts"] is None or record.ts > index["last_ts"]:
+                        index["last_ts"] = record.ts
+                clients = index["clients"]
+                if clients is not None:
+                    clients.add(record.client_ip)
+                    if len(clients) > MAX_INDEX_CLIENTS:
+                        index["clients"] = None
+            if query.matches(record):
+                matched.append((record.ts or 0.0, text))
+    return list(matched), index
+
+
+def may_match(query: AccessLogQuery, index):
+    """Indica se um arquivo com esse índice pode ter entradas para ``query``"""
+    if index["lines"] == 0:
+        return False
+    if query.since is not None and index["last_ts"] is not None and index["last_ts"] < query.since:
+        return False
+    if query.until is not None and index["first_ts"] is not None and index["first_ts"] > query.until:
+        return False
+    clients = index["clients"]
+    if query.client_ip and clients is not None:
+        if query.network is None:
+            return query.client_ip in clients
+        return any(_in_network(client, query.network) for client in clients)
+    return True
+
+
+def _in_network(client, network):
+    try:
+        return ipaddress.ip_address(client) in network
+    except ValueError:
+        return False
+
+
+class LogArchive:
+    """Arquivos ``<base_name>``, ``<base_name>.N`` e ``<base_name>.N.gz`` de ``log_dir``"""
+
+    def __init__(self, log_dir, base_name, index_dir, workers=None, chunk_size=CHUNK_SIZE):
+        self.log_dir = log_dir
+        self.base_name = base_name
+        self.index_dir = index_dir
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._pattern = re.compile(re.escape(base_name) + r"(?:\.(\d+))?(\.gz)?")
+        self._indexes: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: o servidor tem threads, e fork copiaria locks em uso
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def files(self):
+        """Arquivos existentes do mais novo para o mais antigo, com seu ``os.stat``"""
+        try:
+            names = os.listdir(self.log_dir)
+        except OSError:
+            return []
+        found = []
+        for name in names:
+            match = self._pattern.fullmatch(name)
+            if match is None:
+                continue
+            path = os.path.join(self.log_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found.append((int(match.group(1) or 0), path, st))
+        found.sort(key=lambda item: item[0])
+        return [(path, st) for _, path, st in found]
+
+    # Índices laterais
+
+    @staticmethod
+    def _signature(st):
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _index_path(self, signature):
+        return os.path.join(self.index_dir, "%d-%d-%d.json" % signature)
+
+    def _load_index(self, signature):
+        index = self._indexes.get(signature)
+        if index is not None:
+            cache_result("log_index", True)
+            return index
+        try:
+            with open(self._index_path(signature)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            cache_result("log_index", False)
+            return None
+        cache_result("log_index", True)
+        if data.get("clients") is not None:
+            data["clients"] = set(data["clients"])
+        self._indexes[signature] = data
+        return data
+
+    def _store_index(self, signature, index):
+        self._indexes[signature] = index
+        data = dict(index, clients=sorted(index["clients"]) if index["clients"] is not None else None)
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            tmp_path = self._index_path(signature) + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._index_path(signature))
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o índice de log: {str(e)}")
+
+    def _prune_indexes(self, live_signatures):
+        """Remove índices de arquivos que não existem mais"""
+        self._indexes = {sig: index for sig, index in self._indexes.items() if sig in live_signatures}
+        try:
+            names = os.listdir(self.index_dir)
+        except OSError:
+            return
+        keep = {os.path.basename(self._index_path(sig)) for sig in live_signatures}
+        for name in names:
+            if name.endswith(".json") and name not in keep:
+                try:
+                    os.remove(os.path.join(self.index_dir, name))
+                except OSError:
+                    pass
+
+    # Busca
+
+    def _ranges(self, path, st, query: AccessLogQuery):
+        """Trechos ``(início, fim)`` a varrer de um arquivo não comprimido"""
+        with open(path, "rb") as f:
+            end = complete_end(f, st.st_size)
+            start = 0
+            if query.until is not None:
+                end = seek_time(f, end, query.until, strict=True)
+            if query.since is not None:
+                start = seek_time(f, end, query.since)
+        return [(offset, min(offset + self.chunk_size, end))
+                for offset in range(start, end, self.chunk_size)]
+
+    def _plan(self, query: AccessLogQuery):
+        """Tarefas de varredura e o resumo por arquivo (varrido ou pulado)"""
+        tasks = []
+        summary = []
+        live = set()
+        for path, st in self.files():
+            name = os.path.basename(path)
+            rotated = name != self.base_name
+            signature = self._signature(st)
+            index = None
+            if rotated:
+                live.add(signature)
+                index = self._load_index(signature)
+                if index is not None and not may_match(query, index):
+                    summary.append({"file": name, "scanned": False, "lines": index["lines"]})
+                    continue
+
+            if path.endswith(".gz") or (rotated and index is None):
+                # Sem índice ainda: lê o arquivo inteiro e aproveita para indexá-lo
+                ranges = [(0, None)] if path.endswith(".gz") else [
+                    (offset, min(offset + self.chunk_size, st.st_size))
+                    for offset in range(0, st.st_size, self.chunk_size)
+                ]
+                build_index = rotated and index is None
+            else:
+                ranges = self._ranges(path, st, query)
+                build_index = False
+            tasks.append((path, signature, build_index, ranges))
+            summary.append({"file": name, "scanned": bool(ranges), "chunks": len(ranges)})
+        self._prune_indexes(live)
+        return tasks, summary
+
+    async def search(self, query: AccessLogQuery, limit):
+        """As ``limit`` entradas mais recentes que atendem ao ``query``
+
+        Retorna ``(entradas em ordem cronológica, resumo por arquivo)``.
+        """
+        tasks, summary = await asyncio.to_thread(self._plan, query)
+        for item in summary:
+            ARCHIVE_FILES.inc(result="scanned" if item["scanned"] else "skipped")
+        pool = self._pool()
+        futures = []
+        for path, signature, build_index, ranges in tasks:
+            for start, end in ranges:
+                future = pool.submit(scan_file, path, start, end, query, limit, build_index)
+                futures.append((signature, build_index, asyncio.wrap_future(future)))
+
+        results: List[list] = []
+        indexes: Dict[tuple, dict] = {}
+        for signature, build_index, future in futures:
+            try:
+                matched, index = await future
+            except BrokenProcessPool:
+                # Um worker morreu (ex.: OOM); o próximo pedido cria um pool novo
+                self.close()
+                raise
+            # Dentro de um arquivo a ordem é quase cronológica; heapq.merge exige ordenado
+            matched.sort(key=lambda item: item[0])
+            results.append(matched)
+            if build_index:
+                _merge_index(indexes.setdefault(signature, _new_index()), index)
+        for signature, index in indexes.items():
+            self._store_index(signature, index)
+
+        newest = deque(heapq.merge(*results, key=lambda item: item[0]), maxlen=limit)
+        return [parse_access_line(text) for _, text in newest], summary
@@ -0,0 +1,407 @@
+"""Leitor contínuo dos logs do Squid a partir do volume compartilhado.
+
+Uma thread acompanha o arquivo como ``tail -F``: lê apenas os bytes novos,
+reconhece rotação (o caminho passa a apontar para outro inode) e truncamento
+(o arquivo fica menor que a posição lida), e mantém as últimas entradas já
+parseadas num buffer circular. Os endpoints de log respondem desse buffer,
+sem processos nem chamadas ao Docker.
+
+Cada entrada recebe um número de sequência crescente; ``index_keys`` define
+campos cujos valores são indexados (valor -> sequências) para que filtros de
+igualdade não precisem varrer o buffer inteiro. Observadores registrados com
+``add_observer`` recebem ``add(entry)`` para cada entrada nova e
+``discard(entry)`` para cada entrada que sai do buffer.
+
+Cada entrada também guarda a posição do arquivo onde termina; o cursor
+``"<inode>:<offset>"`` identifica uma linha mesmo depois de a API reiniciar, e
+``read_after`` devolve o que veio depois dele. Listeners registrados com
+``add_listener`` são chamados (sem argumentos) a cada lote de linhas novas.
+"""
+
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import REGISTRY
+
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+PARSE_DURATION = REGISTRY.histogram(
+    "squid_api_log_parse_duration_seconds",
+    "Tempo para parsear cada lote de linhas novas de um log",
+    ("log",),
+)
+LINES_PARSED = REGISTRY.counter(
+    "squid_api_log_lines_parsed_total",
+    "Linhas de log parseadas pelo leitor contínuo",
+    ("log",),
+)
+
+
+class LogFollower:
+    """Segue um arquivo de log e guarda as últimas ``maxlen`` entradas"""
+
+    def __init__(self, path, parse: Callable[[str], Dict], maxlen=50000, interval=0.5,
+                 initial_bytes=None, index_keys: Optional[Dict[str, Callable[[Dict], Optional[str]]]] = None):
+        self.path = path
+        self.parse = parse
+        self.interval = interval
+        self.maxlen = maxlen
+        self.initial_bytes = initial_bytes if initial_bytes is not None else maxlen * 256
+        self.index_keys = index_keys or {}
+        # Buffer circular: a entrada de sequência s fica em _ring[s % maxlen]
+        self._ring: List[Optional[Dict]] = [None] * maxlen
+        self._next_seq = 0
+        self._indexes: Dict[str, Dict[str, deque]] = {field: {} for field in self.index_keys}
+        self._observers: List = []
+        self._listeners: List[Callable[[], None]] = []
+        # Posição (byte final) de cada entrada, no mesmo slot do buffer circular
+        self._offsets = array("q", bytes(8 * maxlen))
+        # Trechos contínuos do buffer: (primeira sequência, inode) a cada abertura ou truncamento
+        self._segments: deque = deque()
+        self._new_segment = True
+        self._lock = threading.Lock()
+        self._file = None
+        self._inode = None
+        self._offset = 0
+        self._partial = b""
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_observer(self, observer):
+        """Registra um objeto com ``add(entry)`` e ``discard(entry)``"""
+        with self._lock:
+            for seq in range(self._first_seq(), self._next_seq):
+                observer.add(self._ring[seq % self.maxlen])
+            self._observers.append(observer)
+
+    def add_listener(self, callback: Callable[[], None]):
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    @property
+    def available(self):
+        """Indica se o arquivo de log está acessível"""
+        return self._file is not None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name=f"log-follower:{os.path.basename(self.path)}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 4)
+        self._close()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Erro ao acompanhar {self.path}: {str(e)}")
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._inode = None
+        self._partial = b""
+
+    def _open(self, initial):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+
+        st = os.fstat(f.fileno())
+        self._file = f
+        self._inode = st.st_ino
+        self._partial = b""
+        self._offset = 0
+        self._new_segment = True
+        if initial and st.st_size > self.initial_bytes:
+            # Na primeira abertura carrega só o final do arquivo, descartando a linha cortada
+            self._offset = st.st_size - self.initial_bytes
+            f.seek(self._offset)
+            skipped = f.readline()
+            self._offset += len(skipped)
+        return True
+
+    def poll(self):
+        """Lê o que foi acrescentado ao log desde a última chamada"""
+        if self._file is None:
+            if not self._open(initial=self._next_seq == 0):
+                return
+        else:
+            # Truncamento: o arquivo encolheu abaixo da posição já lida
+            if os.fstat(self._file.fileno()).st_size < self._offset:
+                logger.info(f"{self.path} foi truncado; relendo do início")
+                self._file.seek(0)
+                self._offset = 0
+                self._partial = b""
+                self._new_segment = True
+
+        self._read_available()
+
+        # Rotação: o caminho agora é outro arquivo; o antigo já foi lido até o fim
+        try:
+            current_inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return
+        if current_inode != self._inode:
+            logger.info(f"{self.path} foi rotacionado; seguindo o novo arquivo")
+            self._flush_partial()
+            self._close()
+            if self._open(initial=False):
+                self._read_available()
+
+    def _read_available(self):
+        while True:
+            chunk = self._file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            start = self._offset - len(self._partial)
+            self._offset += len(chunk)
+            data = self._partial + chunk
+            lines = data.split(b"\n")
+            self._partial = lines.pop()
+            self._append_lines(lines, start)
+
+    def _flush_partial(self):
+        if self._partial:
+            self._append_lines([self._partial], self._offset - len(self._partial), newline=False)
+            self._partial = b""
+
+    def _append_lines(self, lines, start, newline=True):
+        parsed = []
+        end = start
+        began = time.perf_counter()
+        for raw in lines:
+            end += len(raw) + newline
+            line = raw.decode("utf-8", errors="replace").rstrip("\r")
+            if line.strip():
+                parsed.append((self.parse(line), end))
+        if not parsed:
+            return
+        name = os.path.basename(self.path)
+        PARSE_DURATION.observe(time.perf_counter() - began, log=name)
+        LINES_PARSED.inc(len(parsed), log=name)
+        with self._lock:
+            if self._new_segment:
+                self._segments.append((self._next_seq, self._inode))
+                self._new_segment = False
+            for entry, offset in parsed:
+                self._append(entry, offset)
+            while len(self._segments) > 1 and self._segments[1][0] <= self._first_seq():
+                self._segments.popleft()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Erro ao notificar leitor de {self.path}: {str(e)}")
+
+    def _append(self, entry, offset=0):
+        seq = self._next_seq
+        slot = seq % self.maxlen
+        evicted = self._ring[slot]
+        if evicted is not None:
+            self._unindex(evicted, seq - self.maxlen)
+            for observer in self._observers:
+                observer.discard(evicted)
+        self._ring[slot] = entry
+        self._offsets[slot] = offset
+        self._next_seq = seq + 1
+        for observer in self._observers:
+            observer.add(entry)
+
+        for field, key in self.index_keys.items():
+            value = key(entry)
+            if value is not None:
+                self._indexes[field].setdefault(value, deque()).append(seq)
+
+    def _unindex(self, entry, seq):
+        for field, key in self.index_keys.items():
+            value = key(entry)
+            if value is None:
+                continue
+            seqs = self._indexes[field].get(value)
+            if seqs and seqs[0] == seq:
+                seqs.popleft()
+                if not seqs:
+                    del self._indexes[field][value]
+
+    def _first_seq(self):
+        return max(0, self._next_seq - self.maxlen)
+
+    def __len__(self):
+        return self._next_seq - self._first_seq()
+
+    @property
+    def next_seq(self):
+        """Sequência que a próxima entrada receberá"""
+        return self._next_seq
+
+    def position(self, lines=0):
+        """Sequência a partir da qual ler para obter as últimas ``lines`` entradas"""
+        with self._lock:
+            return max(self._first_seq(), self._next_seq - max(lines, 0))
+
+    def time_range(self):
+        """Timestamps (``ts``) da entrada mais antiga e da mais nova no buffer"""
+        with self._lock:
+            if self._next_seq == 0:
+                return None, None
+            oldest = self._ring[self._first_seq() % self.maxlen]
+            newest = self._ring[(self._next_seq - 1) % self.maxlen]
+            return getattr(oldest, "ts", None), getattr(newest, "ts", None)
+
+    def _cursor(self, seq):
+        """Cursor ``"<inode>:<offset>"`` da entrada ``seq`` (com o lock adquirido)"""
+        starts = [first for first, _ in self._segments]
+        inode = self._segments[bisect_right(starts, seq) - 1][1]
+        return f"{inode}:{self._offsets[seq % self.maxlen]}"
+
+    def cursor(self):
+        """Cursor da entrada mais recente (ou ``None`` se o buffer estiver vazio)"""
+        with self._lock:
+            if self._next_seq == 0:
+                return None
+            return self._cursor(self._next_seq - 1)
+
+    def _seq_after(self, cursor):
+        """Primeira sequência depois do cursor e quantas entradas se perderam"""
+        first = self._first_seq()
+        try:
+            inode, offset = (int(part) for part in cursor.split(":", 1))
+        except (AttributeError, ValueError):
+            raise ValueError(f"Cursor inválido: {cursor!r}")
+
+        segments = list(self._segments)
+        for i in range(len(segments) - 1, -1, -1):
+            seg_first, seg_inode = segments[i]
+            if seg_inode != inode:
+                continue
+            lo = max(seg_first, first)
+            hi = segments[i + 1][0] if i + 1 < len(segments) else self._next_seq
+            if lo >= hi:
+                continue
+            if self._offsets[lo % self.maxlen] > offset:
+                # O cursor aponta para entradas que já saíram do buffer
+                return lo, None
+            # Busca binária pela primeira entrada que termina depois do offset
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._offsets[mid % self.maxlen] <= offset:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return lo, 0
+        # Cursor fora do buffer (muito antigo ou de um arquivo já rotacionado)
+        return first, None
+
+    def read_after(self, cursor: Optional[str], limit, matches: Optional[Callable] = None):
+        """Entradas depois de ``cursor`` (ou ``seq`` inteiro), até ``limit``
+
+        Retorna ``(entradas, próxima sequência, cursor da última entrada lida,
+        perdidas)``, onde entradas são pares ``(cursor, entrada)`` aceitos por
+        ``matches``. ``perdidas`` é o número de entradas que saíram do buffer
+        antes de serem lidas, ou ``None`` se o cursor não estiver mais nele.
+        Lança ``ValueError`` para cursor malformado.
+        """
+        with self._lock:
+            first = self._first_seq()
+            if isinstance(cursor, int):
+                start, dropped = max(cursor, first), max(0, first - cursor)
+            elif cursor:
+                start, dropped = self._seq_after(cursor)
+            else:
+                start, dropped = first, 0
+
+            found = []
+            seq = start
+            end = min(self._next_seq, start + limit) if matches is None else self._next_seq
+            while seq < end and len(found) < limit:
+                entry = self._ring[seq % self.maxlen]
+                if matches is None or matches(entry):
+                    found.append((self._cursor(seq), entry))
+                seq += 1
+            if seq > first:
+                last_cursor = self._cursor(seq - 1)
+            else:
+                last_cursor = cursor if isinstance(cursor, str) else None
+            return found, seq, last_cursor, dropped
+
+    def _latest_cursor(self):
+        return self._cursor(self._next_seq - 1) if self._next_seq else None
+
+    def tail(self, lines, with_cursor=False):
+        """Retorna as últimas ``lines`` entradas, da mais antiga para a mais nova
+
+        Com ``with_cursor`` retorna ``(entradas, cursor)``, sendo o cursor o da
+        entrada mais recente do buffer no mesmo instante.
+        """
+        with self._lock:
+            start = max(self._first_seq(), self._next_seq - max(lines, 0))
+            entries = [self._ring[seq % self.maxlen] for seq in range(start, self._next_seq)]
+            if with_cursor:
+                return entries, self._latest_cursor()
+            return entries
+
+    def search(self, matches: Callable[[Dict], bool], limit,
+               lookups: Iterable[Tuple[str, str]] = (), with_cursor=False):
+        """Retorna as ``limit`` entradas mais recentes aceitas por ``matches``
+
+        ``lookups`` são pares (campo, valor) de igualdade que toda entrada
+        aceita precisa satisfazer; o menor conjunto indexado entre eles limita
+        as entradas examinadas. ``with_cursor`` funciona como em ``tail``.
+        """
+        with self._lock:
+            latest = self._latest_cursor()
+            found = self._search(matches, limit, lookups)
+        return (found, latest) if with_cursor else found
+
+    def _search(self, matches, limit, lookups):
+        """Busca do ``search``; chamada com o lock adquirido"""
+        if limit <= 0:
+            return []
+        first = self._first_seq()
+        candidates = None
+        for field, value in lookups:
+            if field not in self._indexes:
+                continue
+            seqs = self._indexes[field].get(value, ())
+            if candidates is None or len(seqs) < len(candidates):
+                candidates = seqs
+        if candidates is None:
+            candidates = range(first, self._next_seq)
+
+        found = []
+        for seq in reversed(candidates):
+            if seq < first:
+                break
+            entry = self._ring[seq % self.maxlen]
+            if matches(entry):
+                found.append(entry)
+                if len(found) >= limit:
+                    break
+        found.reverse()
+        return found
@@ -0,0 +1,210 @@
+"""Parsers das linhas de access.log e cache.log do Squid."""
+
+import re
+from datetime import datetime, timezone
+from sys import intern
+
+
+def parse_time(value):
+    """Aceita epoch em segundos ou data ISO 8601 (UTC se não houver fuso)"""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _is_epoch(token):
+    """Formato nativo do Squid começa com o epoch em segundos.milissegundos"""
+    seconds, _, millis = token.partition('.')
+    return seconds.isdigit() and (not millis or millis.isdigit())
+
+
+def line_time(line):
+    """Horário (epoch) do início de uma linha de access.log ou cache.log, ou ``None``"""
+    parts = line.split(None, 2)
+    if not parts:
+        return None
+    if _is_epoch(parts[0]):
+        return float(parts[0])
+    if len(parts) < 2:
+        return None
+    try:
+        return parse_time(f"{parts[0]} {parts[1].split('|', 1)[0]}".replace('/', '-'))
+    except ValueError:
+        return None
+
+
+def _int_or_text(token):
+    return int(token) if token.isdigit() else intern(token)
+
+
+class AccessLogRecord:
+    """Entrada parseada do access.log em formato compacto
+
+    Duração e bytes ficam como inteiros, o horário como epoch em float e os
+    campos muito repetidos (IP, código, método, hierarquia, tipo) são
+    internados. A linha original não é guardada: ``raw_line`` a reconstrói
+    sob demanda (idêntica no formato nativo do Squid) e ``to_dict`` gera o
+    formato JSON da API só na serialização.
+    """
+
+    __slots__ = ("ts", "_timestamp", "duration", "client_ip", "result_code", "bytes",
+                 "method", "url", "user", "hierarchy_code", "content_type")
+
+    parse_error = None
+
+    def __init__(self, ts, timestamp, duration, client_ip, result_code, bytes,
+                 method, url, user, hierarchy_code, content_type):
+        self.ts = ts
+        self._timestamp = timestamp
+        self.duration = duration
+        self.client_ip = client_ip
+        self.result_code = result_code
+        self.bytes = bytes
+        self.method = method
+        self.url = url
+        self.user = user
+        self.hierarchy_code = hierarchy_code
+        self.content_type = content_type
+
+    @property
+    def timestamp(self):
+        if self._timestamp is not None:
+            return self._timestamp
+        return f"{self.ts:.3f}"
+
+    @property
+    def raw_line(self):
+        trailing = [self.user, self.hierarchy_code, self.content_type]
+        while trailing and not trailing[-1]:
+            trailing.pop()
+        if self._timestamp is None:
+            head = f"{self.timestamp} {self.duration:>6} {self.client_ip}"
+        else:
+            head = f"{self._timestamp} {self.duration} {self.client_ip}"
+        return " ".join([head, self.result_code, str(self.bytes), self.method, self.url, *trailing])
+
+    def to_dict(self, include_raw=True):
+        entry = {
+            "timestamp": self.timestamp,
+            "duration": str(self.duration),
+            "client_ip": self.client_ip,
+            "result_code": self.result_code,
+            "bytes": str(self.bytes),
+            "method": self.method,
+            "url": self.url,
+            "user": self.user,
+            "hierarchy_code": self.hierarchy_code,
+            "content_type": self.content_type,
+        }
+        if include_raw:
+            entry["raw_line"] = self.raw_line
+        return entry
+
+
+class UnparsedLine:
+    """Linha que não pôde ser parseada; guarda o texto original"""
+
+    __slots__ = ("raw_line", "parse_error")
+
+    ts = None
+
+    def __init__(self, raw_line, parse_error):
+        self.raw_line = raw_line
+        self.parse_error = parse_error
+
+    def to_dict(self, include_raw=True):
+        return {"raw_line": self.raw_line, "parse_error": self.parse_error}
+
+
+def parse_access_line(line):
+    """Converte uma linha do access.log em ``AccessLogRecord``
+
+    Aceita o formato nativo do Squid (``epoch duração ip código/status bytes
+    método url usuário hierarquia/destino tipo``) e o formato com data e hora
+    em dois campos.
+    """
+    try:
+        parts = line.split()
+        if len(parts) < 7:
+            return UnparsedLine(line, "Formato inválido")
+
+        if _is_epoch(parts[0]):
+            ts = float(parts[0])
+            # Só guarda o texto se ele não puder ser regenerado a partir do float
+            timestamp = None if f"{ts:.3f}" == parts[0] else parts[0]
+            fields = parts[1:]
+        else:
+            timestamp = f"{parts[0]} {parts[1]}"
+            try:
+                ts = parse_time(timestamp.replace('/', '-'))
+            except ValueError:
+                ts = None
+            fields = parts[2:]
+
+        fields += [""] * (9 - len(fields))
+        return AccessLogRecord(
+            ts,
+            timestamp,
+            _int_or_text(fields[0]),
+            intern(fields[1]),
+            intern(fields[2]),
+            _int_or_text(fields[3]),
+            intern(fields[4]),
+            fields[5],
+            intern(fields[6]),
+            intern(fields[7]),
+            intern(fields[8]),
+        )
+    except Exception as e:
+        return UnparsedLine(line, str(e))
+
+
+# "2025/01/01 10:00:01 kid1| ERROR: ..." e "2025/01/01 10:00:01.123 kid1| 5,3| comm.cc(...) ..."
+_CACHE_PROCESS = re.compile(r"\s+(?:kid|squid-coord-|squid-disk-)?\d+$")
+_CACHE_DEBUG = re.compile(r"^\d+,\d+\|\s*")
+_CACHE_LEVEL = re.compile(r"^(FATAL|ERROR|WARNING|SECURITY ALERT|SECURITY NOTICE|BUG \d+|NOTICE):\s*")
+
+
+def parse_cache_line(line):
+    """Converte uma linha do cache.log no dicionário retornado pela API
+
+    As linhas do Squid trazem o processo antes do ``|`` (``kid1|``) e o nível
+    como prefixo da mensagem (``ERROR:``, ``WARNING:``); sem prefixo o nível é
+    ``INFO``.
+    """
+    try:
+        if '|' in line:
+            head, message = line.split('|', 1)
+            message = _CACHE_DEBUG.sub("", message.strip())
+            match = _CACHE_LEVEL.match(message)
+            if match:
+                level = match.group(1)
+                message = message[match.end():]
+            elif '|' in message and message.split('|', 1)[0].strip().isalpha():
+                # Formato "data | NÍVEL | mensagem"
+                level, message = (part.strip() for part in message.split('|', 1))
+            else:
+                level = "INFO"
+            return {
+                "timestamp": _CACHE_PROCESS.sub("", head.strip()),
+                "level": level,
+                "message": message,
+                "raw_line": line
+            }
+
+        parts = line.split()
+        if len(parts) >= 2:
+            return {
+                "timestamp": f"{parts[0]} {parts[1]}",
+                "level": parts[2] if len(parts) > 2 else "INFO",
+                "message": " ".join(parts[3:]) if len(parts) > 3 else "",
+                "raw_line": line
+            }
+        return {"raw_line": line, "parse_error": "Formato inválido"}
+    except Exception as e:
+        return {"raw_line": line, "parse_error": str(e)}
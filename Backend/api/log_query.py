@@ -0,0 +1,171 @@
+"""Filtros estruturados sobre entradas já parseadas do access.log.
+
+Cada filtro olha apenas o campo a que se refere (IP do cliente, código de
+resultado, método, host da URL etc.), em vez de procurar a substring em
+qualquer lugar da linha como o ``grep`` fazia. Os filtros de igualdade mais
+comuns também são usados como índice pelo ``LogFollower``.
+"""
+
+import ipaddress
+
+from log_parser import parse_time
+
+
+def url_host(url):
+    """Extrai o host (sem porta, em minúsculas) de uma URL do access.log"""
+    if not url:
+        return ""
+    if "://" in url:
+        url = url.split("://", 1)[1]
+    host = url.split("/", 1)[0]
+    if host.startswith("["):
+        return host[1:host.find("]")].lower() if "]" in host else host.lower()
+    return host.rsplit(":", 1)[0].lower() if host.count(":") == 1 else host.lower()
+
+
+def result_status(result_code):
+    """Retorna o status HTTP de um código como ``TCP_MISS/200``"""
+    return result_code.rpartition("/")[2]
+
+
+def _to_number(value):
+    if isinstance(value, int):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Campos indexados pelo LogFollower do access.log
+ACCESS_INDEX_KEYS = {
+    "client_ip": lambda entry: None if entry.parse_error else entry.client_ip,
+    "method": lambda entry: None if entry.parse_error else entry.method,
+    "status": lambda entry: None if entry.parse_error else result_status(entry.result_code),
+}
+
+
+class AccessLogQuery:
+    """Conjunto de filtros por campo avaliados em Python sobre as entradas
+
+    Lança ``ValueError`` quando algum valor (CIDR, data) é inválido.
+    """
+
+    def __init__(self, client_ip=None, result_code=None, method=None, host=None,
+                 url_prefix=None, url_contains=None, since=None, until=None,
+                 min_bytes=None, max_bytes=None, min_duration=None, max_duration=None):
+        self.client_ip = client_ip
+        self.network = None
+        if client_ip and "/" in client_ip:
+            self.network = ipaddress.ip_network(client_ip, strict=False)
+        elif client_ip:
+            ipaddress.ip_address(client_ip)
+
+        self.result_code = result_code
+        self.method = method.upper() if method else None
+        self.host = host.lower().lstrip(".") if host else None
+        self.url_prefix = url_prefix
+        self.url_contains = url_contains
+        self.since = parse_time(since) if isinstance(since, str) else since
+        self.until = parse_time(until) if isinstance(until, str) else until
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+
+    def index_lookups(self):
+        """Pares (campo, valor) de igualdade que podem ser respondidos pelo índice"""
+        lookups = []
+        if self.client_ip and self.network is None:
+            lookups.append(("client_ip", self.client_ip))
+        if self.method:
+            lookups.append(("method", self.method))
+        if self.result_code and self.result_code.isdigit():
+            lookups.append(("status", self.result_code))
+        return lookups
+
+    def _match_result_code(self, result_code):
+        if self.result_code == result_code:
+            return True
+        code, _, status = result_code.partition("/")
+        return self.result_code in (code, status)
+
+    def _match_host(self, url):
+        host = url_host(url)
+        return host == self.host or host.endswith("." + self.host)
+
+    def matches(self, entry):
+        if entry.parse_error:
+            return False
+
+        if self.client_ip:
+            if self.network is None:
+                if entry.client_ip != self.client_ip:
+                    return False
+            else:
+                try:
+                    if ipaddress.ip_address(entry.client_ip) not in self.network:
+                        return False
+                except ValueError:
+                    return False
+
+        if self.result_code and not self._match_result_code(entry.result_code):
+            return False
+        if self.method and entry.method.upper() != self.method:
+            return False
+        if self.host and not self._match_host(entry.url):
+            return False
+        if self.url_prefix and not entry.url.startswith(self.url_prefix):
+            return False
+        if self.url_contains and self.url_contains not in entry.url:
+            return False
+
+        if self.since is not None or self.until is not None:
+            epoch = entry.ts
+            if epoch is None:
+                return False
+            if self.since is not None and epoch < self.since:
+                return False
+            if self.until is not None and epoch > self.until:
+                return False
+
+        if self.min_bytes is not None or self.max_bytes is not None:
+            size = _to_number(entry.bytes)
+            if size is None:
+                return False
+            if self.min_bytes is not None and size < self.min_bytes:
+                return False
+            if self.max_bytes is not None and size > self.max_bytes:
+                return False
+
+        if self.min_duration is not None or self.max_duration is not None:
+            duration = _to_number(entry.duration)
+            if duration is None:
+                return False
+            if self.min_duration is not None and duration < self.min_duration:
+                return False
+            if self.max_duration is not None and duration > self.max_duration:
+                return False
+
+        return True
+
+    def applied(self):
+        """Filtros informados, no formato de ``filters_applied``"""
+        return {
+            "ip": self.client_ip,
+            "url": self.url_contains,
+            **{
+                name: value for name, value in (
+                    ("result_code", self.result_code),
+                    ("method", self.method),
+                    ("host", self.host),
+                    ("url_prefix", self.url_prefix),
+                    ("since", self.since),
+                    ("until", self.until),
+                    ("min_bytes", self.min_bytes),
+                    ("max_bytes", self.max_bytes),
+                    ("min_duration", self.min_duration),
+                    ("max_duration", self.max_duration),
+                ) if value is not None
+            }
+        }
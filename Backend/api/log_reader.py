@@ -0,0 +1,142 @@
+"""Leitura direta dos arquivos de log para consultas além do buffer em memória.
+
+``iter_reverse`` percorre o arquivo de trás para frente em blocos grandes e
+gera as linhas sob demanda, então pedir as linhas mais antigas de um arquivo
+de vários GB não carrega nada além do bloco atual. ``seek_time`` faz busca
+binária pelo horário (as linhas do Squid são gravadas em ordem de tempo) para
+posicionar consultas ``since``/``until`` sem varrer o arquivo.
+
+``read_page`` junta as duas coisas: percorre o arquivo da linha mais nova para
+a mais antiga, devolve no máximo uma página de entradas e um token ``"<inode>:<offset>"`` para
+buscar a página seguinte (mais antiga).
+"""
+
+import os
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+
+from log_parser import line_time
+
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+class PageExpired(Exception):
+    """O token de página aponta para um arquivo que já foi rotacionado"""
+
+
+def iter_reverse(f: BinaryIO, end, block_size=READ_BLOCK_SIZE) -> Iterator[Tuple[int, bytes]]:
+    """Gera ``(início, linha)`` das linhas que terminam até ``end``, da última para a primeira"""
+    pos = end
+    head = b""
+    while pos > 0:
+        size = min(block_size, pos)
+        pos -= size
+        f.seek(pos)
+        block = f.read(size) + head
+        lines = block.split(b"\n")
+        # A primeira parte pode ser o fim de uma linha que começa no bloco anterior
+        head = lines[0]
+        offset = pos + len(block)
+        for line in reversed(lines[1:]):
+            offset -= len(line)
+            yield offset, line
+            offset -= 1
+    if head:
+        yield 0, head
+
+
+def next_line_start(f: BinaryIO, pos):
+    """Início da primeira linha que começa em ``pos`` ou depois"""
+    if pos <= 0:
+        return 0
+    f.seek(pos - 1)
+    f.readline()
+    return f.tell()
+
+
+def complete_end(f: BinaryIO, size):
+    """Fim da última linha completa (ignora uma linha ainda sendo escrita)"""
+    if size == 0:
+        return 0
+    f.seek(size - 1)
+    if f.read(1) == b"\n":
+        return size
+    for start, _ in iter_reverse(f, size):
+        return start
+    return 0
+
+
+def _time_at(f: BinaryIO, start, size, get_time: Callable[[str], Optional[float]]):
+    """Horário da primeira linha com horário legível a partir de ``start``"""
+    f.seek(start)
+    while start < size:
+        line = f.readline()
+        if not line:
+            break
+        start += len(line)
+        ts = get_time(line.decode("utf-8", errors="replace"))
+        if ts is not None:
+            return ts
+    return None
+
+
+def seek_time(f: BinaryIO, size, target, strict=False,
+              get_time: Callable[[str], Optional[float]] = line_time):
+    """Início da primeira linha com horário ``>= target`` (``> target`` se ``strict``)
+
+    Retorna ``size`` se nenhuma linha atender. Faz O(log n) leituras de linha.
+    """
+    lo, hi = 0, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = next_line_start(f, mid)
+        ts = _time_at(f, start, size, get_time) if start < size else None
+        if ts is None or ts > target or (ts == target and not strict):
+            hi = mid
+        else:
+            lo = mid + 1
+    return next_line_start(f, lo)
+
+
+def read_page(path, parse: Callable[[str], object], limit, page: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None,
+              matches: Optional[Callable[[object], bool]] = None):
+    """Lê uma página de entradas de ``path`` de trás para frente
+
+    Sem ``page`` começa pela linha mais recente (ou pela última até ``until``);
+    com ``page`` continua antes do offset indicado. Para na primeira linha
+    anterior a ``since``. Retorna ``(entradas, próxima página)`` com as
+    entradas em ordem cronológica; a próxima página é ``None`` no fim.
+    """
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if page is not None:
+            inode, _, offset = page.partition(":")
+            if int(inode) != st.st_ino:
+                raise PageExpired(page)
+            end = min(int(offset), st.st_size)
+        else:
+            end = complete_end(f, st.st_size)
+            if until is not None:
+                end = seek_time(f, end, until, strict=True)
+        lower = seek_time(f, end, since) if since is not None else 0
+
+        entries = []
+        next_offset = None
+        for start, line in iter_reverse(f, end):
+            if start < lower:
+                break
+            text = line.decode("utf-8", errors="replace").strip()
+            if not text:
+                continue
+            entry = parse(text)
+            if matches is not None and not matches(entry):
+                continue
+            entries.append(entry)
+            if len(entries) >= limit:
+                next_offset = start
+                break
+
+    entries.reverse()
+    next_page = f"{st.st_ino}:{next_offset}" if next_offset is not None and next_offset > lower else None
+    return entries, next_page
@@ -0,0 +1,85 @@
+"""Estatísticas agregadas do access.log mantidas incrementalmente.
+
+``AccessLogStats`` é registrado como observador do ``LogFollower``: cada
+entrada que entra no buffer é somada e cada entrada descartada pelo buffer
+circular é subtraída, então o resumo da janela inteira sai pronto, sem
+percorrer as entradas a cada requisição.
+"""
+
+import threading
+from collections import Counter
+
+from log_query import result_status
+
+
+class AccessLogStats:
+    """Contadores de requisições, clientes, URLs, status, bytes e duração"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total_requests = 0
+        self.unparsed = 0
+        self.total_bytes = 0
+        self.total_duration = 0
+        self.timed_requests = 0
+        self.clients = Counter()
+        self.urls = Counter()
+        self.statuses = Counter()
+        self.result_codes = Counter()
+
+    @classmethod
+    def from_records(cls, records):
+        stats = cls()
+        for record in records:
+            stats.add(record)
+        return stats
+
+    def _update(self, record, sign):
+        if record.parse_error:
+            self.unparsed += sign
+            return
+
+        self.total_requests += sign
+        if isinstance(record.bytes, int):
+            self.total_bytes += sign * record.bytes
+        if isinstance(record.duration, int):
+            self.total_duration += sign * record.duration
+            self.timed_requests += sign
+
+        for counter, key in (
+            (self.clients, record.client_ip),
+            (self.urls, record.url),
+            (self.statuses, result_status(record.result_code)),
+            (self.result_codes, record.result_code.partition("/")[0]),
+        ):
+            counter[key] += sign
+            if counter[key] <= 0:
+                del counter[key]
+
+    def add(self, record):
+        with self._lock:
+            self._update(record, 1)
+
+    def discard(self, record):
+        with self._lock:
+            self._update(record, -1)
+
+    def snapshot(self):
+        """Resumo no formato retornado pela API"""
+        with self._lock:
+            error_count = sum(
+                count for status, count in self.statuses.items()
+                if status[:1] in ("4", "5")
+            )
+            return {
+                "total_requests": self.total_requests,
+                "unparsed_lines": self.unparsed,
+                "unique_ips": len(self.clients),
+                "unique_urls": len(self.urls),
+                "total_bytes": self.total_bytes,
+                "avg_duration_ms": self.total_duration / self.timed_requests if self.timed_requests else 0,
+                "success_count": self.statuses.get("200", 0),
+                "error_count": error_count,
+                "status_codes": dict(self.statuses),
+                "result_codes": dict(self.result_codes),
+            }
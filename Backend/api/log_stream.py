@@ -0,0 +1,90 @@
+"""Transmissão das linhas novas dos logs via Server-Sent Events.
+
+Cada cliente lê o buffer do ``LogFollower`` no próprio ritmo a partir de uma
+posição: nada é enfileirado por cliente. Quando não há mais o que ler, o
+gerador dorme até o follower avisar que chegaram linhas novas. Se o cliente
+for lento, o envio (e com ele a leitura) espera a conexão escoar; se o buffer
+circular passar à frente dele, o cliente recebe um evento ``gap`` com quantas
+entradas perdeu.
+
+O ``id`` de cada evento é o cursor ``"<inode>:<offset>"`` da entrada; o
+navegador o reenvia em ``Last-Event-ID`` ao reconectar e a transmissão
+continua logo depois dele.
+"""
+
+import asyncio
+import json
+import re
+from typing import AsyncIterator, Callable, Optional, Union
+
+from log_follower import LogFollower
+
+
+CURSOR_RE = re.compile(r"\d+:\d+")
+
+STREAM_BATCH_SIZE = 500
+KEEPALIVE_INTERVAL = 15.0
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def valid_cursor(cursor):
+    return cursor is not None and CURSOR_RE.fullmatch(cursor) is not None
+
+
+def _event(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_entries(follower: LogFollower, start: Union[str, int],
+                         serialize: Callable, matches: Optional[Callable] = None,
+                         batch_size=STREAM_BATCH_SIZE,
+                         keepalive=KEEPALIVE_INTERVAL) -> AsyncIterator[str]:
+    """Gera eventos SSE para as entradas depois de ``start`` (cursor ou sequência)"""
+    loop = asyncio.get_running_loop()
+    wakeup = asyncio.Event()
+
+    def notify():
+        loop.call_soon_threadsafe(wakeup.set)
+
+    follower.add_listener(notify)
+    try:
+        position = start
+        sent_cursor = start if isinstance(start, str) else None
+        while True:
+            wakeup.clear()
+            found, next_seq, last_cursor, dropped = await asyncio.to_thread(
+                follower.read_after, position, batch_size, matches
+            )
+
+            chunk = []
+            if dropped is None:
+                chunk.append(_event("gap", {"dropped": None, "reason": "cursor fora do buffer"}))
+            elif dropped:
+                chunk.append(_event("gap", {"dropped": dropped}))
+            for cursor, entry in found:
+                chunk.append(_event("entry", serialize(entry), cursor))
+                sent_cursor = cursor
+            if last_cursor is not None and last_cursor != sent_cursor:
+                # Entradas filtradas também avançam o Last-Event-ID do cliente
+                chunk.append(f"id: {last_cursor}\n\n")
+                sent_cursor = last_cursor
+            if chunk:
+                yield "".join(chunk)
+
+            position = next_seq
+            if next_seq >= follower.next_seq:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+    finally:
+        follower.remove_listener(notify)
@@ -1,21 +1,189 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, Header, HTTPException, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import subprocess
 import logging
-import re
+import codecs
 import csv
 import io
-from urllib.parse import urlparse
-from typing import List
+import os
+import tempfile
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from blocklist_queue import ADD, REMOVE, VERSION_MISMATCH, BlocklistWriteQueue
+from blocklist_store import BlocklistStore
+from compaction import VersionMismatch, apply_compaction
+from docker_client import DEFAULT_SOCKET, DockerClient, DockerError
+from domain_index import DomainIndex
+from jobs import FAILED, SUCCEEDED, JobManager
+from log_archive import LogArchive
+from log_follower import LogFollower
+from log_parser import parse_access_line, parse_cache_line, parse_time
+from log_query import ACCESS_INDEX_KEYS, AccessLogQuery, url_host
+from log_reader import PageExpired, read_page
+from log_stats import AccessLogStats
+from log_stream import SSE_HEADERS, stream_entries, valid_cursor
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+from quantiles import DEFAULT_QUANTILES, TrafficQuantiles
+from rollups import RESOLUTIONS, TrafficRollup
+from squid_control import SquidControlError, SquidController
+from status_probe import CachedProbe, StatusProbe, file_signature
+from url_validation import validate_entries, validate_url_entry
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 BLOCKED_FILE = "blocked_sites.txt"
+BLOCKLIST_FLUSH_WINDOW = float(os.getenv("BLOCKLIST_FLUSH_WINDOW", "0.2"))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MAX_LINE_LENGTH = 64 * 1024
+# URLs de um upload verificadas e gravadas por vez
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "50000"))
+# 0: sem limite de tamanho do arquivo
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", "0"))
+MAX_INVALID_REPORTED = 1000
+LOOKUP_MAX_URLS = int(os.getenv("LOOKUP_MAX_URLS", "100000"))
+BLOCKLIST_PAGE_MAX = int(os.getenv("BLOCKLIST_PAGE_MAX", "10000"))
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+
+DOCKER_SOCKET = os.getenv("DOCKER_SOCKET", DEFAULT_SOCKET)
+SQUID_CONTAINER = os.getenv("SQUID_CONTAINER", "squid")
+SQUID_CONF = os.getenv("SQUID_CONF", "/app/squid.conf")
+SQUID_PROXY_HOST = os.getenv("SQUID_PROXY_HOST", "squid")
+SQUID_PROXY_PORT = int(os.getenv("SQUID_PROXY_PORT", "3128"))
+SQUID_READY_TIMEOUT = float(os.getenv("SQUID_READY_TIMEOUT", "30"))
+# "helper": o Squid consulta a lista pelo blocklist_helper e não precisa de reconfigure
+SQUID_BLOCKLIST_MODE = os.getenv("SQUID_BLOCKLIST_MODE", "reconfigure")
+MAX_JOB_WAIT = 60
+STATUS_TTL = float(os.getenv("STATUS_TTL", "2"))
+STATUS_CONFIG_TTL = float(os.getenv("STATUS_CONFIG_TTL", "300"))
+
+SQUID_LOG_DIR = os.getenv("SQUID_LOG_DIR", "/var/log/squid")
+LOG_BUFFER_LINES = int(os.getenv("LOG_BUFFER_LINES", "50000"))
+LOG_PAGE_MAX = int(os.getenv("LOG_PAGE_MAX", "5000"))
+LOG_INDEX_DIR = os.getenv("LOG_INDEX_DIR", "/app/data/log-index")
+LOG_SEARCH_WORKERS = int(os.getenv("LOG_SEARCH_WORKERS", "0")) or None
+ROLLUP_DB = os.getenv("ROLLUP_DB", "/app/data/rollups.sqlite3")
+# Estado dos jobs compartilhado entre os workers do uvicorn
+JOBS_DB = os.getenv("JOBS_DB", "/app/data/jobs.sqlite3")
+ROLLUP_FLUSH_INTERVAL = float(os.getenv("ROLLUP_FLUSH_INTERVAL", "5"))
+QUANTILE_MAX_KEYS = int(os.getenv("QUANTILE_MAX_KEYS", "500"))
+QUANTILE_RETENTION_MINUTES = int(os.getenv("QUANTILE_RETENTION_MINUTES", "180"))
+
+docker = DockerClient(DOCKER_SOCKET)
+squid = SquidController(docker, SQUID_CONTAINER, SQUID_PROXY_HOST, SQUID_PROXY_PORT, ready_timeout=SQUID_READY_TIMEOUT)
+jobs = JobManager(path=JOBS_DB)
+event_loop = None
+
+blocklist = BlocklistStore(BLOCKED_FILE)
+blocklist_writer = BlocklistWriteQueue(blocklist, lambda: apply_blocklist_change(), window=BLOCKLIST_FLUSH_WINDOW)
+
+access_log = LogFollower(os.path.join(SQUID_LOG_DIR, "access.log"), parse_access_line, maxlen=LOG_BUFFER_LINES, index_keys=ACCESS_INDEX_KEYS)
+access_stats = AccessLogStats()
+access_log.add_observer(access_stats)
+traffic_rollup = TrafficRollup(ROLLUP_DB, flush_interval=ROLLUP_FLUSH_INTERVAL)
+access_log.add_observer(traffic_rollup)
+traffic_quantiles = TrafficQuantiles(max_keys=QUANTILE_MAX_KEYS, retention_minutes=QUANTILE_RETENTION_MINUTES)
+access_log.add_observer(traffic_quantiles)
+cache_log = LogFollower(os.path.join(SQUID_LOG_DIR, "cache.log"), parse_cache_line, maxlen=LOG_BUFFER_LINES)
+access_archive = LogArchive(SQUID_LOG_DIR, "access.log", LOG_INDEX_DIR, workers=LOG_SEARCH_WORKERS)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+    traffic_rollup.start()
+    # Abre (ou compila) o snapshot da lista antes das primeiras consultas
+    await run_in_threadpool(blocklist.reader)
+    access_log.start()
+    cache_log.start()
+    yield
+    access_log.stop()
+    cache_log.stop()
+    traffic_rollup.stop()
+    access_archive.close()
+    jobs.cancel_all()
+    jobs.close()
+    event_loop = None
+    status_probe.shutdown()
+    docker.close()
+
+app = FastAPI(lifespan=lifespan)
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "squid_api_http_request_duration_seconds",
+    "Duração das requisições HTTP por método, rota e status",
+    ("method", "route", "status"),
+)
+CONFLICT_CHECK_DURATION = REGISTRY.histogram(
+    "squid_api_conflict_check_duration_seconds",
+    "Tempo para verificar conflitos de um lote de URLs",
+)
+BULK_IMPORT_DURATION = REGISTRY.histogram(
+    "squid_api_bulk_import_duration_seconds",
+    "Duração das importações em lote, da verificação de conflitos à gravação",
+)
+BULK_IMPORT_ENTRIES = REGISTRY.counter(
+    "squid_api_bulk_import_entries_total",
+    "URLs processadas nas importações em lote por resultado",
+    ("result",),
+)
+BULK_IMPORT_THROUGHPUT = REGISTRY.gauge(
+    "squid_api_bulk_import_entries_per_second",
+    "Vazão (URLs/s) da última importação em lote",
+)
+BLOCKLIST_SIZE = REGISTRY.gauge(
+    "squid_api_blocklist_entries",
+    "Quantidade de entradas na lista de bloqueio",
+)
+BLOCKLIST_SIZE.set_function(lambda: len(blocklist))
+PROXY_DURATION = REGISTRY.gauge(
+    "squid_proxy_response_duration_ms",
+    "Percentis da duração das respostas do Squid (ms) por classe de resultado, desde o início da API",
+    ("result_class", "quantile"),
+)
+PROXY_DURATION.set_function(lambda: traffic_quantiles.class_metrics()[0])
+PROXY_BYTES = REGISTRY.gauge(
+    "squid_proxy_response_bytes",
+    "Percentis do tamanho das respostas do Squid (bytes) por classe de resultado, desde o início da API",
+    ("result_class", "quantile"),
+)
+PROXY_BYTES.set_function(lambda: traffic_quantiles.class_metrics()[1])
+PROXY_REQUESTS = REGISTRY.gauge(
+    "squid_proxy_requests_observed",
+    "Requisições do access.log observadas desde o início da API por classe de resultado",
+    ("result_class",),
+)
+PROXY_REQUESTS.set_function(lambda: traffic_quantiles.class_metrics()[2])
+PROXY_HIT_RATIO = REGISTRY.gauge(
+    "squid_proxy_cache_hit_ratio",
+    "Taxa de acerto do cache (requisições) nos últimos 5 minutos",
+)
+PROXY_HIT_RATIO.set_function(lambda: traffic_quantiles.hit_ratio(5) or 0)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # A rota (template) em vez do caminho, para não criar um label por URL
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status,
+        )
 
 
 app.add_middleware(
@@ -24,7 +192,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], 
     allow_headers=["*"],  
+    expose_headers=["ETag"],
 )
+# Só para clientes com Accept-Encoding: gzip; text/event-stream não é comprimido
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
 
 class URLRequest(BaseModel):
     url: str
@@ -32,234 +203,322 @@ class URLRequest(BaseModel):
 class BulkURLRequest(BaseModel):
     urls: List[str]
 
-def is_valid_ip(ip):
-    """Valida se é um IP válido (IPv4 ou IPv6)"""
-    
-    ipv4_pattern = r'^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$'
-    
-    
-    ipv6_pattern = r'^(?:[0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}$|^::1$|^::$'
-    
-    return bool(re.match(ipv4_pattern, ip)) or bool(re.match(ipv6_pattern, ip))
+def apply_blocklist_change():
+    """Chamado pela fila de escrita depois de gravar a lista de bloqueio
 
-def is_valid_domain(domain):
-    """Valida se é um domínio válido"""
-    
-    if domain.startswith('http://') or domain.startswith('https://'):
-        domain = domain.split('://', 1)[1]
-    if domain.startswith('www.'):
-        domain = domain[4:]
-    
-    
-    domain_pattern = r'^(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$'
-    
-    return bool(re.match(domain_pattern, domain))
+    No modo ``helper`` o helper do Squid percebe a mudança no arquivo e troca
+    o índice sozinho; só no modo ``reconfigure`` o Squid precisa recarregar.
+    """
+    if SQUID_BLOCKLIST_MODE == "helper":
+        return
+    reload_squid()
 
-def validate_url_entry(entry):
-    """Valida uma entrada de URL/IP e retorna o formato limpo"""
-    entry = entry.strip()
-    
-    
-    if not entry or entry.startswith('#'):
-        return None
-    
-    
-    if is_valid_ip(entry):
-        return entry
-    
-    
-    if is_valid_domain(entry):
-        
-        if entry.startswith('http://') or entry.startswith('https://'):
-            domain = entry.split('://', 1)[1]
-        else:
-            domain = entry
-        
-        if domain.startswith('www.'):
-            domain = domain[4:]
-        
-        return domain
-    
-    return None
+def lookup_urls(urls: List[str]):
+    """Regra da lista de bloqueio que bloquearia cada URL (ou None)
 
-def is_subdomain(url1, url2):
-    """Verifica se url1 é subdomínio de url2"""
-    
-    def clean_url(url):
-        if url.startswith('http://') or url.startswith('https://'):
-            url = url.split('://', 1)[1]
-        if url.startswith('www.'):
-            url = url[4:]
-        return url.lower()
-    
-    clean_url1 = clean_url(url1)
-    clean_url2 = clean_url(url2)
-    
-    
-    if clean_url1.endswith('.' + clean_url2) or clean_url1 == clean_url2:
-        return True
-    
-    
-    if clean_url2.endswith('.' + clean_url1) or clean_url2 == clean_url1:
-        return True
-    
-    return False
+    O host é comparado inteiro, como o Squid e o helper fazem (``www.`` não é
+    removido); ``validate_url_entry`` só confere se ele é válido.
+    """
+    index = blocklist.reader()
+    results = []
+    for url in urls:
+        host = url_host(url.strip()).rstrip(".")
+        if validate_url_entry(host) is None:
+            host = None
+        rule = index.lookup(host) if host is not None else None
+        results.append({
+            "url": url,
+            "host": host,
+            "valid": host is not None,
+            "blocked": rule is not None,
+            "rule": rule
+        })
+    return results
 
-def check_url_conflicts(new_url):
-    """Verifica se a nova URL conflita com URLs existentes"""
-    try:
-        with open(BLOCKED_FILE, "r") as f:
-            existing_urls = [line.strip() for line in f if line.strip()]
-        
-        conflicts = []
-        for existing_url in existing_urls:
-            if is_subdomain(new_url, existing_url):
-                conflicts.append(existing_url)
-        
-        return conflicts
-    except FileNotFoundError:
-        return []
-
-def run_cmd(cmd):
-    logger.info(f"Executando comando: {cmd}")
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-    logger.info(f"Comando retornou: {result.returncode}")
-    if result.stderr:
-        logger.error(f"Erro: {result.stderr}")
-    return result
+def compact_blocklist(dry_run=False, expected_version=None):
+    """Compacta a lista de bloqueio; retorna (relatório, se a lista mudou, versão)
 
-def restart_squid():
-    """Reinicia o container do Squid"""
+    Como na fila de escrita, o arquivo volta ao conteúdo anterior se o Squid
+    não aceitar a lista nova, a menos que outra requisição já o tenha alterado.
+    """
     try:
-        logger.info("Reiniciando container do Squid...")
-        result = run_cmd("docker restart squid")
-        if result.returncode != 0:
-            logger.error(f"Erro ao reiniciar Squid: {result.stderr}")
-            raise HTTPException(status_code=500, detail=f"Erro ao reiniciar Squid: {result.stderr}")
-        
-
-        import time
-        time.sleep(5)
-        logger.info("Squid reiniciado com sucesso")
-        return True
-    except Exception as e:
-        logger.error(f"Exceção ao reiniciar Squid: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+        return apply_compaction(blocklist, apply_blocklist_change, dry_run, expected_version)
+    except VersionMismatch as e:
+        raise version_mismatch(e.version)
 
 def reload_squid():
+    """Reconfigura o Squid a partir da thread da fila de escrita
+
+    A operação roda no loop do servidor; só a thread da fila espera por ela.
+    """
     try:
-        
-        logger.info("Verificando se o Squid está rodando...")
-        check_result = run_cmd("docker exec squid ps aux | grep -v grep | grep squid")
-        
-        if check_result.returncode != 0 or "squid" not in check_result.stdout:
-            logger.warning("Squid não está rodando. Tentando iniciar...")
-            start_result = run_cmd("docker start squid")
-            if start_result.returncode != 0:
-                logger.error(f"Erro ao iniciar Squid: {start_result.stderr}")
-                raise HTTPException(status_code=500, detail=f"Erro ao iniciar Squid: {start_result.stderr}")
-            
+        if event_loop is not None and event_loop.is_running():
+            asyncio.run_coroutine_threadsafe(squid.reload(), event_loop).result()
+        else:
+            asyncio.run(squid.reload())
+    except SquidControlError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        status_probe.invalidate()
 
-            import time
-            time.sleep(3)
-            logger.info("Squid iniciado com sucesso")
-        
-        
-        logger.info("Recarregando configuração do Squid...")
-        result = run_cmd("docker exec squid squid -k reconfigure")
-        
-       
-        if result.stderr and "WARNING" in result.stderr:
-            logger.warning(f"Warnings do Squid (não críticos): {result.stderr}")
-        
-        
-        if result.returncode == 0 or (result.stderr and "WARNING" in result.stderr and "ERROR" not in result.stderr):
-            logger.info("Squid recarregado com sucesso")
-            return
+class UploadTooLarge(Exception):
+    pass
 
-        if result.returncode != 0 and "No running copy" in result.stderr:
-            logger.warning("Squid não está rodando. Tentando reiniciar container...")
-            return restart_squid()
-        
+def iter_text_lines(binary_file, chunk_size=UPLOAD_CHUNK_SIZE, max_bytes=UPLOAD_MAX_BYTES):
+    """Lê um arquivo binário em blocos e gera suas linhas decodificadas em UTF-8
 
-        if result.returncode != 0:
-            logger.error(f"Erro ao recarregar Squid: {result.stderr}")
-            raise HTTPException(status_code=500, detail=f"Erro ao recarregar Squid: {result.stderr}")
-            
-    except Exception as e:
-        logger.error(f"Exceção ao recarregar Squid: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
-
-def process_txt_file(file_content: str):
-    """Processa arquivo TXT e retorna URLs válidas"""
-    lines = file_content.split('\n')
-    valid_urls = []
-    invalid_entries = []
+    Levanta ``UploadTooLarge`` se o arquivo passar de ``max_bytes`` (0: sem limite).
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ""
+    total = 0
     
+    while True:
+        chunk = binary_file.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_bytes and total > max_bytes:
+            raise UploadTooLarge(f"Arquivo excede {max_bytes} bytes")
+        
+        text = pending + decoder.decode(chunk)
+        start = 0
+        while True:
+            end = text.find('\n', start)
+            if end < 0:
+                break
+            if end - start > MAX_LINE_LENGTH:
+                raise ValueError(f"Linha excede {MAX_LINE_LENGTH} caracteres")
+            yield text[start:end + 1]
+            start = end + 1
+        pending = text[start:]
+        
+        if len(pending) > MAX_LINE_LENGTH:
+            raise ValueError(f"Linha excede {MAX_LINE_LENGTH} caracteres")
+    
+    pending += decoder.decode(b'', final=True)
+    if len(pending) > MAX_LINE_LENGTH:
+        raise ValueError(f"Linha excede {MAX_LINE_LENGTH} caracteres")
+    if pending:
+        yield pending
+
+def iter_txt_entries(lines):
+    """Gera (número da linha, entrada) de um TXT, ignorando vazios e comentários"""
     for line_num, line in enumerate(lines, 1):
         entry = line.strip()
         if not entry or entry.startswith('#'):
             continue
-            
+        yield line_num, entry
+
+def iter_csv_entries(lines):
+    """Gera (número da linha, entrada) da primeira coluna de um CSV"""
+    for row_num, row in enumerate(csv.reader(lines), 1):
+        if not row:
+            continue
+        
+        entry = row[0].strip()
+        if not entry or entry.startswith('#'):
+            continue
+        yield row_num, entry
+
+def collect_valid_entries(numbered_entries, add=None):
+    """Valida as entradas uma a uma, guardando no máximo MAX_INVALID_REPORTED inválidas
+
+    As válidas vão para ``add``; sem ele, são devolvidas numa lista.
+    """
+    valid_urls = []
+    invalid_entries = []
+    invalid_count = 0
+    if add is None:
+        add = valid_urls.append
+    
+    for line_num, entry in numbered_entries:
         validated = validate_url_entry(entry)
         if validated:
-            valid_urls.append(validated)
+            add(validated)
         else:
-            invalid_entries.append(f"Linha {line_num}: {entry}")
+            invalid_count += 1
+            if invalid_count <= MAX_INVALID_REPORTED:
+                invalid_entries.append(f"Linha {line_num}: {entry}")
+    
+    if invalid_count > MAX_INVALID_REPORTED:
+        invalid_entries.append(f"... e mais {invalid_count - MAX_INVALID_REPORTED} entradas inválidas")
     
     return valid_urls, invalid_entries
 
-def process_csv_file(file_content: str):
-    """Processa arquivo CSV e retorna URLs válidas"""
-    valid_urls = []
-    invalid_entries = []
-    
+def _as_lines(file_content):
+    if isinstance(file_content, str):
+        return io.StringIO(file_content)
+    return file_content
+
+def process_txt_file(file_content, add=None):
+    """Processa arquivo TXT (texto ou iterável de linhas) e retorna URLs válidas"""
+    return collect_valid_entries(iter_txt_entries(_as_lines(file_content)), add)
+
+def process_csv_file(file_content, add=None):
+    """Processa arquivo CSV (texto ou iterável de linhas) e retorna URLs válidas"""
     try:
-        csv_reader = csv.reader(io.StringIO(file_content))
-        for row_num, row in enumerate(csv_reader, 1):
-            if not row:  
-                continue
-                
-            
-            entry = row[0].strip() if row else ""
-            if not entry or entry.startswith('#'):
-                continue
-                
-            validated = validate_url_entry(entry)
-            if validated:
-                valid_urls.append(validated)
-            else:
-                invalid_entries.append(f"Linha {row_num}: {entry}")
+        return collect_valid_entries(iter_csv_entries(_as_lines(file_content)), add)
+    except (UnicodeDecodeError, UploadTooLarge):
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Erro ao processar CSV: {str(e)}")
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Versão esperada a partir do cabeçalho If-Match (``"7"``, ``7`` ou ``*``)"""
+    if if_match is None:
+        return None
+    value = if_match.strip()
+    if value == "*":
+        return None
+    if value.startswith("W/"):
+        value = value[2:]
+    value = value.strip('"')
+    if not value.isdigit():
+        raise HTTPException(status_code=400, detail="If-Match deve ser a versão da lista de bloqueio (ETag de GET /blocklist)")
+    return int(value)
+
+def version_mismatch(version=None):
+    if version is None:
+        version = blocklist.version()
+    return HTTPException(
+        status_code=412,
+        detail=f"A lista de bloqueio foi alterada (versão atual: {version}). Releia a lista e tente novamente."
+    )
+
+def check_version(expected_version):
+    """412 se a lista não está mais na versão esperada"""
+    if expected_version is not None:
+        version = blocklist.version()
+        if version != expected_version:
+            raise version_mismatch(version)
+
+async def write_blocklist(action, urls, expected_version=None):
+    """Envia a mutação à fila de escrita e aguarda o lote sem ocupar uma thread"""
+    return await asyncio.wrap_future(blocklist_writer.submit(action, urls, expected_version))
+
+class UploadSpool:
+    """URLs válidas de um upload num arquivo temporário, relidas em lotes"""
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self.count = 0
+
+    def append(self, url):
+        self.file.write(url + "\n")
+        self.count += 1
+
+    def batches(self, size):
+        self.file.seek(0)
+        batch = []
+        for line in self.file:
+            batch.append(line.rstrip("\n"))
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def close(self):
+        self.file.close()
+
+async def add_urls_in_batches(batches, expected_version=None):
+    """Adiciona as URLs lote a lote e soma os resultados
+
+    ``If-Match`` vale para o primeiro lote. As contagens são exatas; das
+    listas só as primeiras MAX_INVALID_REPORTED URLs são devolvidas.
+    """
+    merged = {
+        "added": [],
+        "failed": [],
+        "conflicts": [],
+        "total_processed": 0,
+        "successfully_added": 0,
+        "failed_count": 0,
+        "version": None
+    }
+    while True:
+        batch = await run_in_threadpool(next, batches, None)
+        if batch is None:
+            break
+        try:
+            result = await add_urls_in_bulk(batch, expected_version)
+        except HTTPException as e:
+            if e.status_code == 500 and merged["successfully_added"]:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"{e.detail}. {merged['successfully_added']} URLs de lotes anteriores já foram adicionadas"
+                )
+            raise
+        expected_version = None
+        
+        for key in ("added", "failed", "conflicts"):
+            room = MAX_INVALID_REPORTED - len(merged[key])
+            if room > 0:
+                merged[key].extend(result[key][:room])
+        merged["total_processed"] += result["total_processed"]
+        merged["successfully_added"] += result["successfully_added"]
+        merged["failed_count"] += len(result["failed"])
+        merged["version"] = result["version"]
+    return merged
+
+async def ingest_upload(file: UploadFile, process, expected_version=None):
+    """Processa um upload em streaming e adiciona as URLs válidas em lotes
+
+    O arquivo inteiro é lido e validado antes de qualquer gravação (um erro de
+    formato não deixa a lista pela metade); as URLs válidas ficam num arquivo
+    temporário e são gravadas de UPLOAD_BATCH_SIZE em UPLOAD_BATCH_SIZE.
+    """
+    spool = UploadSpool()
+    try:
+        try:
+            _, invalid_entries = await run_in_threadpool(
+                lambda: process(iter_text_lines(file.file, max_bytes=UPLOAD_MAX_BYTES), spool.append)
+            )
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        
+        if not spool.count:
+            return {
+                "status": "error",
+                "message": "Nenhuma URL válida encontrada no arquivo",
+                "invalid_entries": invalid_entries
+            }
+        
+        result = await add_urls_in_batches(spool.batches(UPLOAD_BATCH_SIZE), expected_version)
+    finally:
+        spool.close()
     
-    return valid_urls, invalid_entries
+    return {
+        "status": "success",
+        "message": f"Processamento concluído. {result['successfully_added']} URLs adicionadas.",
+        "result": result,
+        "invalid_entries": invalid_entries
+    }
 
-def add_urls_in_bulk(urls: List[str]):
-    """Adiciona múltiplas URLs verificando conflitos"""
+def check_bulk_conflicts(urls: List[str]):
+    """Separa as URLs que podem ser adicionadas das já existentes ou em conflito"""
+    with CONFLICT_CHECK_DURATION.time():
+        return _check_bulk_conflicts(urls)
+
+def _check_bulk_conflicts(urls: List[str]):
     added_urls = []
     failed_urls = []
     conflicts = []
     
     
-    try:
-        with open(BLOCKED_FILE, "r") as f:
-            existing_urls = [line.strip() for line in f if line.strip()]
-    except FileNotFoundError:
-        existing_urls = []
+    existing_index = blocklist.index
+    batch_index = DomainIndex(urls)
     
     
     for url in urls:
         
-        if url in existing_urls:
+        if url in existing_index:
             failed_urls.append({"url": url, "reason": "Already exists"})
             continue
         
         
-        url_conflicts = []
-        for existing_url in existing_urls:
-            if is_subdomain(url, existing_url):
-                url_conflicts.append(existing_url)
+        url_conflicts = existing_index.conflicts(url)
         
         if url_conflicts:
             conflicts.append({"url": url, "conflicts": url_conflicts})
@@ -267,88 +526,157 @@ def add_urls_in_bulk(urls: List[str]):
             continue
         
         
-        for other_url in urls:
-            if other_url != url and is_subdomain(url, other_url):
-                failed_urls.append({"url": url, "reason": f"Conflicts with URL in batch: {other_url}"})
-                break
+        batch_conflicts = batch_index.conflicts(url, exclude=url, limit=1)
+        if batch_conflicts:
+            failed_urls.append({"url": url, "reason": f"Conflicts with URL in batch: {batch_conflicts[0]}"})
         else:
             added_urls.append(url)
     
+    return added_urls, failed_urls, conflicts
+
+async def add_urls_in_bulk(urls: List[str], expected_version=None):
+    """Adiciona múltiplas URLs verificando conflitos"""
+    start = time.perf_counter()
+    result = await _add_urls_in_bulk(urls, expected_version)
+    elapsed = time.perf_counter() - start
+    BULK_IMPORT_DURATION.observe(elapsed)
+    BULK_IMPORT_ENTRIES.inc(result["successfully_added"], result="added")
+    BULK_IMPORT_ENTRIES.inc(len(result["failed"]), result="failed")
+    if elapsed > 0:
+        BULK_IMPORT_THROUGHPUT.set(len(urls) / elapsed)
+    return result
+
+async def _add_urls_in_bulk(urls: List[str], expected_version=None):
+    check_version(expected_version)
+    added_urls, failed_urls, conflicts = await run_in_threadpool(check_bulk_conflicts, urls)
+    version = None
     
     if added_urls:
-        with open(BLOCKED_FILE, "a") as f:
-            for url in added_urls:
-                f.write(f"{url}\n")
-        
-        
         try:
-            reload_squid()
+            results = await write_blocklist(ADD, added_urls, expected_version)
         except HTTPException as e:
-            
-            with open(BLOCKED_FILE, "r") as f:
-                lines = f.readlines()
-            with open(BLOCKED_FILE, "w") as f:
-                f.writelines([line for line in lines if line.strip() not in added_urls])
-            
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to reload Squid. No URLs were added: {e.detail}"
             )
+        
+        if results[0]["status"] == VERSION_MISMATCH:
+            raise version_mismatch(results[0]["version"])
+        version = results[0]["version"]
+        
+        added_urls = []
+        for result in results:
+            if result["status"] == "added":
+                added_urls.append(result["url"])
+            elif result["status"] == "exists":
+                failed_urls.append({"url": result["url"], "reason": "Already exists"})
+            else:
+                conflicts.append({"url": result["url"], "conflicts": result["conflicts"]})
+                failed_urls.append({"url": result["url"], "reason": f"Conflicts with: {', '.join(result['conflicts'])}"})
     
     return {
         "added": added_urls,
         "failed": failed_urls,
         "conflicts": conflicts,
         "total_processed": len(urls),
-        "successfully_added": len(added_urls)
+        "successfully_added": len(added_urls),
+        "version": version if version is not None else blocklist.version()
     }
 
+async def run_service_action(action):
+    """Executa start/stop/restart/reload e descarta o status em cache"""
+    try:
+        await getattr(squid, action)()
+    finally:
+        status_probe.invalidate()
+    return {"action": action}
+
 @app.post("/api/v1/squid/service/{action}")
-def control_service(action: str):
-    if action not in ["start", "stop", "restart"]:
+async def control_service(action: str, wait: float = 0):
+    """Agenda a operação e retorna o id do job; ``wait`` aguarda até N segundos"""
+    if action not in ["start", "stop", "restart", "reload"]:
         raise HTTPException(status_code=400, detail="Invalid action.")
     
-    try:
-        result = run_cmd(f"docker {action} squid")
-        if result.returncode != 0:
-            logger.error(f"Erro ao {action} o Squid: {result.stderr}")
-            raise HTTPException(status_code=500, detail=f"Erro ao {action} o Squid: {result.stderr}")
+    job = jobs.submit(f"service:{action}", lambda: run_service_action(action))
+    await jobs.wait(job, min(wait, MAX_JOB_WAIT))
+    
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=f"Erro ao {action} o Squid: {job.error}")
+    if job.status == SUCCEEDED:
         logger.info(f"Squid {action} com sucesso")
-        return {"status": "success", "message": f"Squid service {action}ed."}
-    except Exception as e:
-        logger.error(f"Exceção ao {action} o Squid: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+        return {"status": "success", "message": f"Squid service {action}ed.", "job_id": job.id}
+    return JSONResponse(status_code=202, content={
+        "status": "accepted",
+        "message": f"Squid service {action} scheduled.",
+        "job_id": job.id
+    })
 
-@app.get("/api/v1/squid/status")
-def get_squid_status():
-    """Verifica o status do Squid"""
+@app.get("/api/v1/squid/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Estado de um job; ``wait`` aguarda a conclusão por até N segundos"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    job = await jobs.wait(job, min(wait, MAX_JOB_WAIT))
+    return job.to_dict()
+
+def probe_container_state():
     try:
+        return docker.inspect(SQUID_CONTAINER).get("State", {})
+    except DockerError:
+        return {}
 
-        container_result = run_cmd("docker ps --filter name=squid --format '{{.Status}}'")
+def probe_config_valid():
+    try:
+        return docker.exec(SQUID_CONTAINER, ["squid", "-k", "parse"]).returncode == 0
+    except DockerError:
+        return False
 
-        process_result = run_cmd("docker exec squid ps aux | grep -v grep | grep squid")
+def probe_container_logs():
+    try:
+        return docker.logs(SQUID_CONTAINER, tail=10)
+    except DockerError:
+        return ""
 
-        config_check_result = run_cmd("docker exec squid squid -k parse")
+status_probe = StatusProbe({
+    "state": CachedProbe(probe_container_state, STATUS_TTL),
+    "processes": CachedProbe(squid.running, STATUS_TTL),
+    # A configuração só muda com squid.conf ou a lista de bloqueio
+    "config": CachedProbe(probe_config_valid, STATUS_CONFIG_TTL,
+                          key=lambda: file_signature(SQUID_CONF, BLOCKED_FILE)),
+    "logs": CachedProbe(probe_container_logs, STATUS_TTL),
+})
 
-        logs_result = run_cmd("docker logs squid --tail 10")
+@app.get("/metrics")
+def get_metrics():
+    """Métricas da API no formato de texto do Prometheus"""
+    return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/api/v1/squid/status")
+def get_squid_status():
+    """Verifica o status do Squid"""
+    try:
+        probes = status_probe.collect()
+        state = probes["state"]
+        squid_process_running, squid_processes = probes["processes"]
+        config_valid = probes["config"]
+        container_logs = probes["logs"]
         
-        container_running = container_result.returncode == 0 and "Up" in container_result.stdout
-        squid_process_running = process_result.returncode == 0 and "squid" in process_result.stdout
-        config_valid = config_check_result.returncode == 0
+        container_running = bool(state.get("Running"))
 
         config_errors = []
         if not config_valid:
             config_errors.append("Invalid configuration")
 
-        if "ERROR" in logs_result.stdout or "FATAL" in logs_result.stdout:
+        if "ERROR" in container_logs or "FATAL" in container_logs:
             config_errors.append("Configuration errors detected in logs")
         
         status = {
             "container_running": container_running,
             "squid_process_running": squid_process_running,
             "config_valid": config_valid,
-            "container_status": container_result.stdout.strip() if container_result.returncode == 0 else "Not running",
-            "squid_processes": process_result.stdout.strip() if process_result.returncode == 0 else "No processes found",
+            "container_status": f"Up since {state.get('StartedAt')}" if container_running else "Not running",
+            "squid_processes": "\n".join(squid_processes) if squid_process_running else "No processes found",
             "config_errors": config_errors,
             "overall_status": "healthy" if (container_running and squid_process_running and config_valid) else "unhealthy"
         }
@@ -358,87 +686,196 @@ def get_squid_status():
         logger.error(f"Erro ao verificar status do Squid: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao verificar status: {str(e)}")
 
-@app.get("/api/v1/squid/blocklist")
-def get_blocked_urls():
+def etag_matches(if_none_match: Optional[str], version):
+    """Indica se algum ETag de If-None-Match é a versão atual"""
+    if if_none_match is None:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"') == str(version):
+            return True
+    return False
+
+def filter_blocklist(urls, search=None, prefix=None):
+    """Entradas que contêm ``search`` e começam com ``prefix`` (ignorando o ponto inicial)"""
+    if search:
+        term = search.lower()
+        urls = [url for url in urls if term in url.lower()]
+    if prefix:
+        start = prefix.lower().lstrip(".")
+        urls = [url for url in urls if url.lstrip(".").lower().startswith(start)]
+    return urls
+
+def blocklist_cursor_offset(urls, cursor):
+    """Posição em ``urls`` logo depois da entrada do cursor ``<offset>:<entrada>``
+
+    Se a lista mudou antes dessa posição, a entrada é procurada de novo; se
+    ela foi removida, a paginação segue do offset.
+    """
+    offset, sep, entry = cursor.partition(":")
+    if not sep or not offset.isdigit():
+        raise HTTPException(status_code=400, detail="Cursor inválido. Use o next_cursor da página anterior")
+    offset = int(offset)
+    if 0 < offset <= len(urls) and urls[offset - 1] == entry:
+        return offset
     try:
-        with open(BLOCKED_FILE) as f:
-            return {"blocked_urls": [line.strip() for line in f if line.strip()]}
-    except FileNotFoundError:
-        return {"blocked_urls": []}
+        return urls.index(entry) + 1
+    except ValueError:
+        return min(offset, len(urls))
+
+@app.get("/api/v1/squid/blocklist")
+def get_blocked_urls(response: Response, limit: int = None, cursor: str = None, search: str = None,
+                     prefix: str = None, if_none_match: Optional[str] = Header(None)):
+    with blocklist.lock:
+        version = blocklist.version()
+        # A versão serve de ETag e vai no If-Match das alterações; no-cache
+        # faz o navegador revalidar e receber 304 enquanto a lista não muda
+        headers = {"ETag": f'"{version}"', "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, version):
+            return Response(status_code=304, headers=headers)
+        urls = blocklist.urls()
+    response.headers.update(headers)
+
+    if limit is None and cursor is None and search is None and prefix is None:
+        return {"blocked_urls": urls, "total": len(urls), "version": version}
+
+    limit = BLOCKLIST_PAGE_MAX if limit is None else limit
+    if limit < 1 or limit > BLOCKLIST_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit deve estar entre 1 e {BLOCKLIST_PAGE_MAX}")
+    matched = filter_blocklist(urls, search, prefix)
+    offset = blocklist_cursor_offset(matched, cursor) if cursor is not None else 0
+    page = list(matched[offset:offset + limit])
+    end = offset + len(page)
+    return {
+        "blocked_urls": page,
+        "total": len(urls),
+        "matched": len(matched),
+        "offset": offset,
+        "next_cursor": f"{end}:{page[-1]}" if page and end < len(matched) else None,
+        "version": version
+    }
 
 @app.post("/api/v1/squid/blocklist")
-def add_url(req: URLRequest):
+async def add_url(req: URLRequest, if_match: Optional[str] = Header(None)):
+    expected_version = parse_if_match(if_match)
 
-    with open(BLOCKED_FILE, "a+") as f:
-        f.seek(0)
-        existing_urls = [line.strip() for line in f if line.strip()]
-        if req.url in existing_urls:
-            raise HTTPException(status_code=409, detail="URL already blocked.")
+    try:
+        result = (await write_blocklist(ADD, [req.url], expected_version))[0]
+    except HTTPException as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Failed to reload Squid configuration. URL was not added: {e.detail}"
+        )
     
 
-    conflicts = check_url_conflicts(req.url)
-    if conflicts:
+    if result["status"] == VERSION_MISMATCH:
+        raise version_mismatch(result["version"])
+    if result["status"] == "exists":
+        raise HTTPException(status_code=409, detail="URL already blocked.")
+    if result["status"] == "conflict":
         raise HTTPException(
             status_code=409, 
-            detail=f"URL conflicts with existing blocked sites: {', '.join(conflicts)}"
+            detail=f"URL conflicts with existing blocked sites: {', '.join(result['conflicts'])}"
         )
     
+    return {"status": "success", "message": f"{req.url} blocked.", "version": result["version"]}
 
-    with open(BLOCKED_FILE, "a") as f:
-        f.write(f"{req.url}\n")
+@app.delete("/api/v1/squid/blocklist")
+async def remove_url(req: URLRequest, if_match: Optional[str] = Header(None)):
+    expected_version = parse_if_match(if_match)
+    if not blocklist.exists():
+        raise HTTPException(status_code=404, detail="Blocked list not found.")
     
-
     try:
-        reload_squid()
-        return {"status": "success", "message": f"{req.url} blocked."}
+        result = (await write_blocklist(REMOVE, [req.url], expected_version))[0]
     except HTTPException as e:
-
-        with open(BLOCKED_FILE, "r") as f:
-            lines = f.readlines()
-        with open(BLOCKED_FILE, "w") as f:
-            f.writelines([line for line in lines if line.strip() != req.url])
-        
         raise HTTPException(
-            status_code=500, 
-            detail=f"Failed to reload Squid configuration. URL was not added: {e.detail}"
+            status_code=500,
+            detail=f"Failed to reload Squid configuration. URL was not removed: {e.detail}"
         )
+    
+    if result["status"] == VERSION_MISMATCH:
+        raise version_mismatch(result["version"])
+    if result["status"] == "not_found":
+        raise HTTPException(status_code=404, detail="URL not found.")
+    return {"status": "success", "message": f"{req.url} unblocked.", "version": result["version"]}
+
+@app.get("/api/v1/squid/blocklist/lookup")
+def lookup_blocked_url(url: str):
+    """Indica se uma URL seria bloqueada e por qual entrada"""
+    return lookup_urls([url])[0]
+
+@app.post("/api/v1/squid/blocklist/lookup")
+async def lookup_blocked_urls(req: BulkURLRequest):
+    """Consulta em lote: a regra que bloquearia cada URL"""
+    if not req.urls:
+        raise HTTPException(status_code=400, detail="Lista de URLs não pode estar vazia")
+    if len(req.urls) > LOOKUP_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"No máximo {LOOKUP_MAX_URLS} URLs por consulta")
+
+    results = await run_in_threadpool(lookup_urls, req.urls)
+    return {
+        "results": results,
+        "total": len(results),
+        "blocked": sum(1 for result in results if result["blocked"]),
+        "invalid": sum(1 for result in results if not result["valid"])
+    }
+
+@app.post("/api/v1/squid/blocklist/compact")
+async def compact_blocked_urls(dry_run: bool = False, if_match: Optional[str] = Header(None)):
+    """Remove entradas repetidas e as cobertas por um domínio com ponto inicial"""
+    expected_version = parse_if_match(if_match)
+    if not blocklist.exists():
+        raise HTTPException(status_code=404, detail="Lista de bloqueio não encontrada.")
 
-@app.delete("/api/v1/squid/blocklist")
-def remove_url(req: URLRequest):
     try:
-        with open(BLOCKED_FILE, "r") as f:
-            lines = f.readlines()
-        with open(BLOCKED_FILE, "w") as f:
-            updated = [line for line in lines if line.strip() != req.url]
-            if len(updated) == len(lines):
-                raise HTTPException(status_code=404, detail="URL not found.")
-            f.writelines(updated)
-        reload_squid()
-        return {"status": "success", "message": f"{req.url} unblocked."}
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="Blocked list not found.")
+        report, changed, version = await run_in_threadpool(compact_blocklist, dry_run, expected_version)
+    except HTTPException as e:
+        if e.status_code == 412:
+            raise
+        raise HTTPException(
+            status_code=500,
+            detail=f"Falha ao recarregar Squid. A lista não foi compactada: {e.detail}"
+        )
+
+    return {
+        "status": "success",
+        "dry_run": dry_run,
+        "changed": changed,
+        "message": f"{report['entries_before']} entradas -> {report['entries_after']} entradas",
+        "report": report,
+        "version": version
+    }
 
 @app.delete("/api/v1/squid/blocklist/bulk")
-def remove_urls_bulk(req: BulkURLRequest):
+async def remove_urls_bulk(req: BulkURLRequest, if_match: Optional[str] = Header(None)):
     """Remove múltiplas URLs de uma vez"""
+    expected_version = parse_if_match(if_match)
     if not req.urls:
         raise HTTPException(status_code=400, detail="Lista de URLs não pode estar vazia")
     
+    if not blocklist.exists():
+        raise HTTPException(status_code=404, detail="Lista de bloqueio não encontrada.")
+    
     try:
         
-        with open(BLOCKED_FILE, "r") as f:
-            lines = f.readlines()
-            existing_urls = [line.strip() for line in lines if line.strip()]
-        
+        try:
+            results = await write_blocklist(REMOVE, req.urls, expected_version)
+        except HTTPException as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Falha ao recarregar Squid. URLs não foram removidas: {e.detail}"
+            )
         
-        urls_to_remove = []
-        urls_not_found = []
+        if results[0]["status"] == VERSION_MISMATCH:
+            raise version_mismatch(results[0]["version"])
         
-        for url in req.urls:
-            if url in existing_urls:
-                urls_to_remove.append(url)
-            else:
-                urls_not_found.append(url)
+        urls_to_remove = [result["url"] for result in results if result["status"] == "removed"]
+        urls_not_found = [result["url"] for result in results if result["status"] == "not_found"]
         
         if not urls_to_remove:
             return {
@@ -447,126 +884,68 @@ def remove_urls_bulk(req: BulkURLRequest):
                 "not_found": urls_not_found
             }
         
-        
-        updated_lines = [line for line in lines if line.strip() not in urls_to_remove]
-        
-        
-        with open(BLOCKED_FILE, "w") as f:
-            f.writelines(updated_lines)
-        
-        
-        try:
-            reload_squid()
-        except HTTPException as e:
-            
-            with open(BLOCKED_FILE, "w") as f:
-                f.writelines(lines)
-            raise HTTPException(
-                status_code=500,
-                detail=f"Falha ao recarregar Squid. URLs não foram removidas: {e.detail}"
-            )
-        
         return {
             "status": "success",
             "message": f"Processamento concluído. {len(urls_to_remove)} URLs removidas.",
             "removed": urls_to_remove,
             "not_found": urls_not_found,
             "total_requested": len(req.urls),
-            "successfully_removed": len(urls_to_remove)
+            "successfully_removed": len(urls_to_remove),
+            "version": results[0]["version"]
         }
         
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="Lista de bloqueio não encontrada.")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao remover URLs em lote: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 @app.post("/api/v1/squid/blocklist/bulk/txt")
-async def upload_txt_file(file: UploadFile = File(...)):
+async def upload_txt_file(file: UploadFile = File(...), if_match: Optional[str] = Header(None)):
     """Upload de arquivo TXT com URLs para bloquear"""
     if not file.filename.endswith('.txt'):
         raise HTTPException(status_code=400, detail="Arquivo deve ser .txt")
+    expected_version = parse_if_match(if_match)
     
     try:
-        content = await file.read()
-        file_content = content.decode('utf-8')
-        
-
-        valid_urls, invalid_entries = process_txt_file(file_content)
-        
-        if not valid_urls:
-            return {
-                "status": "error",
-                "message": "Nenhuma URL válida encontrada no arquivo",
-                "invalid_entries": invalid_entries
-            }
-        
-
-        result = add_urls_in_bulk(valid_urls)
-        
-        return {
-            "status": "success",
-            "message": f"Processamento concluído. {result['successfully_added']} URLs adicionadas.",
-            "result": result,
-            "invalid_entries": invalid_entries
-        }
+        return await ingest_upload(file, process_txt_file, expected_version)
         
+    except HTTPException:
+        raise
     except UnicodeDecodeError:
         raise HTTPException(status_code=400, detail="Arquivo deve estar em UTF-8")
+    except ValueError as e:
+        # Linha acima de MAX_LINE_LENGTH, como no CSV
+        raise HTTPException(status_code=400, detail=f"Erro ao processar TXT: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao processar arquivo: {str(e)}")
 
 @app.post("/api/v1/squid/blocklist/bulk/csv")
-async def upload_csv_file(file: UploadFile = File(...)):
+async def upload_csv_file(file: UploadFile = File(...), if_match: Optional[str] = Header(None)):
     """Upload de arquivo CSV com URLs para bloquear"""
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Arquivo deve ser .csv")
+    expected_version = parse_if_match(if_match)
     
     try:
-        content = await file.read()
-        file_content = content.decode('utf-8')
-        
-
-        valid_urls, invalid_entries = process_csv_file(file_content)
-        
-        if not valid_urls:
-            return {
-                "status": "error",
-                "message": "Nenhuma URL válida encontrada no arquivo",
-                "invalid_entries": invalid_entries
-            }
-        
-
-        result = add_urls_in_bulk(valid_urls)
-        
-        return {
-            "status": "success",
-            "message": f"Processamento concluído. {result['successfully_added']} URLs adicionadas.",
-            "result": result,
-            "invalid_entries": invalid_entries
-        }
+        return await ingest_upload(file, process_csv_file, expected_version)
         
+    except HTTPException:
+        raise
     except UnicodeDecodeError:
         raise HTTPException(status_code=400, detail="Arquivo deve estar em UTF-8")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao processar arquivo: {str(e)}")
 
 @app.post("/api/v1/squid/blocklist/bulk/json")
-def add_urls_json(req: BulkURLRequest):
+async def add_urls_json(req: BulkURLRequest, if_match: Optional[str] = Header(None)):
     """Adiciona múltiplas URLs via JSON"""
+    expected_version = parse_if_match(if_match)
     if not req.urls:
         raise HTTPException(status_code=400, detail="Lista de URLs não pode estar vazia")
     
     # Validar URLs
-    valid_urls = []
-    invalid_entries = []
-    
-    for url in req.urls:
-        validated = validate_url_entry(url)
-        if validated:
-            valid_urls.append(validated)
-        else:
-            invalid_entries.append(url)
+    valid_urls, invalid_entries = await run_in_threadpool(validate_entries, req.urls)
     
     if not valid_urls:
         return {
@@ -576,7 +955,7 @@ def add_urls_json(req: BulkURLRequest):
         }
     
     # Adicionar URLs em lote
-    result = add_urls_in_bulk(valid_urls)
+    result = await add_urls_in_bulk(valid_urls, expected_version)
     
     return {
         "status": "success",
@@ -585,72 +964,125 @@ def add_urls_json(req: BulkURLRequest):
         "invalid_entries": invalid_entries
     }
 
-@app.get("/api/v1/squid/logs/access")
-def get_access_logs(lines: int = 100, filter_ip: str = None, filter_url: str = None):
-    """Obtém logs de acesso do Squid"""
+def _check_cursor(cursor):
+    if cursor is not None and not valid_cursor(cursor):
+        raise HTTPException(status_code=400, detail="Cursor inválido. Formato: <inode>:<offset>")
+
+def _fetch_entries(follower, lines, cursor=None, matches=None, lookups=()):
+    """Entradas dos endpoints de log e o cursor para a próxima consulta
+
+    Sem ``cursor`` retorna as ``lines`` entradas mais recentes (aceitas por
+    ``matches``); com ``cursor`` retorna até ``lines`` entradas gravadas depois
+    dele, da mais antiga para a mais nova. Retorna ``(entradas, cursor,
+    perdidas)``.
+    """
+    if cursor is not None:
+        found, _, next_cursor, dropped = follower.read_after(cursor, lines, matches)
+        return [entry for _, entry in found], next_cursor, dropped
+    if matches is not None:
+        entries, latest = follower.search(matches, lines, lookups, with_cursor=True)
+    else:
+        entries, latest = follower.tail(lines, with_cursor=True)
+    return entries, latest, 0
+
+def _cursor_fields(cursor, next_cursor, dropped):
+    """Campos de paginação incremental incluídos nas respostas de log"""
+    fields = {"cursor": next_cursor}
+    if cursor is not None:
+        fields["dropped"] = dropped
+    return fields
+
+def build_access_query(filter_ip=None, filter_url=None, result_code=None, method=None,
+                       host=None, url_prefix=None, since=None, until=None, min_bytes=None,
+                       max_bytes=None, min_duration=None, max_duration=None):
+    """Monta o ``AccessLogQuery`` dos parâmetros de query; valor inválido vira 400"""
     try:
+        return AccessLogQuery(
+            client_ip=filter_ip,
+            result_code=result_code,
+            method=method,
+            host=host,
+            url_prefix=url_prefix,
+            url_contains=filter_url,
+            since=since,
+            until=until,
+            min_bytes=min_bytes,
+            max_bytes=max_bytes,
+            min_duration=min_duration,
+            max_duration=max_duration,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Filtro inválido: {str(e)}")
 
-        container_check = run_cmd("docker ps --filter name=squid --format '{{.Status}}'")
-        if container_check.returncode != 0 or "Up" not in container_check.stdout:
-            raise HTTPException(status_code=503, detail="Container do Squid não está rodando")
-        
+def cache_log_matcher(filter_level=None, filter_message=None):
+    """Filtro por nível e mensagem do cache.log (``None`` se não houver filtro)"""
+    level = filter_level.upper() if filter_level else None
+    if not (level or filter_message):
+        return None
+    
+    def matches(entry):
+        if "parse_error" in entry:
+            # Sem nível e mensagem separados: procura na linha inteira
+            raw = entry["raw_line"]
+            return (not level or level in raw.upper()) and (not filter_message or filter_message in raw)
+        if level and entry["level"].upper() != level:
+            return False
+        if filter_message and filter_message not in entry["message"]:
+            return False
+        return True
+    
+    return matches
 
-        cmd = f"docker exec squid tail -n {lines} /var/log/squid/access.log"
-        
+@app.get("/api/v1/squid/logs/access")
+def get_access_logs(
+    lines: int = 100,
+    filter_ip: str = None,
+    filter_url: str = None,
+    result_code: str = None,
+    method: str = None,
+    host: str = None,
+    url_prefix: str = None,
+    since: str = None,
+    until: str = None,
+    min_bytes: int = None,
+    max_bytes: int = None,
+    min_duration: int = None,
+    max_duration: int = None,
+    include_raw: bool = True,
+    cursor: str = None,
+):
+    """Obtém logs de acesso do Squid
 
-        if filter_ip:
-            cmd += f" | grep '{filter_ip}'"
-        if filter_url:
-            cmd += f" | grep '{filter_url}'"
+    Sem filtros retorna as últimas ``lines`` entradas; com filtros retorna as
+    ``lines`` entradas mais recentes que atendem a todos eles. ``filter_ip``
+    aceita IP ou CIDR e ``filter_url`` procura o texto apenas na URL.
+    ``include_raw=false`` omite ``raw_line`` de cada entrada. ``cursor``
+    (retornado pela consulta anterior) limita a resposta ao que foi gravado
+    depois dele.
+    """
+    try:
+        query = build_access_query(
+            filter_ip, filter_url, result_code, method, host, url_prefix,
+            since, until, min_bytes, max_bytes, min_duration, max_duration,
+        )
+        _check_cursor(cursor)
         
-        result = run_cmd(cmd)
+        if not access_log.available:
+            raise HTTPException(status_code=404, detail="Arquivo de log de acesso não encontrado")
         
-        if result.returncode != 0:
-            if "No such file or directory" in result.stderr:
-                raise HTTPException(status_code=404, detail="Arquivo de log de acesso não encontrado")
-            elif "Container" in result.stderr and "is not running" in result.stderr:
-                raise HTTPException(status_code=503, detail="Container do Squid não está rodando")
-            else:
-                raise HTTPException(status_code=500, detail=f"Erro ao ler logs: {result.stderr}")
-        
-
-        log_entries = []
-        for line in result.stdout.strip().split('\n'):
-            if line.strip():
-                try:
-
-                    parts = line.split()
-                    if len(parts) >= 7:
-                        log_entry = {
-                            "timestamp": f"{parts[0]} {parts[1]}",
-                            "duration": parts[2],
-                            "client_ip": parts[3],
-                            "result_code": parts[4],
-                            "bytes": parts[5],
-                            "method": parts[6],
-                            "url": parts[7] if len(parts) > 7 else "",
-                            "user": parts[8] if len(parts) > 8 else "",
-                            "hierarchy_code": parts[9] if len(parts) > 9 else "",
-                            "content_type": parts[10] if len(parts) > 10 else "",
-                            "raw_line": line
-                        }
-                        log_entries.append(log_entry)
-                    else:
-                        log_entries.append({"raw_line": line, "parse_error": "Formato inválido"})
-                except Exception as e:
-                    log_entries.append({"raw_line": line, "parse_error": str(e)})
+        filters = query.applied()
+        matches = query.matches if any(value is not None for value in filters.values()) else None
+        records, next_cursor, dropped = _fetch_entries(access_log, lines, cursor, matches, query.index_lookups())
         
-        return {
+        return JSONResponse({
             "status": "success",
             "log_type": "access",
             "lines_requested": lines,
-            "lines_returned": len(log_entries),
-            "filters_applied": {
-                "ip": filter_ip,
-                "url": filter_url
-            },
-            "logs": log_entries
-        }
+            "lines_returned": len(records),
+            "filters_applied": filters,
+            **_cursor_fields(cursor, next_cursor, dropped),
+            "logs": [record.to_dict(include_raw) for record in records]
+        })
         
     except HTTPException:
         raise
@@ -658,64 +1090,132 @@ def get_access_logs(lines: int = 100, filter_ip: str = None, filter_url: str = N
         logger.error(f"Erro ao obter logs de acesso: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@app.get("/api/v1/squid/logs/cache")
-def get_cache_logs(lines: int = 100, filter_level: str = None, filter_message: str = None):
-    """Obtém logs de cache do Squid"""
+@app.get("/api/v1/squid/logs/stats")
+def get_access_log_stats(lines: int = None, since: str = None, until: str = None):
+    """Estatísticas agregadas do log de acesso
+
+    Sem parâmetros retorna o resumo de todo o buffer em memória, mantido
+    incrementalmente. ``lines`` restringe às últimas entradas e ``since`` /
+    ``until`` a um intervalo de tempo.
+    """
+    if not access_log.available:
+        raise HTTPException(status_code=404, detail="Arquivo de log de acesso não encontrado")
+    
+    if lines is None and since is None and until is None:
+        stats = access_stats.snapshot()
+        oldest, newest = access_log.time_range()
+    else:
+        try:
+            query = AccessLogQuery(since=since, until=until)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Filtro inválido: {str(e)}")
+        
+        records = access_log.tail(lines if lines is not None else access_log.maxlen)
+        if since is not None or until is not None:
+            records = [record for record in records if query.matches(record)]
+        stats = AccessLogStats.from_records(records).snapshot()
+        timestamps = [record.ts for record in records if record.ts is not None]
+        oldest = min(timestamps) if timestamps else None
+        newest = max(timestamps) if timestamps else None
+    
+    return {
+        "status": "success",
+        "log_type": "access",
+        "window": {"from": oldest, "to": newest},
+        "stats": stats
+    }
+
+def _rollup_window(resolution, since, until):
+    """Valida a resolução e o intervalo das consultas de histórico"""
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Resolução inválida. Use: {', '.join(RESOLUTIONS)}")
+    step = RESOLUTIONS[resolution]
     try:
+        end = parse_time(until) if until is not None else time.time()
+        # Padrão: última hora por minuto ou últimos 7 dias por hora
+        start = parse_time(since) if since is not None else end - step * (60 if step < 3600 else 168)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Intervalo inválido: {str(e)}")
+    return step, start, end
 
-        container_check = run_cmd("docker ps --filter name=squid --format '{{.Status}}'")
-        if container_check.returncode != 0 or "Up" not in container_check.stdout:
-            raise HTTPException(status_code=503, detail="Container do Squid não está rodando")
-        
+@app.get("/api/v1/squid/rollups/timeseries")
+def get_traffic_timeseries(resolution: str = "minute", since: str = None, until: str = None,
+                           client: str = None, host: str = None):
+    """Série temporal do tráfego agregada por minuto ou por hora"""
+    step, start, end = _rollup_window(resolution, since, until)
+    return {
+        "status": "success",
+        "resolution": resolution,
+        "since": start,
+        "until": end,
+        "points": traffic_rollup.series(step, start, end, client=client, host=host)
+    }
 
-        cmd = f"docker exec squid tail -n {lines} /var/log/squid/cache.log"
-        
+@app.get("/api/v1/squid/rollups/top")
+def get_traffic_top(field: str = "hosts", resolution: str = "hour", since: str = None,
+                    until: str = None, limit: int = 10):
+    """Hosts ou clientes mais frequentes no intervalo (estimativa por sketch)"""
+    if field not in ("hosts", "clients"):
+        raise HTTPException(status_code=400, detail="Campo inválido. Use: hosts, clients")
+    step, start, end = _rollup_window(resolution, since, until)
+    return {
+        "status": "success",
+        "field": field,
+        "resolution": resolution,
+        "since": start,
+        "until": end,
+        "top": traffic_rollup.top(field, step, start, end, limit=limit)
+    }
 
-        if filter_level:
-            cmd += f" | grep '{filter_level.upper()}'"
-        if filter_message:
-            cmd += f" | grep '{filter_message}'"
-        
-        result = run_cmd(cmd)
+def _parse_quantiles(quantiles):
+    if quantiles is None:
+        return DEFAULT_QUANTILES
+    try:
+        values = tuple(float(value) for value in quantiles.split(",") if value.strip())
+    except ValueError:
+        values = ()
+    if not values or any(not 0 <= value <= 1 for value in values):
+        raise HTTPException(status_code=400, detail="quantiles deve ser uma lista de valores entre 0 e 1")
+    return values
+
+@app.get("/api/v1/squid/traffic/quantiles")
+def get_traffic_quantiles(group: str = "result", key: str = None, limit: int = 50, quantiles: str = None):
+    """Percentis de duração e bytes por classe de resultado, cliente ou host
+
+    Acumulados desde o início da API a partir do access.log. ``key`` restringe
+    a uma classe, IP ou host; ``quantiles`` é uma lista como ``0.5,0.95,0.99``.
+    """
+    if group not in TrafficQuantiles.GROUPS:
+        raise HTTPException(status_code=400, detail=f"Grupo inválido. Use: {', '.join(TrafficQuantiles.GROUPS)}")
+    return {
+        "status": "success",
+        "group": group,
+        "groups": traffic_quantiles.groups(group, _parse_quantiles(quantiles), limit=limit, key=key)
+    }
+
+@app.get("/api/v1/squid/traffic/series")
+def get_traffic_series(minutes: int = 60, quantiles: str = None):
+    """Requisições, taxa de acerto do cache e percentis de duração por minuto"""
+    if minutes < 1 or minutes > QUANTILE_RETENTION_MINUTES:
+        raise HTTPException(status_code=400, detail=f"minutes deve estar entre 1 e {QUANTILE_RETENTION_MINUTES}")
+    points, total = traffic_quantiles.series(minutes, _parse_quantiles(quantiles))
+    return {
+        "status": "success",
+        "minutes": minutes,
+        "total": total,
+        "points": points
+    }
+
+@app.get("/api/v1/squid/logs/cache")
+def get_cache_logs(lines: int = 100, filter_level: str = None, filter_message: str = None, cursor: str = None):
+    """Obtém logs de cache do Squid (``cursor``: só o que veio depois dele)"""
+    try:
+        _check_cursor(cursor)
+        if not cache_log.available:
+            raise HTTPException(status_code=404, detail="Arquivo de log de cache não encontrado")
         
-        if result.returncode != 0:
-            if "No such file or directory" in result.stderr:
-                raise HTTPException(status_code=404, detail="Arquivo de log de cache não encontrado")
-            elif "Container" in result.stderr and "is not running" in result.stderr:
-                raise HTTPException(status_code=503, detail="Container do Squid não está rodando")
-            else:
-                raise HTTPException(status_code=500, detail=f"Erro ao ler logs: {result.stderr}")
-        
-        log_entries = []
-        for line in result.stdout.strip().split('\n'):
-            if line.strip():
-                try:
-                    if '|' in line:
-                        parts = line.split('|', 2)
-                        if len(parts) >= 3:
-                            log_entry = {
-                                "timestamp": parts[0].strip(),
-                                "level": parts[1].strip(),
-                                "message": parts[2].strip(),
-                                "raw_line": line
-                            }
-                        else:
-                            log_entry = {"raw_line": line, "parse_error": "Formato inválido"}
-                    else:
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            log_entry = {
-                                "timestamp": f"{parts[0]} {parts[1]}",
-                                "level": parts[2] if len(parts) > 2 else "INFO",
-                                "message": " ".join(parts[3:]) if len(parts) > 3 else "",
-                                "raw_line": line
-                            }
-                        else:
-                            log_entry = {"raw_line": line, "parse_error": "Formato inválido"}
-                    
-                    log_entries.append(log_entry)
-                except Exception as e:
-                    log_entries.append({"raw_line": line, "parse_error": str(e)})
+        matches = cache_log_matcher(filter_level, filter_message)
+        log_entries, next_cursor, dropped = _fetch_entries(cache_log, lines, cursor, matches)
         
         return {
             "status": "success",
@@ -726,6 +1226,7 @@ def get_cache_logs(lines: int = 100, filter_level: str = None, filter_message: s
                 "level": filter_level,
                 "message": filter_message
             },
+            **_cursor_fields(cursor, next_cursor, dropped),
             "logs": log_entries
         }
         
@@ -735,25 +1236,81 @@ def get_cache_logs(lines: int = 100, filter_level: str = None, filter_message: s
         logger.error(f"Erro ao obter logs de cache: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
+def _stream_start(follower, request: Request, cursor, lines):
+    """Posição inicial da transmissão: ``Last-Event-ID``, ``cursor`` ou últimas ``lines``"""
+    cursor = request.headers.get("last-event-id") or cursor
+    if cursor is not None:
+        _check_cursor(cursor)
+        return cursor
+    return follower.position(lines)
+
+@app.get("/api/v1/squid/logs/stream/access")
+async def stream_access_logs(
+    request: Request,
+    lines: int = 0,
+    cursor: str = None,
+    filter_ip: str = None,
+    filter_url: str = None,
+    result_code: str = None,
+    method: str = None,
+    host: str = None,
+    url_prefix: str = None,
+    since: str = None,
+    until: str = None,
+    min_bytes: int = None,
+    max_bytes: int = None,
+    min_duration: int = None,
+    max_duration: int = None,
+    include_raw: bool = True,
+):
+    """Transmite (SSE) as entradas novas do log de acesso, com os mesmos filtros de ``/logs/access``
+
+    ``lines`` inclui antes as últimas N entradas; ``cursor`` (ou o cabeçalho
+    ``Last-Event-ID``) retoma logo depois da entrada indicada.
+    """
+    query = build_access_query(
+        filter_ip, filter_url, result_code, method, host, url_prefix,
+        since, until, min_bytes, max_bytes, min_duration, max_duration,
+    )
+    filters = query.applied()
+    matches = query.matches if any(value is not None for value in filters.values()) else None
+    start = _stream_start(access_log, request, cursor, lines)
+    
+    return StreamingResponse(
+        stream_entries(access_log, start, lambda record: record.to_dict(include_raw), matches),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+@app.get("/api/v1/squid/logs/stream/cache")
+async def stream_cache_logs(request: Request, lines: int = 0, cursor: str = None,
+                            filter_level: str = None, filter_message: str = None):
+    """Transmite (SSE) as entradas novas do log de cache"""
+    start = _stream_start(cache_log, request, cursor, lines)
+    
+    return StreamingResponse(
+        stream_entries(cache_log, start, lambda entry: entry, cache_log_matcher(filter_level, filter_message)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
 @app.get("/api/v1/squid/logs/raw/access")
-def get_raw_access_logs(lines: int = 100):
+def get_raw_access_logs(lines: int = 100, cursor: str = None):
     """Obtém logs de acesso brutos (sem parsing)"""
     try:
-        cmd = f"docker exec squid tail -n {lines} /var/log/squid/access.log"
-        result = run_cmd(cmd)
-        
-        if result.returncode != 0:
-            if "No such file or directory" in result.stderr:
-                raise HTTPException(status_code=404, detail="Arquivo de log de acesso não encontrado")
-            else:
-                raise HTTPException(status_code=500, detail=f"Erro ao ler logs: {result.stderr}")
+        _check_cursor(cursor)
+        if not access_log.available:
+            raise HTTPException(status_code=404, detail="Arquivo de log de acesso não encontrado")
+        entries, next_cursor, dropped = _fetch_entries(access_log, lines, cursor)
+        raw_logs = [record.raw_line for record in entries]
         
         return {
             "status": "success",
             "log_type": "access_raw",
             "lines_requested": lines,
-            "lines_returned": len(result.stdout.strip().split('\n')),
-            "raw_logs": result.stdout.strip().split('\n')
+            "lines_returned": len(raw_logs),
+            **_cursor_fields(cursor, next_cursor, dropped),
+            "raw_logs": raw_logs
         }
         
     except HTTPException:
@@ -763,24 +1320,22 @@ def get_raw_access_logs(lines: int = 100):
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 @app.get("/api/v1/squid/logs/raw/cache")
-def get_raw_cache_logs(lines: int = 100):
+def get_raw_cache_logs(lines: int = 100, cursor: str = None):
     """Obtém logs de cache brutos (sem parsing)"""
     try:
-        cmd = f"docker exec squid tail -n {lines} /var/log/squid/cache.log"
-        result = run_cmd(cmd)
-        
-        if result.returncode != 0:
-            if "No such file or directory" in result.stderr:
-                raise HTTPException(status_code=404, detail="Arquivo de log de cache não encontrado")
-            else:
-                raise HTTPException(status_code=500, detail=f"Erro ao ler logs: {result.stderr}")
+        _check_cursor(cursor)
+        if not cache_log.available:
+            raise HTTPException(status_code=404, detail="Arquivo de log de cache não encontrado")
+        entries, next_cursor, dropped = _fetch_entries(cache_log, lines, cursor)
+        raw_logs = [entry["raw_line"] for entry in entries]
         
         return {
             "status": "success",
             "log_type": "cache_raw",
             "lines_requested": lines,
-            "lines_returned": len(result.stdout.strip().split('\n')),
-            "raw_logs": result.stdout.strip().split('\n')
+            "lines_returned": len(raw_logs),
+            **_cursor_fields(cursor, next_cursor, dropped),
+            "raw_logs": raw_logs
         }
         
     except HTTPException:
@@ -788,3 +1343,141 @@ def get_raw_cache_logs(lines: int = 100):
     except Exception as e:
         logger.error(f"Erro ao obter logs brutos de cache: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+def _read_history(follower, limit, page, since, until, matches=None):
+    """Página do histórico lida direto do arquivo; erros viram 400/404/410"""
+    if limit < 1 or limit > LOG_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit deve estar entre 1 e {LOG_PAGE_MAX}")
+    if page is not None and not valid_cursor(page):
+        raise HTTPException(status_code=400, detail="Página inválida. Formato: <inode>:<offset>")
+    if not os.path.exists(follower.path):
+        raise HTTPException(status_code=404, detail="Arquivo de log não encontrado")
+    try:
+        return read_page(follower.path, follower.parse, limit, page, since, until, matches)
+    except PageExpired:
+        raise HTTPException(status_code=410, detail="O arquivo de log foi rotacionado; recomece sem page")
+
+@app.get("/api/v1/squid/logs/history/access")
+def get_access_log_history(
+    limit: int = 1000,
+    page: str = None,
+    filter_ip: str = None,
+    filter_url: str = None,
+    result_code: str = None,
+    method: str = None,
+    host: str = None,
+    url_prefix: str = None,
+    since: str = None,
+    until: str = None,
+    min_bytes: int = None,
+    max_bytes: int = None,
+    min_duration: int = None,
+    max_duration: int = None,
+    include_raw: bool = True,
+):
+    """Histórico do log de acesso lido do arquivo, uma página por vez
+
+    Percorre o arquivo do fim para o começo, então alcança entradas que já
+    saíram do buffer em memória. ``since``/``until`` são localizados por busca
+    binária no arquivo. A resposta traz no máximo ``limit`` entradas e
+    ``next_page``, que passado em ``page`` retorna as anteriores.
+    """
+    query = build_access_query(
+        filter_ip, filter_url, result_code, method, host, url_prefix,
+        since, until, min_bytes, max_bytes, min_duration, max_duration,
+    )
+    filters = query.applied()
+    matches = query.matches if any(value is not None for value in filters.values()) else None
+    
+    try:
+        records, next_page = _read_history(access_log, limit, page, query.since, query.until, matches)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao ler histórico de acesso: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+    
+    return JSONResponse({
+        "status": "success",
+        "log_type": "access",
+        "lines_returned": len(records),
+        "filters_applied": filters,
+        "next_page": next_page,
+        "logs": [record.to_dict(include_raw) for record in records]
+    })
+
+@app.get("/api/v1/squid/logs/history/cache")
+def get_cache_log_history(limit: int = 1000, page: str = None, since: str = None, until: str = None,
+                          filter_level: str = None, filter_message: str = None):
+    """Histórico do cache.log lido do arquivo, uma página por vez"""
+    try:
+        since_ts = parse_time(since) if since is not None else None
+        until_ts = parse_time(until) if until is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Filtro inválido: {str(e)}")
+    
+    try:
+        entries, next_page = _read_history(cache_log, limit, page, since_ts, until_ts,
+                                           cache_log_matcher(filter_level, filter_message))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao ler histórico de cache: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+    
+    return {
+        "status": "success",
+        "log_type": "cache",
+        "lines_returned": len(entries),
+        "next_page": next_page,
+        "logs": entries
+    }
+
+@app.get("/api/v1/squid/logs/archive/access")
+async def search_access_log_archive(
+    limit: int = 1000,
+    filter_ip: str = None,
+    filter_url: str = None,
+    result_code: str = None,
+    method: str = None,
+    host: str = None,
+    url_prefix: str = None,
+    since: str = None,
+    until: str = None,
+    min_bytes: int = None,
+    max_bytes: int = None,
+    min_duration: int = None,
+    max_duration: int = None,
+    include_raw: bool = True,
+):
+    """Busca no access.log atual e nos rotacionados (``access.log.N``, ``.gz``)
+
+    Os arquivos são varridos em paralelo em processos separados, com os mesmos
+    filtros de ``/logs/access``; retorna as ``limit`` entradas mais recentes
+    que atendem a todos eles. Arquivos fora do intervalo ``since``/``until``
+    ou sem o cliente pedido são pulados pelo índice lateral.
+    """
+    if limit < 1 or limit > LOG_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit deve estar entre 1 e {LOG_PAGE_MAX}")
+    query = build_access_query(
+        filter_ip, filter_url, result_code, method, host, url_prefix,
+        since, until, min_bytes, max_bytes, min_duration, max_duration,
+    )
+    
+    try:
+        records, files = await access_archive.search(query, limit)
+    except Exception as e:
+        logger.error(f"Erro ao buscar no histórico de acesso: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+    
+    if not files:
+        raise HTTPException(status_code=404, detail="Arquivo de log de acesso não encontrado")
+    
+    return JSONResponse({
+        "status": "success",
+        "log_type": "access",
+        "lines_returned": len(records),
+        "filters_applied": query.applied(),
+        "files": files,
+        "logs": [record.to_dict(include_raw) for record in records]
+    })
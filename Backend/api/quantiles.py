@@ -0,0 +1,299 @@
+"""Percentis de latência e tamanho e taxa de acerto do cache a partir do access.log.
+
+``QuantileSketch`` é um histograma de buckets logarítmicos (no estilo do
+DDSketch): cada valor cai no bucket ``ceil(log(v) / log(gamma))`` e o percentil
+estimado tem erro relativo de no máximo ``accuracy``. A quantidade de buckets
+é limitada; passando do limite, os buckets dos menores valores são fundidos,
+o que preserva a precisão dos percentis altos (p95, p99).
+
+``TrafficQuantiles`` é registrado como observador do ``LogFollower`` do
+access.log e mantém, com memória constante:
+
+- duração e bytes por classe de resultado (``TCP_HIT``, ``TCP_MISS``, ...);
+- duração e bytes por cliente e por host de destino, para no máximo
+  ``max_keys`` chaves de cada (as usadas há mais tempo são descartadas);
+- uma série por minuto das últimas ``retention_minutes`` com requisições,
+  acertos do cache e percentis de duração.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from log_query import url_host
+
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+# Classes de resultado: 1% de erro. Clientes, hosts e minutos são muitos
+# sketches, então usam 5%; com 128 buckets ainda cobrem valores de 1 a ~10^5
+# vezes o menor sem fundir buckets.
+CLASS_ACCURACY, CLASS_BINS = 0.01, 1024
+KEY_ACCURACY, KEY_BINS = 0.05, 128
+
+# Classes que não passam pelo cache e ficam fora da taxa de acerto
+UNCACHEABLE_CLASSES = ("TCP_DENIED", "TCP_TUNNEL", "NONE")
+
+
+class QuantileSketch:
+    """Percentis aproximados com erro relativo ``accuracy`` e no máximo ``max_bins`` buckets"""
+
+    __slots__ = ("accuracy", "max_bins", "_log_gamma", "_scale", "_bins", "zero_count", "count",
+                 "sum", "min", "max")
+
+    def __init__(self, accuracy=0.01, max_bins=1024):
+        self.accuracy = accuracy
+        self.max_bins = max_bins
+        self._log_gamma = math.log((1 + accuracy) / (1 - accuracy))
+        self._scale = 1 / self._log_gamma
+        self._bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, count=1):
+        if value < 0:
+            return
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value == 0:
+            self.zero_count += count
+            return
+        key = math.ceil(math.log(value) * self._scale)
+        bins = self._bins
+        bins[key] = bins.get(key, 0) + count
+        if len(bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        """Funde os buckets dos menores valores até voltar ao limite"""
+        keys = sorted(self._bins)
+        excess = len(keys) - self.max_bins
+        target = keys[excess]
+        for key in keys[:excess]:
+            self._bins[target] += self._bins.pop(key)
+
+    def merge(self, other: "QuantileSketch"):
+        self.count += other.count
+        self.sum += other.sum
+        self.zero_count += other.zero_count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for key, count in other._bins.items():
+            self._bins[key] = self._bins.get(key, 0) + count
+        if len(self._bins) > self.max_bins:
+            self._collapse()
+
+    def quantile(self, q) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        gamma = math.exp(self._log_gamma)
+        for key in sorted(self._bins):
+            seen += self._bins[key]
+            if rank < seen:
+                # Ponto do bucket com o menor erro relativo
+                value = 2 * gamma ** key / (gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self, quantiles: Iterable[float] = DEFAULT_QUANTILES):
+        if self.count == 0:
+            return {"count": 0}
+        result = {
+            "count": self.count,
+            "mean": self.sum / self.count,
+            "min": self.min,
+            "max": self.max,
+        }
+        for q in quantiles:
+            result[f"p{q * 100:g}"] = self.quantile(q)
+        return result
+
+
+def result_class(result_code):
+    """``TCP_MISS/200`` -> ``TCP_MISS``"""
+    return result_code.partition("/")[0]
+
+
+def is_cache_hit(code_class):
+    return "HIT" in code_class
+
+
+class TrafficSketch:
+    """Duração (ms) e bytes de um grupo de requisições"""
+
+    __slots__ = ("duration", "bytes")
+
+    def __init__(self, accuracy=CLASS_ACCURACY, max_bins=CLASS_BINS):
+        self.duration = QuantileSketch(accuracy, max_bins)
+        self.bytes = QuantileSketch(accuracy, max_bins)
+
+    def add(self, record):
+        if isinstance(record.duration, int):
+            self.duration.add(record.duration)
+        if isinstance(record.bytes, int):
+            self.bytes.add(record.bytes)
+
+    def summary(self, quantiles=DEFAULT_QUANTILES):
+        return {
+            "requests": max(self.duration.count, self.bytes.count),
+            "duration_ms": self.duration.summary(quantiles),
+            "bytes": self.bytes.summary(quantiles),
+        }
+
+
+class MinuteStats:
+    __slots__ = ("requests", "cacheable", "hits", "cacheable_bytes", "hit_bytes", "duration")
+
+    def __init__(self):
+        self.requests = 0
+        self.cacheable = 0
+        self.hits = 0
+        self.cacheable_bytes = 0
+        self.hit_bytes = 0
+        self.duration = QuantileSketch(KEY_ACCURACY, KEY_BINS)
+
+    def add(self, record, code_class):
+        self.requests += 1
+        size = record.bytes if isinstance(record.bytes, int) else 0
+        if code_class not in UNCACHEABLE_CLASSES:
+            self.cacheable += 1
+            self.cacheable_bytes += size
+            if is_cache_hit(code_class):
+                self.hits += 1
+                self.hit_bytes += size
+        if isinstance(record.duration, int):
+            self.duration.add(record.duration)
+
+    def merge(self, other: "MinuteStats"):
+        self.requests += other.requests
+        self.cacheable += other.cacheable
+        self.hits += other.hits
+        self.cacheable_bytes += other.cacheable_bytes
+        self.hit_bytes += other.hit_bytes
+        self.duration.merge(other.duration)
+
+    def summary(self, quantiles=DEFAULT_QUANTILES):
+        duration = self.duration.summary(quantiles)
+        duration.pop("count", None)
+        return {
+            "requests": self.requests,
+            "cache_hit_ratio": self.hits / self.cacheable if self.cacheable else None,
+            "byte_hit_ratio": self.hit_bytes / self.cacheable_bytes if self.cacheable_bytes else None,
+            "duration_ms": duration,
+        }
+
+
+class TrafficQuantiles:
+    """Observador do access.log com percentis por grupo e série por minuto"""
+
+    GROUPS = ("result", "client", "host")
+
+    def __init__(self, max_keys=500, retention_minutes=180):
+        self.max_keys = max_keys
+        self.retention_minutes = retention_minutes
+        self._lock = threading.Lock()
+        self._groups: Dict[str, "OrderedDict[str, TrafficSketch]"] = {
+            group: OrderedDict() for group in self.GROUPS
+        }
+        self._minutes: Dict[int, MinuteStats] = {}
+        self._newest_minute = None
+
+    def _sketch(self, group, key):
+        sketches = self._groups[group]
+        sketch = sketches.get(key)
+        if sketch is None:
+            # Classes de resultado são poucas; clientes e hosts são limitados
+            if group != "result" and len(sketches) >= self.max_keys:
+                sketches.popitem(last=False)
+            sketch = sketches[key] = (TrafficSketch() if group == "result"
+                                      else TrafficSketch(KEY_ACCURACY, KEY_BINS))
+        else:
+            sketches.move_to_end(key)
+        return sketch
+
+    def add(self, record):
+        if record.parse_error:
+            return
+        code_class = result_class(record.result_code)
+        with self._lock:
+            self._sketch("result", code_class).add(record)
+            self._sketch("client", record.client_ip).add(record)
+            self._sketch("host", url_host(record.url) or "-").add(record)
+
+            if record.ts is None:
+                return
+            minute = int(record.ts // 60) * 60
+            if self._newest_minute is not None and minute <= self._newest_minute - self.retention_minutes * 60:
+                return
+            stats = self._minutes.get(minute)
+            if stats is None:
+                stats = self._minutes[minute] = MinuteStats()
+                if self._newest_minute is None or minute > self._newest_minute:
+                    self._newest_minute = minute
+                    oldest = minute - self.retention_minutes * 60
+                    for old in [m for m in self._minutes if m <= oldest]:
+                        del self._minutes[old]
+            stats.add(record, code_class)
+
+    def discard(self, record):
+        """Os percentis são acumulados desde o início da API; nada a remover"""
+
+    def groups(self, group, quantiles=DEFAULT_QUANTILES, limit=None, key=None):
+        """Resumo por chave de ``group``, das chaves com mais requisições para as com menos"""
+        with self._lock:
+            sketches = self._groups[group]
+            if key is not None:
+                items = [(key, sketches[key].summary(quantiles))] if key in sketches else []
+            else:
+                items = [(name, sketch.summary(quantiles)) for name, sketch in sketches.items()]
+        items.sort(key=lambda item: item[1]["requests"], reverse=True)
+        if limit is not None:
+            items = items[:limit]
+        return [{"key": name, **summary} for name, summary in items]
+
+    def series(self, minutes=60, quantiles=DEFAULT_QUANTILES):
+        """Últimos ``minutes`` minutos e o total do período"""
+        with self._lock:
+            if self._newest_minute is None:
+                return [], MinuteStats().summary(quantiles)
+            since = self._newest_minute - (minutes - 1) * 60
+            selected = sorted((m, stats) for m, stats in self._minutes.items() if m >= since)
+            total = MinuteStats()
+            points = []
+            for minute, stats in selected:
+                total.merge(stats)
+                points.append({"minute": minute, **stats.summary(quantiles)})
+        return points, total.summary(quantiles)
+
+    def class_metrics(self, quantiles=DEFAULT_QUANTILES):
+        """Amostras ``((classe, quantil), valor)`` de duração e bytes para o /metrics"""
+        with self._lock:
+            snapshot = [(name, sketch.duration.summary(quantiles), sketch.bytes.summary(quantiles))
+                        for name, sketch in self._groups["result"].items()]
+        duration, size, requests = [], [], []
+        for name, duration_summary, bytes_summary in snapshot:
+            requests.append(((name,), max(duration_summary["count"], bytes_summary["count"])))
+            for q in quantiles:
+                label = f"{q:g}"
+                if duration_summary["count"]:
+                    duration.append(((name, label), duration_summary[f"p{q * 100:g}"]))
+                if bytes_summary["count"]:
+                    size.append(((name, label), bytes_summary[f"p{q * 100:g}"]))
+        return duration, size, requests
+
+    def hit_ratio(self, minutes=5):
+        """Taxa de acerto do cache (requisições) nos últimos ``minutes`` minutos"""
+        _, total = self.series(minutes, quantiles=())
+        return total["cache_hit_ratio"]
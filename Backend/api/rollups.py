@@ -0,0 +1,418 @@
+"""Agregados históricos do access.log em buckets de tempo (SQLite).
+
+``TrafficRollup`` é observador do ``LogFollower`` do access.log: cada
+entrada soma no bucket do minuto e da hora a que pertence (requisições,
+bytes, HIT/MISS/DENIED, erros, duração) e alimenta dois sketches
+Space-Saving de tamanho fixo com os hosts e os clientes mais frequentes.
+Os buckets alterados ficam em memória e são gravados periodicamente no
+SQLite; as consultas de séries temporais leem só as linhas do intervalo.
+
+Na reinicialização o follower relê o final do log; entradas com horário até
+a marca d'água gravada junto com os buckets na execução anterior já foram
+contadas e são ignoradas.
+
+Com vários workers do uvicorn cada um segue o access.log, mas só um grava:
+ao iniciar, o worker tenta um ``flock`` exclusivo em ``<ROLLUP_DB>.lock`` e
+quem o obtém é o líder. Os demais só consultam o banco e tentam assumir o
+lock a cada ``flush_interval``; se o líder sair, o novo retoma a partir da
+marca d'água gravada (o que o anterior não chegou a gravar fica de fora).
+"""
+
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from log_query import result_status, url_host
+
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+HOUR = 3600
+RESOLUTIONS = {"minute": MINUTE, "hour": HOUR}
+
+
+class SpaceSaving:
+    """Sketch Space-Saving: mantém no máximo ``capacity`` chaves mais frequentes
+
+    Quando cheio, a chave de menor contagem é substituída e a nova herda essa
+    contagem como erro máximo; ``count - error`` é um limite inferior exato.
+    """
+
+    __slots__ = ("capacity", "counts", "errors")
+
+    def __init__(self, capacity, counts=None, errors=None):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = counts or {}
+        self.errors: Dict[str, int] = errors or {}
+
+    def offer(self, key, count=1):
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+            return
+        if len(counts) < self.capacity:
+            counts[key] = count
+            self.errors[key] = 0
+            return
+        victim = min(counts, key=counts.get)
+        floor = counts.pop(victim)
+        self.errors.pop(victim, None)
+        counts[key] = floor + count
+        self.errors[key] = floor
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            if key in self.counts:
+                self.counts[key] += count
+                self.errors[key] = self.errors.get(key, 0) + other.errors.get(key, 0)
+            else:
+                self.counts[key] = count
+                self.errors[key] = other.errors.get(key, 0)
+        if len(self.counts) > self.capacity:
+            keep = sorted(self.counts, key=self.counts.get, reverse=True)[:self.capacity]
+            self.counts = {key: self.counts[key] for key in keep}
+            self.errors = {key: self.errors[key] for key in keep}
+
+    def top(self, limit=None):
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return [
+            {"key": key, "count": count, "error": self.errors.get(key, 0)}
+            for key, count in ranked[:limit]
+        ]
+
+    def dumps(self):
+        return json.dumps([[key, count, self.errors.get(key, 0)] for key, count in self.counts.items()])
+
+    @classmethod
+    def loads(cls, capacity, data):
+        sketch = cls(capacity)
+        for key, count, error in json.loads(data) if data else ():
+            sketch.counts[key] = count
+            sketch.errors[key] = error
+        return sketch
+
+
+class Bucket:
+    """Contadores de um intervalo de ``resolution`` segundos a partir de ``start``"""
+
+    __slots__ = ("requests", "bytes", "hits", "misses", "denied", "errors",
+                 "duration_sum", "hosts", "clients")
+
+    def __init__(self, sketch_size):
+        self.requests = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.denied = 0
+        self.errors = 0
+        self.duration_sum = 0
+        self.hosts = SpaceSaving(sketch_size)
+        self.clients = SpaceSaving(sketch_size)
+
+    def add(self, record, host):
+        self.requests += 1
+        if isinstance(record.bytes, int):
+            self.bytes += record.bytes
+        if isinstance(record.duration, int):
+            self.duration_sum += record.duration
+
+        code = record.result_code
+        if "DENIED" in code:
+            self.denied += 1
+        elif "HIT" in code:
+            self.hits += 1
+        elif "MISS" in code:
+            self.misses += 1
+        if result_status(code)[:1] in ("4", "5"):
+            self.errors += 1
+
+        self.hosts.offer(host)
+        self.clients.offer(record.client_ip)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    resolution INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    requests INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    hits INTEGER NOT NULL,
+    misses INTEGER NOT NULL,
+    denied INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    duration_sum INTEGER NOT NULL,
+    top_hosts TEXT NOT NULL,
+    top_clients TEXT NOT NULL,
+    PRIMARY KEY (resolution, start)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_COLUMNS = "requests, bytes, hits, misses, denied, errors, duration_sum, top_hosts, top_clients"
+
+
+class TrafficRollup:
+    """Buckets por minuto e por hora do tráfego do proxy, persistidos em SQLite"""
+
+    def __init__(self, path, sketch_size=50, flush_interval=5.0,
+                 retention: Optional[Dict[int, int]] = None):
+        self.path = path
+        self.sketch_size = sketch_size
+        self.flush_interval = flush_interval
+        # Segundos de histórico mantidos por resolução
+        self.retention = retention or {MINUTE: 7 * 86400, HOUR: 365 * 86400}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._buckets: Dict[Tuple[int, int], Bucket] = {}
+        self._dirty = set()
+        self._watermark = None
+        self._resume_after = None
+        self._newest = None
+        self.lock_path = path + ".lock"
+        self._lock_fd = None
+        # Outro worker é o líder: as entradas são ignoradas e nada é gravado
+        self._follower = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def open(self):
+        if self._db is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(_SCHEMA)
+        self._db = db
+        self._resume()
+
+    def _resume(self):
+        """Retoma a partir da marca d'água gravada no banco"""
+        with self._db_lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+        with self._lock:
+            self._buckets.clear()
+            self._dirty.clear()
+            self._watermark = float(row[0]) if row else None
+            self._resume_after = self._watermark
+            self._newest = self._watermark
+
+    def close(self):
+        if self._db is None:
+            return
+        self.flush()
+        with self._db_lock:
+            self._db.close()
+            self._db = None
+
+    @property
+    def leader(self):
+        """True se este processo grava os agregados"""
+        return not self._follower
+
+    def _try_lead(self):
+        """Tenta o ``flock`` de gravação sem bloquear; retorna True se obteve"""
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def _release(self):
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def start(self):
+        self.open()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._follower = not self._try_lead()
+        if self._follower:
+            logger.info("Agregados do tráfego gravados por outro worker")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="traffic-rollup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 2)
+        self.close()
+        self._release()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                if self._follower:
+                    if not self._try_lead():
+                        continue
+                    self._resume()
+                    self._follower = False
+                    logger.info("Este worker passou a gravar os agregados do tráfego")
+                self.flush()
+                self.prune()
+            except Exception as e:
+                logger.error(f"Erro ao gravar agregados do tráfego: {str(e)}")
+
+    # Observador do LogFollower
+
+    def add(self, record):
+        ts = record.ts
+        if ts is None or record.parse_error:
+            return
+        with self._lock:
+            if self._follower:
+                return
+            if self._resume_after is not None and ts <= self._resume_after:
+                return
+            host = url_host(record.url)
+            for resolution in (MINUTE, HOUR):
+                self._bucket(resolution, int(ts) // resolution * resolution).add(record, host)
+            if self._newest is None or ts > self._newest:
+                self._newest = ts
+
+    def discard(self, record):
+        """Saída do buffer em memória não altera o histórico"""
+
+    def _bucket(self, resolution, start):
+        key = (resolution, start)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._load(resolution, start) if self._persisted(start) else None
+            if bucket is None:
+                bucket = Bucket(self.sketch_size)
+            self._buckets[key] = bucket
+        self._dirty.add(key)
+        return bucket
+
+    def _persisted(self, start):
+        return self._db is not None and self._watermark is not None and start <= self._watermark
+
+    def _load(self, resolution, start):
+        with self._db_lock:
+            row = self._db.execute(
+                f"SELECT {_COLUMNS} FROM buckets WHERE resolution = ? AND start = ?",
+                (resolution, start),
+            ).fetchone()
+        return self._from_row(row) if row else None
+
+    def _from_row(self, row):
+        bucket = Bucket(self.sketch_size)
+        (bucket.requests, bucket.bytes, bucket.hits, bucket.misses, bucket.denied,
+         bucket.errors, bucket.duration_sum, hosts, clients) = row
+        bucket.hosts = SpaceSaving.loads(self.sketch_size, hosts)
+        bucket.clients = SpaceSaving.loads(self.sketch_size, clients)
+        return bucket
+
+    # Persistência
+
+    def flush(self):
+        """Grava os buckets alterados e a marca d'água numa única transação"""
+        if self._db is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            rows = []
+            for resolution, start in self._dirty:
+                bucket = self._buckets[(resolution, start)]
+                rows.append((
+                    resolution, start, bucket.requests, bucket.bytes, bucket.hits,
+                    bucket.misses, bucket.denied, bucket.errors, bucket.duration_sum,
+                    bucket.hosts.dumps(), bucket.clients.dumps(),
+                ))
+            self._dirty.clear()
+            watermark = self._newest
+            self._watermark = watermark
+            # Mantém em memória só os buckets que ainda podem receber entradas
+            for key in [key for key in self._buckets if key[1] + key[0] * 2 < watermark]:
+                del self._buckets[key]
+
+        with self._db_lock:
+            with self._db:
+                self._db.executemany(
+                    f"INSERT OR REPLACE INTO buckets (resolution, start, {_COLUMNS}) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('watermark', ?)",
+                    (repr(watermark),),
+                )
+
+    def prune(self, now=None):
+        """Remove buckets mais antigos que a retenção de cada resolução"""
+        if self._db is None:
+            return
+        now = now if now is not None else time.time()
+        with self._db_lock:
+            with self._db:
+                for resolution, seconds in self.retention.items():
+                    self._db.execute(
+                        "DELETE FROM buckets WHERE resolution = ? AND start < ?",
+                        (resolution, int(now - seconds)),
+                    )
+
+    # Consultas
+
+    def _rows(self, resolution, since, until):
+        self.flush()
+        with self._db_lock:
+            return self._db.execute(
+                f"SELECT start, {_COLUMNS} FROM buckets "
+                "WHERE resolution = ? AND start >= ? AND start <= ? ORDER BY start",
+                (resolution, int(since) // resolution * resolution, int(until)),
+            ).fetchall()
+
+    def series(self, resolution, since, until, client=None, host=None) -> List[Dict]:
+        """Pontos da série temporal entre ``since`` e ``until`` (epoch)
+
+        Com ``client`` ou ``host`` cada ponto traz também a contagem estimada
+        daquela chave no bucket (0 se ela não estiver entre as mais frequentes).
+        """
+        points = []
+        for row in self._rows(resolution, since, until):
+            start = row[0]
+            bucket = self._from_row(row[1:])
+            lookups = bucket.hits + bucket.misses
+            point = {
+                "start": start,
+                "requests": bucket.requests,
+                "bytes": bucket.bytes,
+                "hits": bucket.hits,
+                "misses": bucket.misses,
+                "denied": bucket.denied,
+                "errors": bucket.errors,
+                "hit_ratio": bucket.hits / lookups if lookups else None,
+                "avg_duration_ms": bucket.duration_sum / bucket.requests if bucket.requests else 0,
+            }
+            if client is not None:
+                point["client_requests"] = bucket.clients.counts.get(client, 0)
+            if host is not None:
+                point["host_requests"] = bucket.hosts.counts.get(host.lower(), 0)
+            points.append(point)
+        return points
+
+    def top(self, field, resolution, since, until, limit=10) -> List[Dict]:
+        """Hosts (``hosts``) ou clientes (``clients``) mais frequentes no intervalo"""
+        merged = SpaceSaving(self.sketch_size)
+        for row in self._rows(resolution, since, until):
+            merged.merge(getattr(self._from_row(row[1:]), field))
+        return merged.top(limit)
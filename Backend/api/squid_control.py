@@ -0,0 +1,159 @@
+"""Controle assíncrono do container do Squid.
+
+Start, stop, restart e reconfigure rodam como corrotinas: as chamadas à
+Docker Engine API vão para threads (``asyncio.to_thread``) e, em vez de
+esperar um tempo fixo depois de iniciar ou reiniciar, a prontidão é
+detectada consultando até haver processo do Squid no container e a porta do
+proxy aceitar conexões. Nenhuma thread do servidor fica presa dormindo.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from docker_client import DockerClient, DockerError
+from metrics import REGISTRY
+
+
+logger = logging.getLogger(__name__)
+
+OPERATION_DURATION = REGISTRY.histogram(
+    "squid_api_squid_operation_duration_seconds",
+    "Duração de start/stop/restart/reload do Squid, incluindo a espera por prontidão",
+    ("operation", "outcome"),
+)
+OPERATION_FAILURES = REGISTRY.counter(
+    "squid_api_squid_operation_failures_total",
+    "Operações do Squid que falharam",
+    ("operation",),
+)
+
+
+@asynccontextmanager
+async def _measured(operation):
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        OPERATION_DURATION.observe(time.perf_counter() - start, operation=operation, outcome=outcome)
+        if outcome == "error":
+            OPERATION_FAILURES.inc(operation=operation)
+
+
+class SquidControlError(Exception):
+    """Falha ao controlar o Squid (Docker, reconfiguração ou prontidão)"""
+
+
+class SquidController:
+    """Operações do Squid sobre a Docker Engine API com espera por prontidão"""
+
+    def __init__(self, docker: DockerClient, container, proxy_host, proxy_port=3128,
+                 ready_timeout=30.0, poll_interval=0.25):
+        self.docker = docker
+        self.container = container
+        self.proxy_host = proxy_host
+        self.proxy_port = proxy_port
+        self.ready_timeout = ready_timeout
+        self.poll_interval = poll_interval
+
+    def processes(self):
+        """Comandos dos processos do container; vazio se estiver parado"""
+        try:
+            processes = self.docker.top(self.container)
+        except DockerError:
+            return []
+        return [process.get("CMD") or process.get("COMMAND") or "" for process in processes]
+
+    def running(self):
+        """Retorna (há processo do Squid, comandos dos processos)"""
+        commands = self.processes()
+        return any("squid" in command for command in commands), commands
+
+    async def _port_open(self):
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.proxy_host, self.proxy_port), timeout=1.0
+            )
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+    async def wait_ready(self, timeout=None):
+        """Espera o processo do Squid subir e a porta do proxy aceitar conexões"""
+        deadline = time.monotonic() + (timeout if timeout is not None else self.ready_timeout)
+        interval = self.poll_interval
+        while True:
+            running, _ = await asyncio.to_thread(self.running)
+            if running and await self._port_open():
+                return
+            if time.monotonic() >= deadline:
+                raise SquidControlError(
+                    f"Squid não ficou pronto em {self.ready_timeout:.0f}s "
+                    f"(porta {self.proxy_host}:{self.proxy_port})"
+                )
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, 2.0)
+
+    async def _docker(self, operation, *args):
+        try:
+            return await asyncio.to_thread(operation, self.container, *args)
+        except DockerError as e:
+            raise SquidControlError(str(e))
+
+    async def start(self):
+        async with _measured("start"):
+            logger.info("Iniciando container do Squid...")
+            await self._docker(self.docker.start)
+            await self.wait_ready()
+            logger.info("Squid iniciado com sucesso")
+
+    async def stop(self):
+        async with _measured("stop"):
+            logger.info("Parando container do Squid...")
+            await self._docker(self.docker.stop)
+            logger.info("Squid parado com sucesso")
+
+    async def restart(self):
+        async with _measured("restart"):
+            logger.info("Reiniciando container do Squid...")
+            await self._docker(self.docker.restart)
+            await self.wait_ready()
+            logger.info("Squid reiniciado com sucesso")
+
+    async def reload(self):
+        """Reconfigura o Squid, iniciando ou reiniciando o container se preciso"""
+        async with _measured("reload"):
+            await self._reload()
+
+    async def _reload(self):
+        logger.info("Verificando se o Squid está rodando...")
+        running, _ = await asyncio.to_thread(self.running)
+        if not running:
+            logger.warning("Squid não está rodando. Tentando iniciar...")
+            await self.start()
+
+        logger.info("Recarregando configuração do Squid...")
+        result = await self._docker(self.docker.exec, ["squid", "-k", "reconfigure"])
+
+        if result.stderr and "WARNING" in result.stderr:
+            logger.warning(f"Warnings do Squid (não críticos): {result.stderr}")
+
+        if result.returncode == 0 or (result.stderr and "WARNING" in result.stderr and "ERROR" not in result.stderr):
+            logger.info("Squid recarregado com sucesso")
+            return
+
+        if "No running copy" in result.stderr:
+            logger.warning("Squid não está rodando. Tentando reiniciar container...")
+            await self.restart()
+            return
+
+        logger.error(f"Erro ao recarregar Squid: {result.stderr}")
+        raise SquidControlError(f"Erro ao recarregar Squid: {result.stderr}")
@@ -0,0 +1,122 @@
+"""Verificações de status do Squid com cache e execução concorrente.
+
+Cada verificação (estado do container, processos, validade da configuração,
+últimas linhas de log) é um ``CachedProbe`` com TTL próprio. A validade da
+configuração também depende de uma chave, a assinatura (inode, mtime,
+tamanho) de ``squid.conf`` e ``blocked_sites.txt``, e só é refeita quando um
+deles muda ou o TTL longo expira.
+
+Chamadas simultâneas a uma verificação vencida compartilham a mesma execução
+(single-flight): N painéis consultando o status ao mesmo tempo disparam um
+único conjunto de verificações.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from metrics import cache_result
+
+
+def file_signature(*paths):
+    """Inode, mtime e tamanho de cada arquivo (``None`` se não existir)"""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            signature.append(None)
+            continue
+        signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+class CachedProbe:
+    """Resultado de uma verificação guardado por ``ttl`` segundos
+
+    Se ``key`` for informado, o resultado também é descartado quando o valor
+    retornado por ``key()`` mudar.
+    """
+
+    def __init__(self, check: Callable[[], object], ttl: float, key: Optional[Callable[[], object]] = None,
+                 name=None):
+        self.check = check
+        self.name = name
+        self.ttl = ttl
+        self.key = key
+        self._lock = threading.Lock()
+        self._value = None
+        self._value_key = None
+        self._expires = 0.0
+        self._inflight: Optional[Future] = None
+
+    def invalidate(self):
+        with self._lock:
+            self._expires = 0.0
+
+    def fresh(self):
+        """Indica se há resultado válido que dispensa executar a verificação"""
+        key = self.key() if self.key else None
+        with self._lock:
+            return time.monotonic() < self._expires and key == self._value_key
+
+    def get(self):
+        key = self.key() if self.key else None
+        with self._lock:
+            if time.monotonic() < self._expires and key == self._value_key:
+                cache_result(f"status_{self.name}", True)
+                return self._value
+            future = self._inflight
+            owner = future is None
+            if owner:
+                future = self._inflight = Future()
+        # Quem aguarda a execução em andamento conta como acerto
+        cache_result(f"status_{self.name}", not owner)
+
+        if owner:
+            try:
+                value = self.check()
+            except BaseException as e:
+                with self._lock:
+                    self._inflight = None
+                future.set_exception(e)
+                raise
+            with self._lock:
+                self._value = value
+                self._value_key = key
+                self._expires = time.monotonic() + self.ttl
+                self._inflight = None
+            future.set_result(value)
+        return future.result()
+
+
+class StatusProbe:
+    """Executa um conjunto de ``CachedProbe`` em paralelo"""
+
+    def __init__(self, probes: Dict[str, CachedProbe], max_workers=None):
+        self.probes = probes
+        for name, probe in probes.items():
+            if probe.name is None:
+                probe.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or len(probes),
+                                            thread_name_prefix="status-probe")
+
+    def invalidate(self, *names):
+        for name in names or self.probes:
+            self.probes[name].invalidate()
+
+    def collect(self) -> Dict[str, object]:
+        """Resultado de todas as verificações; só as vencidas são executadas"""
+        pending = {
+            name: self._executor.submit(probe.get)
+            for name, probe in self.probes.items() if not probe.fresh()
+        }
+        results = {}
+        for name, probe in self.probes.items():
+            results[name] = pending[name].result() if name in pending else probe.get()
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
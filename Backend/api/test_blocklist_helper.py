@@ -0,0 +1,45 @@
+"""Testes do protocolo do helper external_acl_type"""
+
+import io
+
+from blocklist_helper import BlocklistHelper
+
+
+def _helper(tmp_path, entries):
+    path = tmp_path / "blocked_sites.txt"
+    path.write_text("".join(f"{entry}\n" for entry in entries))
+    return BlocklistHelper(str(path), interval=60)
+
+
+def test_serve_answers_each_channel(tmp_path):
+    helper = _helper(tmp_path, ["example.com", ".dotted.org", "www.site.net", "# comentario"])
+    requests = [
+        "0 example.com",
+        "1 sub.example.com",
+        "2 dotted.org",
+        "3 a.dotted.org",
+        "4 www.site.net",
+        "5 site.net",
+        "6 example.com.",
+        "7 outro.com",
+    ]
+    stdout = io.StringIO()
+    helper.serve(io.StringIO("".join(f"{line}\n" for line in requests)), stdout)
+    assert stdout.getvalue().splitlines() == [
+        "0 OK", "1 ERR", "2 OK", "3 OK", "4 OK", "5 ERR", "6 OK", "7 ERR",
+    ]
+
+
+def test_answer_without_channel(tmp_path):
+    helper = _helper(tmp_path, [".example.com"])
+    assert helper.answer("www.example.com") == "OK"
+    assert helper.answer("example.net") == "ERR"
+    assert helper.answer("") == "ERR"
+
+
+def test_refresh_swaps_index(tmp_path):
+    helper = _helper(tmp_path, ["example.com"])
+    assert helper.answer("1 www.example.com") == "1 ERR"
+    (tmp_path / "blocked_sites.txt").write_text("example.com\nwww.example.com\n")
+    assert helper.refresh()
+    assert helper.answer("1 www.example.com") == "1 OK"
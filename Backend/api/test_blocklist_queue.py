@@ -0,0 +1,38 @@
+"""Testes da fila de escrita da lista de bloqueio"""
+
+import pytest
+
+from blocklist_queue import ADD, REMOVE, BlocklistWriteQueue
+from blocklist_store import BlocklistStore
+
+
+def _failing_reload():
+    raise RuntimeError("squid -k reconfigure falhou")
+
+
+def _store(tmp_path, urls):
+    path = tmp_path / "blocked_sites.txt"
+    path.write_text("".join(f"{url}\n" for url in urls))
+    return BlocklistStore(str(path))
+
+
+def test_remove_and_readd_in_same_batch_is_noop(tmp_path):
+    store = _store(tmp_path, ["a.com", "b.com"])
+    queue = BlocklistWriteQueue(store, lambda: None, window=0.2)
+    removal = queue.submit(REMOVE, ["a.com"])
+    addition = queue.submit(ADD, ["a.com"])
+    assert removal.result()[0]["status"] == "removed"
+    assert addition.result()[0]["status"] == "added"
+    assert (tmp_path / "blocked_sites.txt").read_text().split() == ["a.com", "b.com"]
+
+
+def test_failed_reload_restores_url_removed_and_readded(tmp_path):
+    store = _store(tmp_path, ["a.com", "b.com"])
+    queue = BlocklistWriteQueue(store, _failing_reload, window=0.2)
+    removal = queue.submit(REMOVE, ["a.com", "b.com"])
+    addition = queue.submit(ADD, ["a.com", "c.com"])
+    with pytest.raises(RuntimeError):
+        removal.result()
+    with pytest.raises(RuntimeError):
+        addition.result()
+    assert sorted(BlocklistStore(str(tmp_path / "blocked_sites.txt")).urls()) == ["a.com", "b.com"]
@@ -0,0 +1,105 @@
+"""Transações, versão e gravação do BlocklistStore"""
+
+import errno
+import os
+import threading
+
+import blocklist_store
+from blocklist_queue import ADD, VERSION_MISMATCH, BlocklistWriteQueue
+from blocklist_store import BlocklistStore
+
+
+def _store(tmp_path, urls):
+    path = tmp_path / "blocked_sites.txt"
+    path.write_text("".join(f"{url}\n" for url in urls))
+    return BlocklistStore(str(path))
+
+
+def test_transaction_serializes_stores_on_the_same_file(tmp_path):
+    first = _store(tmp_path, ["a.com"])
+    second = BlocklistStore(first.path)
+    inside, release, entered = threading.Event(), threading.Event(), threading.Event()
+
+    def hold():
+        with first.transaction():
+            first.apply(["b.com"])
+            inside.set()
+            release.wait(5)
+
+    def follow():
+        with second.transaction():
+            entered.set()
+            second.apply(["c.com"])
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    assert inside.wait(5)
+    waiter = threading.Thread(target=follow)
+    waiter.start()
+    # O flock segura o segundo store enquanto o primeiro está na transação
+    assert not entered.wait(0.2)
+    release.set()
+    holder.join(5)
+    waiter.join(5)
+    assert entered.is_set()
+    # O segundo relê o arquivo ao entrar e não perde a inclusão do primeiro
+    assert list(BlocklistStore(first.path).urls()) == ["a.com", "b.com", "c.com"]
+
+
+def test_version_counts_writes_and_external_edits(tmp_path):
+    store = _store(tmp_path, ["a.com"])
+    start = store.version()
+    store.apply(["b.com"])
+    assert store.version() == start + 1
+    with open(store.path, "a") as f:
+        f.write("c.com\n")
+    assert store.version() == start + 2
+    assert "c.com" in store
+    assert BlocklistStore(store.path).version() == start + 2
+
+
+def test_expected_version_mismatch_changes_nothing(tmp_path):
+    store = _store(tmp_path, ["a.com"])
+    queue = BlocklistWriteQueue(store, lambda: None, window=0)
+    version = store.version()
+    store.apply(["b.com"])
+
+    results = queue.submit(ADD, ["c.com"], expected_version=version).result()
+    assert [result["status"] for result in results] == [VERSION_MISMATCH]
+    assert results[0]["version"] == version + 1
+    assert list(store.urls()) == ["a.com", "b.com"]
+
+    results = queue.submit(ADD, ["c.com"], expected_version=version + 1).result()
+    assert [result["status"] for result in results] == ["added"]
+    assert results[0]["version"] == version + 2
+
+
+def test_revert_keeps_changes_made_after_apply(tmp_path):
+    store = _store(tmp_path, ["a.com", "b.com"])
+    other = BlocklistStore(store.path)
+    store.apply(["c.com"], ["a.com"])
+    other.apply(["d.com"])
+
+    store.revert(["c.com"], ["a.com"])
+    assert sorted(BlocklistStore(store.path).urls()) == ["a.com", "b.com", "d.com"]
+
+
+def test_write_falls_back_to_in_place_when_rename_is_busy(tmp_path, monkeypatch):
+    store = _store(tmp_path, ["a.com"])
+    version = store.version()
+    inode = os.stat(store.path).st_ino
+    real_replace = os.replace
+
+    def busy_replace(src, dst):
+        if dst == store.path:
+            raise OSError(errno.EBUSY, "Device or resource busy")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(blocklist_store.os, "replace", busy_replace)
+    store.apply(["b.com"])
+
+    # Bind mount de arquivo único: o mesmo inode recebe o conteúdo novo
+    assert os.stat(store.path).st_ino == inode
+    assert (tmp_path / "blocked_sites.txt").read_text() == "a.com\nb.com\n"
+    assert store.version() == version + 1
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".blocked_sites.")]
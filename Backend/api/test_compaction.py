@@ -0,0 +1,65 @@
+"""Testes da compactação da lista de bloqueio"""
+
+import pytest
+
+from blocklist_store import BlocklistStore
+from compaction import VersionMismatch, apply_compaction, compact
+from domain_index import DomainIndex
+
+
+ENTRIES = [
+    "Example.com", "example.com", "www.foo.com", "foo.com", ".bar.org",
+    "x.bar.org", ".y.bar.org", "bar.org", "10.0.0.1", "10.0.0.1", "# comentario", "", "invalida_",
+]
+
+
+def test_compact_keeps_exact_hosts_exact():
+    entries, report = compact(ENTRIES)
+    assert entries == ["example.com", "www.foo.com", "foo.com", ".bar.org", "10.0.0.1"]
+    assert report["duplicates"] == 2
+    assert report["covered"] == 3
+    assert report["invalid_entries"] == ["invalida_"]
+
+
+def test_compact_does_not_change_what_is_blocked():
+    entries, _ = compact(ENTRIES)
+    before = DomainIndex([e.lower() for e in ENTRIES if e and not e.startswith("#") and e != "invalida_"])
+    after = DomainIndex(entries)
+    hosts = ["example.com", "www.example.com", "sub.example.com", "foo.com", "www.foo.com",
+             "a.foo.com", "bar.org", "x.bar.org", "z.y.bar.org", "10.0.0.1"]
+    for host in hosts:
+        assert (before.match(host) is None) == (after.match(host) is None), host
+
+
+def _store(tmp_path, entries):
+    path = tmp_path / "blocked_sites.txt"
+    path.write_text("".join(f"{entry}\n" for entry in entries))
+    return BlocklistStore(str(path))
+
+
+def test_apply_compaction_bumps_version_and_reloads(tmp_path):
+    store = _store(tmp_path, ["a.com", "a.com", ".b.com", "x.b.com"])
+    reloads = []
+    version = store.version()
+    report, changed, new_version = apply_compaction(store, lambda: reloads.append(True))
+    assert changed and reloads == [True]
+    assert new_version > version
+    assert (tmp_path / "blocked_sites.txt").read_text().split() == ["a.com", ".b.com"]
+
+
+def test_apply_compaction_restores_list_when_reload_fails(tmp_path):
+    store = _store(tmp_path, ["a.com", "a.com"])
+
+    def failing_reload():
+        raise RuntimeError("reconfigure falhou")
+
+    with pytest.raises(RuntimeError):
+        apply_compaction(store, failing_reload)
+    assert (tmp_path / "blocked_sites.txt").read_text().split() == ["a.com", "a.com"]
+
+
+def test_apply_compaction_checks_expected_version(tmp_path):
+    store = _store(tmp_path, ["a.com", "a.com"])
+    with pytest.raises(VersionMismatch):
+        apply_compaction(store, lambda: None, expected_version=store.version() + 1)
+    assert (tmp_path / "blocked_sites.txt").read_text().split() == ["a.com", "a.com"]
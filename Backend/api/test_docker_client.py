@@ -0,0 +1,133 @@
+"""Testes do cliente da Docker Engine API contra um servidor falso num socket unix"""
+
+import json
+import os
+import socketserver
+import struct
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from docker_client import DockerClient, DockerError, demux
+
+
+def _frame(kind, data):
+    return struct.pack(">BxxxL", kind, len(data)) + data
+
+
+class _FakeDocker(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def finish(self):
+        super().finish()
+        self.server.finished.set()
+
+    def address_string(self):
+        return "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        # Fecha sem avisar (sem "Connection: close"): a conexão fica velha no pool
+        if self.server.drop_after_reply:
+            self.close_connection = True
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path))
+        if self.path == "/containers/squid/json":
+            self._reply(200, {"State": {"Running": True, "Status": "running"}})
+        elif self.path == "/exec/abc/json":
+            self._reply(200, {"ExitCode": 3})
+        else:
+            self._reply(404, {"message": "No such container: missing"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        self.server.requests.append(("POST", self.path, body))
+        if self.path == "/containers/squid/exec":
+            self._reply(201, {"Id": "abc"})
+        elif self.path == "/exec/abc/start":
+            stream = _frame(1, b"linha 1\n") + _frame(2, b"aviso\n") + _frame(1, b"linha 2\n")
+            self._reply(200, stream, "application/vnd.docker.raw-stream")
+        else:
+            self._reply(404, {"message": "not found"})
+
+
+@pytest.fixture
+def docker_server():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "docker.sock")
+    server = socketserver.ThreadingUnixStreamServer(path, _FakeDocker)
+    server.daemon_threads = True
+    server.requests = []
+    server.connections = 0
+    server.drop_after_reply = False
+    server.finished = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, path
+    server.shutdown()
+    server.server_close()
+    os.unlink(path)
+    os.rmdir(directory)
+
+
+def test_inspect_and_error(docker_server):
+    server, path = docker_server
+    client = DockerClient(path)
+    assert client.inspect("squid")["State"]["Running"] is True
+    with pytest.raises(DockerError) as error:
+        client.inspect("missing")
+    assert error.value.status == 404
+    assert "No such container" in str(error.value)
+    # Conexão reaproveitada pelo pool
+    assert server.connections == 1
+    client.close()
+
+
+def test_exec_demuxes_stdout_and_stderr(docker_server):
+    server, path = docker_server
+    client = DockerClient(path)
+    result = client.exec("squid", ["squid", "-k", "parse"])
+    assert result.returncode == 3
+    assert result.stdout == "linha 1\nlinha 2\n"
+    assert result.stderr == "aviso\n"
+    created = server.requests[0]
+    assert created[:2] == ("POST", "/containers/squid/exec")
+    assert created[2]["Cmd"] == ["squid", "-k", "parse"]
+    client.close()
+
+
+def test_demux_tty_and_partial_frame():
+    assert demux(b"texto puro", tty=True) == (b"texto puro", b"")
+    data = _frame(1, b"a") + _frame(2, b"b") + b"\x01\x00"
+    assert demux(data) == (b"a", b"b")
+
+
+def test_stale_pooled_connection_is_retried(docker_server):
+    server, path = docker_server
+    client = DockerClient(path)
+    server.drop_after_reply = True
+    assert client.inspect("squid")["State"]["Running"] is True
+    # Espera o servidor fechar a conexão que ficou no pool
+    assert server.finished.wait(5)
+    server.drop_after_reply = False
+
+    assert client.inspect("squid")["State"]["Running"] is True
+    assert server.connections == 2
+    assert [request[1] for request in server.requests] == ["/containers/squid/json"] * 2
+    client.close()
@@ -0,0 +1,33 @@
+"""Testes do índice de domínios com as regras do dstdomain do Squid"""
+
+from domain_index import DomainIndex
+
+
+def test_match_plain_entry_blocks_only_the_host():
+    index = DomainIndex(["example.com"])
+    assert index.match("example.com") == "example.com"
+    assert index.match("EXAMPLE.com") == "example.com"
+    assert index.match("sub.example.com") is None
+    assert index.match("www.example.com") is None
+    assert index.match("com") is None
+
+
+def test_match_dotted_entry_blocks_subdomains():
+    index = DomainIndex([".example.com"])
+    assert index.match("example.com") == ".example.com"
+    assert index.match("www.example.com") == ".example.com"
+    assert index.match("a.b.example.com") == ".example.com"
+    assert index.match("badexample.com") is None
+
+
+def test_match_www_entry_is_an_exact_host():
+    index = DomainIndex(["www.example.com"])
+    assert index.match("www.example.com") == "www.example.com"
+    assert index.match("example.com") is None
+    assert index.match("a.www.example.com") is None
+
+
+def test_conflicts_still_cover_www_and_parent():
+    index = DomainIndex(["example.com"])
+    assert index.conflicts("www.example.com") == ["example.com"]
+    assert DomainIndex(["www.example.com"]).conflicts("example.com") == ["www.example.com"]
@@ -0,0 +1,82 @@
+"""Jobs compartilhados entre workers pelo SQLite"""
+
+import asyncio
+
+from jobs import FAILED, RUNNING, SUCCEEDED, JobManager
+
+
+def test_job_is_visible_from_another_worker(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    owner, other = JobManager(path=path), JobManager(path=path)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def run():
+            await release.wait()
+            return {"action": "reload"}
+
+        job = owner.submit("service:reload", run)
+        await asyncio.sleep(0)
+        seen = other.get(job.id)
+        assert seen is not None and seen.status == RUNNING
+        assert (await other.wait(seen, 0.05)).status == RUNNING
+
+        asyncio.get_running_loop().call_later(0.05, release.set)
+        done = await other.wait(seen, 5)
+        assert done.status == SUCCEEDED
+        assert done.result == {"action": "reload"}
+        assert other.get("inexistente") is None
+
+    asyncio.run(scenario())
+    owner.close()
+    other.close()
+
+
+def test_failed_and_cancelled_jobs_are_recorded(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    owner, other = JobManager(path=path), JobManager(path=path)
+
+    async def scenario():
+        async def fail():
+            raise RuntimeError("squid parado")
+
+        async def hang():
+            await asyncio.Event().wait()
+
+        failed = owner.submit("service:start", fail)
+        await owner.wait(failed, 5)
+        hung = owner.submit("service:restart", hang)
+        await asyncio.sleep(0)
+        owner.cancel_all()
+        await asyncio.gather(hung.task, return_exceptions=True)
+        return failed.id, hung.id
+
+    failed_id, hung_id = asyncio.run(scenario())
+    assert other.get(failed_id).status == FAILED
+    assert other.get(failed_id).error == "squid parado"
+    assert other.get(hung_id).status == FAILED
+    owner.close()
+    other.close()
+
+
+def test_old_finished_jobs_are_pruned(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    manager = JobManager(max_jobs=3, path=path)
+
+    async def scenario():
+        async def run():
+            return None
+
+        ids = []
+        for _ in range(5):
+            job = manager.submit("service:reload", run)
+            await manager.wait(job, 5)
+            ids.append(job.id)
+        return ids
+
+    ids = asyncio.run(scenario())
+    reader = JobManager(path=path)
+    assert [reader.get(job_id) is not None for job_id in ids] == [False, False, True, True, True]
+    manager.close()
+    reader.close()
@@ -0,0 +1,40 @@
+"""Busca no histórico com arquivos rotacionados e índices laterais"""
+
+import asyncio
+import gzip
+
+from log_archive import LogArchive
+from log_query import AccessLogQuery
+
+
+def _line(ts, client="10.0.0.1"):
+    return f"{ts:.3f} 12 {client} TCP_MISS/200 512 GET http://exemplo.com/{int(ts)} - HIER_DIRECT/1.2.3.4 text/html\n"
+
+
+def test_search_merges_rotated_files_and_skips_by_index(tmp_path):
+    logs, index_dir = tmp_path / "logs", tmp_path / "index"
+    logs.mkdir()
+    with gzip.open(logs / "access.log.2.gz", "wt") as f:
+        f.writelines(_line(ts) for ts in (1000, 1001, 1002))
+    (logs / "access.log.1").write_text("".join(_line(ts, "10.0.0.2") for ts in (2000, 2001)))
+    (logs / "access.log").write_text("".join(_line(ts) for ts in (3000, 3001)))
+
+    archive = LogArchive(str(logs), "access.log", str(index_dir), workers=2)
+    try:
+        entries, summary = asyncio.run(archive.search(AccessLogQuery(), 10))
+        assert [entry.ts for entry in entries] == [1000, 1001, 1002, 2000, 2001, 3000, 3001]
+        assert all(item["scanned"] for item in summary)
+        assert len(list(index_dir.iterdir())) == 2
+
+        # Com o índice, os arquivos fora do intervalo nem são abertos
+        entries, summary = asyncio.run(archive.search(AccessLogQuery(since="1500", until="2500"), 10))
+        assert [entry.ts for entry in entries] == [2000, 2001]
+        scanned = {item["file"]: item["scanned"] for item in summary}
+        assert scanned["access.log.2.gz"] is False
+        assert scanned["access.log.1"] is True
+
+        entries, summary = asyncio.run(archive.search(AccessLogQuery(client_ip="10.0.0.2"), 1))
+        assert [entry.ts for entry in entries] == [2001]
+        assert {item["file"]: item["scanned"] for item in summary}["access.log.2.gz"] is False
+    finally:
+        archive.close()
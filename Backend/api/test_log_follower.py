@@ -0,0 +1,74 @@
+"""Buffer circular e cursores do LogFollower"""
+
+import os
+
+from log_follower import LogFollower
+
+
+def _parse(line):
+    return {"line": line}
+
+
+def _lines(found):
+    return [entry["line"] for _, entry in found]
+
+
+def _write(path, *lines, mode="a"):
+    with open(path, mode) as f:
+        f.writelines(f"{line}\n" for line in lines)
+
+
+def test_ring_buffer_keeps_last_entries(tmp_path):
+    path = str(tmp_path / "access.log")
+    _write(path, "l1", "l2", "l3", "l4", "l5", mode="w")
+    follower = LogFollower(path, _parse, maxlen=3)
+    follower.poll()
+    assert len(follower) == 3
+    assert [entry["line"] for entry in follower.tail(10)] == ["l3", "l4", "l5"]
+    assert follower.next_seq == 5
+
+    _write(path, "l6")
+    follower.poll()
+    assert [entry["line"] for entry in follower.tail(2)] == ["l5", "l6"]
+
+
+def test_cursor_resumes_after_restart(tmp_path):
+    path = str(tmp_path / "access.log")
+    _write(path, "l1", "l2", "l3", mode="w")
+    follower = LogFollower(path, _parse, maxlen=10)
+    follower.poll()
+    found, _, cursor, dropped = follower.read_after(None, 2)
+    assert _lines(found) == ["l1", "l2"] and dropped == 0
+
+    _write(path, "l4")
+    # A API reiniciou: um follower novo reconhece o cursor pelo inode e offset
+    restarted = LogFollower(path, _parse, maxlen=10)
+    restarted.poll()
+    found, _, last, dropped = restarted.read_after(cursor, 10)
+    assert _lines(found) == ["l3", "l4"]
+    assert dropped == 0
+    assert last == restarted.cursor()
+    assert restarted.read_after(last, 10)[0] == []
+
+
+def test_cursor_reports_evicted_and_rotated_entries(tmp_path):
+    path = str(tmp_path / "access.log")
+    _write(path, "l1", "l2", mode="w")
+    follower = LogFollower(path, _parse, maxlen=3)
+    follower.poll()
+    old_cursor = follower.read_after(None, 1)[2]
+
+    _write(path, "l3", "l4", "l5")
+    follower.poll()
+    found, _, _, dropped = follower.read_after(old_cursor, 10)
+    # l2 saiu do buffer antes de ser lida
+    assert _lines(found) == ["l3", "l4", "l5"]
+    assert dropped is None
+
+    cursor = follower.cursor()
+    os.rename(path, path + ".1")
+    _write(path, "n1", mode="w")
+    follower.poll()
+    found, _, _, dropped = follower.read_after(cursor, 10)
+    assert _lines(found) == ["n1"]
+    assert dropped == 0
@@ -0,0 +1,40 @@
+"""Testes do parser do cache.log com linhas reais do Squid"""
+
+from log_parser import line_time, parse_cache_line
+
+
+SQUID_LINES = [
+    "2025/01/01 10:00:01 kid1| ERROR: Cannot open '/etc/squid/blocked_sites.txt'",
+    "2025/01/01 10:00:02 kid1| WARNING: HTTP: Invalid Response: Bad header encountered",
+    "2025/01/01 10:00:03 kid1| Starting Squid Cache version 6.6 for x86_64-pc-linux-gnu...",
+    "2025/01/01 10:00:04.123 kid1| 5,3| comm.cc(643) commUnsetConnTimeout: conn5 local=[::] remote=[::]",
+]
+
+
+def test_parse_real_squid_lines():
+    entries = [parse_cache_line(line) for line in SQUID_LINES]
+    assert all("parse_error" not in entry for entry in entries)
+    assert [entry["level"] for entry in entries] == ["ERROR", "WARNING", "INFO", "INFO"]
+    assert entries[0]["timestamp"] == "2025/01/01 10:00:01"
+    assert entries[0]["message"] == "Cannot open '/etc/squid/blocked_sites.txt'"
+    assert entries[3]["message"].startswith("comm.cc(643)")
+    assert line_time(SQUID_LINES[0]) is not None
+
+
+def test_level_filter_matches_real_lines():
+    from main import cache_log_matcher
+
+    matches = cache_log_matcher("error", None)
+    found = [line for line in SQUID_LINES if matches(parse_cache_line(line))]
+    assert found == SQUID_LINES[:1]
+
+    matches = cache_log_matcher(None, "Bad header")
+    assert [line for line in SQUID_LINES if matches(parse_cache_line(line))] == SQUID_LINES[1:2]
+
+
+def test_level_filter_falls_back_to_raw_line():
+    from main import cache_log_matcher
+
+    entry = {"raw_line": "linha sem formato ERROR qualquer", "parse_error": "Formato inválido"}
+    assert cache_log_matcher("ERROR", None)(entry)
+    assert not cache_log_matcher("WARNING", None)(entry)
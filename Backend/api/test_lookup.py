@@ -0,0 +1,64 @@
+"""A consulta da API concorda com o helper do Squid (regras do dstdomain)"""
+
+import pytest
+
+import main
+from blocklist_helper import BlocklistHelper
+from blocklist_snapshot import BlocklistSnapshot, write_snapshot
+from blocklist_store import BlocklistStore
+from domain_index import DomainIndex
+
+
+ENTRIES = ["example.com", ".dotted.org", "www.site.net", ".a.dotted.org", "x.dotted.org", "10.1.2.3"]
+HOSTS = [
+    "example.com", "sub.example.com", "www.example.com",
+    "dotted.org", "b.dotted.org", "a.dotted.org", "z.a.dotted.org", "x.dotted.org",
+    "www.site.net", "site.net", "a.www.site.net",
+    "10.1.2.3", "10.1.2.4", "outro.com",
+]
+
+
+@pytest.fixture
+def blocklist_path(tmp_path):
+    path = tmp_path / "blocked_sites.txt"
+    path.write_text("".join(f"{entry}\n" for entry in ENTRIES))
+    return path
+
+
+def test_index_and_snapshot_agree_with_helper(blocklist_path, tmp_path):
+    helper = BlocklistHelper(str(blocklist_path), interval=60)
+    index = DomainIndex(ENTRIES)
+    snapshot_path = str(tmp_path / "blocked_sites.txt.snapshot")
+    write_snapshot(snapshot_path, ENTRIES, (1, 2, 3))
+    snapshot = BlocklistSnapshot.open(snapshot_path)
+
+    for host in HOSTS:
+        blocked = helper.answer(f"0 {host}") == "0 OK"
+        assert (index.lookup(host) is not None) == blocked, host
+        assert snapshot.lookup(host) == index.lookup(host), host
+
+
+def test_lookup_endpoint_agrees_with_helper(blocklist_path, monkeypatch):
+    helper = BlocklistHelper(str(blocklist_path), interval=60)
+    monkeypatch.setattr(main, "blocklist", BlocklistStore(str(blocklist_path)))
+
+    results = main.lookup_urls([f"https://{host}:8080/caminho" for host in HOSTS])
+    for host, result in zip(HOSTS, results):
+        assert result["host"] == host
+        assert result["blocked"] == (helper.answer(host) == "OK"), host
+    assert results[1] == {
+        "url": "https://sub.example.com:8080/caminho", "host": "sub.example.com",
+        "valid": True, "blocked": False, "rule": None,
+    }
+    assert results[6]["rule"] == ".a.dotted.org"
+
+
+def test_snapshot_caches_only_existing_top_labels(tmp_path):
+    snapshot_path = str(tmp_path / "blocked_sites.txt.snapshot")
+    write_snapshot(snapshot_path, ENTRIES, (1, 2, 3))
+    snapshot = BlocklistSnapshot.open(snapshot_path)
+    for i in range(1000):
+        assert snapshot.lookup(f"host.tld{i}") is None
+    assert snapshot.lookup("sub.dotted.org") == ".dotted.org"
+    assert snapshot.lookup("example.com") == "example.com"
+    assert sorted(snapshot._top) == [b"com", b"org"]
@@ -0,0 +1,64 @@
+"""Um único worker grava os agregados do tráfego"""
+
+import time
+
+from log_parser import parse_access_line
+from rollups import MINUTE, TrafficRollup
+
+
+def _record(ts, url="http://exemplo.com/"):
+    return parse_access_line(f"{ts:.3f} 12 10.0.0.1 TCP_MISS/200 512 GET {url} - HIER_DIRECT/1.2.3.4 text/html")
+
+
+def _requests(rollup, since, until):
+    return sum(point["requests"] for point in rollup.series(MINUTE, since, until))
+
+
+def test_only_the_leader_writes_and_a_follower_takes_over(tmp_path):
+    path = str(tmp_path / "rollups.sqlite3")
+    now = int(time.time()) // MINUTE * MINUTE - 10 * MINUTE
+    leader = TrafficRollup(path, flush_interval=0.05)
+    follower = TrafficRollup(path, flush_interval=0.05)
+    leader.start()
+    follower.start()
+    try:
+        assert leader.leader and not follower.leader
+
+        # Os dois workers seguem o mesmo access.log
+        for record in (_record(now + 1), _record(now + 2)):
+            leader.add(record)
+            follower.add(record)
+        leader.flush()
+        assert _requests(follower, now, now + MINUTE) == 2
+
+        leader.stop()
+        deadline = time.monotonic() + 5
+        while not follower.leader and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert follower.leader
+
+        # O novo líder ignora o que o anterior já gravou e soma o resto
+        for record in (_record(now + 2), _record(now + 3)):
+            follower.add(record)
+        follower.flush()
+        assert _requests(follower, now, now + MINUTE) == 3
+    finally:
+        leader.stop()
+        follower.stop()
+
+
+def test_watermark_skips_entries_counted_before_a_restart(tmp_path):
+    path = str(tmp_path / "rollups.sqlite3")
+    now = int(time.time()) // MINUTE * MINUTE - 10 * MINUTE
+    rollup = TrafficRollup(path)
+    rollup.open()
+    rollup.add(_record(now + 1))
+    rollup.add(_record(now + 2))
+    rollup.close()
+
+    restarted = TrafficRollup(path)
+    restarted.open()
+    for ts in (now + 1, now + 2, now + 3):
+        restarted.add(_record(ts))
+    assert _requests(restarted, now, now + MINUTE) == 3
+    restarted.close()
@@ -0,0 +1,61 @@
+"""Testes da leitura em streaming dos uploads da lista de bloqueio"""
+
+import io
+
+import pytest
+
+from main import MAX_LINE_LENGTH, UploadTooLarge, iter_text_lines, process_txt_file
+
+
+def test_lines_across_chunks():
+    data = b"a.com\n# comentario\nb.org\r\nc.net"
+    lines = list(iter_text_lines(io.BytesIO(data), chunk_size=4))
+    assert lines == ["a.com\n", "# comentario\n", "b.org\r\n", "c.net"]
+    assert process_txt_file(lines)[0] == ["a.com", "b.org", "c.net"]
+
+
+def test_overlong_line_raises_value_error():
+    data = b"a" * (MAX_LINE_LENGTH + 10) + b".com\nb.com\n"
+    with pytest.raises(ValueError):
+        list(iter_text_lines(io.BytesIO(data)))
+
+
+def test_upload_size_limit():
+    with pytest.raises(UploadTooLarge):
+        list(iter_text_lines(io.BytesIO(b"a.com\n" * 10), chunk_size=8, max_bytes=32))
+
+
+def test_large_upload_is_written_in_bounded_batches(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    from blocklist_queue import BlocklistWriteQueue
+    from blocklist_store import BlocklistStore
+
+    store = BlocklistStore(str(tmp_path / "blocked_sites.txt"))
+    monkeypatch.setattr(main, "blocklist", store)
+    monkeypatch.setattr(main, "blocklist_writer", BlocklistWriteQueue(store, lambda: None, window=0))
+    monkeypatch.setattr(main, "UPLOAD_BATCH_SIZE", 1000)
+    batch_sizes = []
+    add_urls_in_bulk = main.add_urls_in_bulk
+
+    async def recording_add(urls, expected_version=None):
+        batch_sizes.append(len(urls))
+        return await add_urls_in_bulk(urls, expected_version)
+
+    monkeypatch.setattr(main, "add_urls_in_bulk", recording_add)
+
+    data = "".join(f"site{i:05d}.com\n" for i in range(8000)).encode() + b"invalida_\n"
+    assert len(data) > main.UPLOAD_CHUNK_SIZE
+    response = TestClient(main.app).post(
+        "/api/v1/squid/blocklist/bulk/txt", files={"file": ("lista.txt", data)}
+    )
+    assert response.status_code == 200
+    result = response.json()["result"]
+
+    assert batch_sizes == [1000] * 8
+    assert result["successfully_added"] == 8000
+    assert result["total_processed"] == 8000
+    assert len(result["added"]) == main.MAX_INVALID_REPORTED
+    assert response.json()["invalid_entries"] == ["Linha 8001: invalida_"]
+    assert len(store.urls()) == 8000
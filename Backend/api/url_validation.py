@@ -0,0 +1,135 @@
+"""Normalização e validação de entradas da lista de bloqueio.
+
+É o laço quente das importações em lote, então os padrões são compilados uma
+única vez e os prefixos (``http://``, ``https://``, ``www.``) são removidos numa
+só passada. IPv6 é conferido com ``ipaddress``, que aceita as formas
+comprimidas (``2001:db8::1``); IPv4 usa um padrão compilado, bem mais barato.
+
+Domínios com ponto inicial (``.example.com``, a forma do ``dstdomain`` do Squid
+que inclui os subdomínios) são aceitos e mantêm o ponto.
+"""
+
+import ipaddress
+import re
+from typing import Iterable, List, Optional, Tuple
+
+
+_IPV4_RE = re.compile(r'(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)')
+
+# Rótulos de 1 a 63 caracteres sem hífen nas pontas; equivale ao padrão antigo
+# (?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+ sem o backtracking
+_DOMAIN_RE = re.compile(r'(?:(?!-)[a-zA-Z0-9-]{1,63}(?<!-)\.)+[a-zA-Z]{2,}')
+
+
+def strip_prefixes(entry):
+    """Remove protocolo http(s) e www. do início da entrada"""
+    if entry.startswith('http://'):
+        entry = entry[7:]
+    elif entry.startswith('https://'):
+        entry = entry[8:]
+    if entry.startswith('www.'):
+        entry = entry[4:]
+    return entry
+
+
+def clean_url(url):
+    """Remove protocolo e www. e normaliza para minúsculas"""
+    return strip_prefixes(url).lower()
+
+
+def clean_host(url):
+    """Remove só o protocolo e normaliza para minúsculas (mantém ``www.``)"""
+    if url.startswith('http://'):
+        url = url[7:]
+    elif url.startswith('https://'):
+        url = url[8:]
+    return url.lower()
+
+
+def is_valid_ip(ip):
+    """Valida se é um IP válido (IPv4 ou IPv6, inclusive formas comprimidas)"""
+    if ':' in ip:
+        try:
+            ipaddress.IPv6Address(ip)
+        except ValueError:
+            return False
+        return True
+    # Domínios terminam em letra (TLD); só IPv4 termina em dígito
+    return bool(ip) and ip[-1].isdigit() and _IPV4_RE.fullmatch(ip) is not None
+
+
+def is_valid_domain(domain):
+    """Valida se é um domínio válido"""
+    return _DOMAIN_RE.fullmatch(strip_prefixes(domain)) is not None
+
+
+def is_valid_hostname(name):
+    """Valida o nome exatamente como está (sem remover protocolo ou ``www.``)"""
+    return _DOMAIN_RE.fullmatch(name) is not None
+
+
+def validate_url_entry(entry) -> Optional[str]:
+    """Valida uma entrada de URL/IP e retorna o formato limpo"""
+    entry = entry.strip()
+
+    if not entry or entry.startswith('#'):
+        return None
+
+    if is_valid_ip(entry):
+        return entry
+
+    wildcard = entry.startswith('.')
+    domain = entry[1:] if wildcard else strip_prefixes(entry)
+    if _DOMAIN_RE.fullmatch(domain) is not None:
+        return '.' + domain if wildcard else domain
+
+    return None
+
+
+def validate_entries(entries: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """Valida várias entradas de uma vez; retorna (válidas normalizadas, inválidas)
+
+    Mesmas regras de ``validate_url_entry``, com o laço e as buscas de atributo
+    resolvidos uma única vez para o lote inteiro.
+    """
+    valid: List[str] = []
+    invalid: List[str] = []
+    add_valid = valid.append
+    add_invalid = invalid.append
+    match_domain = _DOMAIN_RE.fullmatch
+    match_ipv4 = _IPV4_RE.fullmatch
+
+    for entry in entries:
+        cleaned = entry.strip()
+        if not cleaned or cleaned[0] == '#':
+            add_invalid(entry)
+            continue
+
+        if ':' in cleaned:
+            if is_valid_ip(cleaned):
+                add_valid(cleaned)
+                continue
+        elif cleaned[-1].isdigit() and match_ipv4(cleaned) is not None:
+            add_valid(cleaned)
+            continue
+
+        if cleaned[0] == '.':
+            if match_domain(cleaned, 1) is not None:
+                add_valid(cleaned)
+            else:
+                add_invalid(entry)
+            continue
+
+        if cleaned.startswith('http://'):
+            cleaned = cleaned[7:]
+        elif cleaned.startswith('https://'):
+            cleaned = cleaned[8:]
+        if cleaned.startswith('www.'):
+            cleaned = cleaned[4:]
+
+        if match_domain(cleaned) is not None:
+            add_valid(cleaned)
+        else:
+            add_invalid(entry)
+
+    return valid, invalid
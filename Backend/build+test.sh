@@ -19,8 +19,8 @@ sleep 10
 echo "📊 Verificando status do Squid..."
 curl -s http://localhost:8000/api/v1/squid/status | jq .
 
-# Testar Docker CLI
-echo "🐳 Testando Docker CLI..."
+# Testar acesso à Docker Engine API
+echo "🐳 Testando Docker Engine API..."
 docker exec squid-api python test_docker.py
 
 # Testar adição de URL
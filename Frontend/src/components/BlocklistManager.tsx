@@ -11,15 +11,23 @@ interface BlocklistManagerProps {
 }
 
 const ITEMS_PER_PAGE = 10;
+const SEARCH_DEBOUNCE_MS = 300;
 
 export function BlocklistManager({ onActionComplete, onStatusUpdate }: BlocklistManagerProps) {
   const [refreshTrigger, setRefreshTrigger] = useState(0);
-  const { data: blocklist, loading, error, refetch } = useApi(blocklistApi.getBlocklist, [refreshTrigger]);
+  const [searchTerm, setSearchTerm] = useState('');
+  const [search, setSearch] = useState('');
+  const [currentPage, setCurrentPage] = useState(1);
+  // Cursor de cada página já visitada; a primeira página não tem cursor
+  const [cursors, setCursors] = useState<(string | undefined)[]>([undefined]);
+  // Só a página atual vem do servidor, já filtrada pela pesquisa
+  const { data: blocklist, loading, error } = useApi(
+    () => blocklistApi.getBlocklist({ limit: ITEMS_PER_PAGE, cursor: cursors[currentPage - 1], search }),
+    [refreshTrigger, currentPage, search]
+  );
   const [newUrl, setNewUrl] = useState('');
   const [addingUrl, setAddingUrl] = useState(false);
   const [removingUrls, setRemovingUrls] = useState<Set<string>>(new Set());
-  const [searchTerm, setSearchTerm] = useState('');
-  const [currentPage, setCurrentPage] = useState(1);
   const [showBulkUpload, setShowBulkUpload] = useState(false);
   const [selectedUrls, setSelectedUrls] = useState<Set<string>>(new Set());
   const [bulkRemoving, setBulkRemoving] = useState(false);
@@ -38,10 +46,10 @@ export function BlocklistManager({ onActionComplete, onStatusUpdate }: Blocklist
     }
   };
 
-  const refreshList = useCallback(async () => {
+  // Recarrega só a página atual
+  const refreshList = useCallback(() => {
     setRefreshTrigger(prev => prev + 1);
-    await refetch();
-  }, [refetch]);
+  }, []);
 
   const handleAddUrl = async () => {
     if (!newUrl.trim()) {
@@ -156,26 +164,42 @@ export function BlocklistManager({ onActionComplete, onStatusUpdate }: Blocklist
     setSelectedUrls(new Set());
   };
 
-  // Filtrar URLs baseado no termo de pesquisa
-  const filteredUrls = blocklist?.blocked_urls.filter(url =>
-    url.toLowerCase().includes(searchTerm.toLowerCase())
-  ) || [];
+  // Calcular paginação a partir da página devolvida pelo servidor
+  const paginatedUrls = blocklist?.blocked_urls || [];
+  const matchedCount = blocklist?.matched ?? paginatedUrls.length;
+  const totalPages = Math.max(Math.ceil(matchedCount / ITEMS_PER_PAGE), currentPage);
+  const startIndex = blocklist?.offset ?? 0;
+  const endIndex = startIndex + paginatedUrls.length;
 
-  // Calcular paginação
-  const totalPages = Math.ceil(filteredUrls.length / ITEMS_PER_PAGE);
-  const startIndex = (currentPage - 1) * ITEMS_PER_PAGE;
-  const endIndex = startIndex + ITEMS_PER_PAGE;
-  const paginatedUrls = filteredUrls.slice(startIndex, endIndex);
+  const goToNextPage = () => {
+    if (!blocklist?.next_cursor) return;
+    setCursors(prev => [...prev.slice(0, currentPage), blocklist.next_cursor as string]);
+    setCurrentPage(prev => prev + 1);
+  };
 
-  // Resetar página quando mudar o filtro
+  // Pesquisa no servidor depois que o usuário para de digitar; resetar página junto
   React.useEffect(() => {
-    setCurrentPage(1);
+    const term = searchTerm.trim();
+    if (term === search) return;
+    const timer = setTimeout(() => {
+      setSearch(term);
+      setCurrentPage(1);
+      setCursors([undefined]);
+    }, SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
   }, [searchTerm]);
 
+  // Página ficou vazia depois de remoções: volta para a anterior
+  React.useEffect(() => {
+    if (blocklist && paginatedUrls.length === 0 && currentPage > 1) {
+      setCurrentPage(prev => prev - 1);
+    }
+  }, [blocklist]);
+
   // Limpar seleção quando mudar de página
   React.useEffect(() => {
     setSelectedUrls(new Set());
-  }, [currentPage, searchTerm]);
+  }, [currentPage, search]);
 
   return (
     <div className="bg-white rounded-xl shadow-sm border border-gray-200 p-6">
@@ -187,7 +211,7 @@ export function BlocklistManager({ onActionComplete, onStatusUpdate }: Blocklist
         <div className="flex items-center gap-2">
           {blocklist && (
             <span className="px-2 py-1 bg-red-100 text-red-800 text-sm font-medium rounded-full">
-              {filteredUrls.length} de {blocklist.blocked_urls.length} URLs
+              {matchedCount} de {blocklist.total} URLs
             </span>
           )}
           <button
@@ -369,7 +393,7 @@ export function BlocklistManager({ onActionComplete, onStatusUpdate }: Blocklist
           {totalPages > 1 && (
             <div className="flex items-center justify-between border-t border-gray-200 pt-4">
               <div className="text-sm text-gray-700">
-                Mostrando {startIndex + 1} a {Math.min(endIndex, filteredUrls.length)} de {filteredUrls.length} URLs
+                Mostrando {startIndex + 1} a {endIndex} de {matchedCount} URLs
               </div>
               <div className="flex items-center gap-2">
                 <button
@@ -383,8 +407,8 @@ export function BlocklistManager({ onActionComplete, onStatusUpdate }: Blocklist
                   Página {currentPage} de {totalPages}
                 </span>
                 <button
-                  onClick={() => setCurrentPage(prev => Math.min(prev + 1, totalPages))}
-                  disabled={currentPage === totalPages}
+                  onClick={goToNextPage}
+                  disabled={!blocklist?.next_cursor}
                   className="p-2 text-gray-500 hover:text-gray-700 hover:bg-gray-100 rounded-lg disabled:opacity-50 disabled:cursor-not-allowed"
                 >
                   <ChevronRight className="w-4 h-4" />
@@ -393,10 +417,10 @@ export function BlocklistManager({ onActionComplete, onStatusUpdate }: Blocklist
             </div>
           )}
         </>
-      ) : searchTerm ? (
+      ) : search ? (
         <div className="text-center py-8 text-gray-500">
           <Search className="w-12 h-12 mx-auto mb-3 text-gray-300" />
-          <p className="text-sm">Nenhuma URL encontrada para "{searchTerm}"</p>
+          <p className="text-sm">Nenhuma URL encontrada para "{search}"</p>
           <button
             onClick={() => setSearchTerm('')}
             className="mt-2 text-sm text-blue-600 hover:text-blue-700 underline"
@@ -1,42 +1,30 @@
 import React from 'react';
-import { AccessLogResponse, CacheLogResponse } from '../types';
+import { AccessLogStatsResponse, CacheLogResponse, TrafficSeriesResponse } from '../types';
 import { TrendingUp, Users, Globe, Clock, AlertTriangle, CheckCircle } from 'lucide-react';
 
 interface LogStatsProps {
-  accessLogs: AccessLogResponse | null;
+  accessStats: AccessLogStatsResponse | null;
   cacheLogs: CacheLogResponse | null;
+  trafficSeries?: TrafficSeriesResponse | null;
 }
 
-const LogStats: React.FC<LogStatsProps> = ({ accessLogs, cacheLogs }) => {
+const formatMs = (value?: number) => value === undefined ? '-' : `${Math.round(value)} ms`;
+
+const formatRatio = (value: number | null) => value === null ? '-' : `${(value * 100).toFixed(1)}%`;
+
+const LogStats: React.FC<LogStatsProps> = ({ accessStats: accessStatsResponse, cacheLogs, trafficSeries }) => {
   const getAccessStats = () => {
-    if (!accessLogs) return null;
-
-    const logs = accessLogs.logs;
-    const uniqueIPs = new Set(logs.map(log => log.client_ip)).size;
-    const uniqueURLs = new Set(logs.map(log => log.url)).size;
-    
-    const statusCodes = logs.reduce((acc, log) => {
-      const code = log.result_code.split('/')[1] || log.result_code;
-      acc[code] = (acc[code] || 0) + 1;
-      return acc;
-    }, {} as Record<string, number>);
-
-    const successCount = statusCodes['200'] || 0;
-    const errorCount = Object.entries(statusCodes).reduce((sum, [code, count]) => {
-      return sum + (code.startsWith('4') || code.startsWith('5') ? count : 0);
-    }, 0);
-
-    const totalBytes = logs.reduce((sum, log) => sum + parseInt(log.bytes) || 0, 0);
-    const avgDuration = logs.reduce((sum, log) => sum + parseFloat(log.duration) || 0, 0) / logs.length;
+    if (!accessStatsResponse) return null;
 
+    const stats = accessStatsResponse.stats;
     return {
-      totalRequests: logs.length,
-      uniqueIPs,
-      uniqueURLs,
-      successCount,
-      errorCount,
-      totalBytes,
-      avgDuration: isNaN(avgDuration) ? 0 : avgDuration
+      totalRequests: stats.total_requests,
+      uniqueIPs: stats.unique_ips,
+      uniqueURLs: stats.unique_urls,
+      successCount: stats.success_count,
+      errorCount: stats.error_count,
+      totalBytes: stats.total_bytes,
+      avgDuration: stats.avg_duration_ms / 1000
     };
   };
 
@@ -45,7 +33,7 @@ const LogStats: React.FC<LogStatsProps> = ({ accessLogs, cacheLogs }) => {
 
     const logs = cacheLogs.logs;
     const errorCount = logs.filter(log => log.level === 'ERROR').length;
-    const warnCount = logs.filter(log => log.level === 'WARN').length;
+    const warnCount = logs.filter(log => log.level === 'WARN' || log.level === 'WARNING').length;
     const infoCount = logs.filter(log => log.level === 'INFO').length;
 
     return {
@@ -143,6 +131,22 @@ const LogStats: React.FC<LogStatsProps> = ({ accessLogs, cacheLogs }) => {
                 <span className="font-medium">Total de Bytes Transferidos:</span> {accessStats.totalBytes.toLocaleString()} bytes
               </p>
             </div>
+
+            {trafficSeries && (
+              <div className="bg-gray-50 p-3 rounded-lg">
+                <p className="text-sm text-gray-600 mb-1">
+                  <span className="font-medium">Últimos {trafficSeries.minutes} min:</span>{' '}
+                  p50 {formatMs(trafficSeries.total.duration_ms.p50)} ·{' '}
+                  p95 {formatMs(trafficSeries.total.duration_ms.p95)} ·{' '}
+                  p99 {formatMs(trafficSeries.total.duration_ms.p99)}
+                </p>
+                <p className="text-sm text-gray-600">
+                  <span className="font-medium">Taxa de acerto do cache:</span>{' '}
+                  {formatRatio(trafficSeries.total.cache_hit_ratio)} das requisições,{' '}
+                  {formatRatio(trafficSeries.total.byte_hit_ratio)} dos bytes
+                </p>
+              </div>
+            )}
           </div>
         )}
 
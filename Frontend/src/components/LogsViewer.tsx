@@ -1,8 +1,15 @@
 import React, { useState, useEffect } from 'react';
 import { logsApi } from '../services/api';
 import { 
-  RawLogResponse
+  AccessLogStatsResponse,
+  CacheLogResponse,
+  RawLogResponse,
+  TrafficSeriesResponse
 } from '../types';
+import LogStats from './LogStats';
+
+// Intervalo de atualização das estatísticas (ms)
+const STATS_REFRESH_INTERVAL = 30000;
 
 
 type LogType = 'raw-access' | 'raw-cache';
@@ -19,7 +26,27 @@ const LogsViewer: React.FC<LogsViewerProps> = ({ className = '' }) => {
   const [rawAccessLogs, setRawAccessLogs] = useState<RawLogResponse | null>(null);
   const [rawCacheLogs, setRawCacheLogs] = useState<RawLogResponse | null>(null);
 
+  const [accessStats, setAccessStats] = useState<AccessLogStatsResponse | null>(null);
+  const [cacheLogs, setCacheLogs] = useState<CacheLogResponse | null>(null);
+  const [trafficSeries, setTrafficSeries] = useState<TrafficSeriesResponse | null>(null);
+
   const [lines, setLines] = useState<number>(100);
+  const [live, setLive] = useState(false);
+
+  // Cada fonte é independente: se uma falhar, as outras continuam aparecendo
+  const loadStats = async () => {
+    const [stats, cache, series] = await Promise.allSettled([
+      logsApi.getAccessStats({ lines: lines || 100 }),
+      logsApi.getCacheLogs({ lines: lines || 100 }),
+      logsApi.getTrafficSeries(60),
+    ]);
+    if (stats.status === 'fulfilled') setAccessStats(stats.value.data);
+    else console.error('Erro ao carregar estatísticas de acesso:', stats.reason);
+    if (cache.status === 'fulfilled') setCacheLogs(cache.value.data);
+    else console.error('Erro ao carregar logs de cache:', cache.reason);
+    if (series.status === 'fulfilled') setTrafficSeries(series.value.data);
+    else console.error('Erro ao carregar série de tráfego:', series.reason);
+  };
 
   const loadRawAccessLogs = async () => {
     setLoading(true);
@@ -64,8 +91,39 @@ const LogsViewer: React.FC<LogsViewerProps> = ({ className = '' }) => {
     loadLogs();
   }, [activeTab]);
 
+  useEffect(() => {
+    loadStats();
+    const timer = setInterval(loadStats, STATS_REFRESH_INTERVAL);
+    return () => clearInterval(timer);
+  }, [lines]);
+
+  // Modo ao vivo: recebe só as linhas novas pelo stream do servidor
+  useEffect(() => {
+    if (!live) return;
+
+    const type = activeTab === 'raw-access' ? 'access' : 'cache';
+    const setLogs = activeTab === 'raw-access' ? setRawAccessLogs : setRawCacheLogs;
+    const maxLines = lines || 100;
+    const source = new EventSource(logsApi.getStreamUrl(type));
+
+    source.addEventListener('entry', (event) => {
+      const entry = JSON.parse((event as MessageEvent).data);
+      setLogs((current) => {
+        if (!current) return current;
+        const rawLogs = [...current.raw_logs, entry.raw_line].slice(-maxLines);
+        return { ...current, raw_logs: rawLogs, lines_returned: rawLogs.length };
+      });
+    });
+    source.onerror = () => {
+      console.error('Conexão do stream de logs interrompida; reconectando...');
+    };
+
+    return () => source.close();
+  }, [live, activeTab, lines]);
+
   const applyFilters = () => {
     loadLogs();
+    loadStats();
   };
 
   const clearFilters = () => {
@@ -159,6 +217,14 @@ const LogsViewer: React.FC<LogsViewerProps> = ({ className = '' }) => {
           >
             {loading ? 'Carregando...' : 'Aplicar'}
           </button>
+          <button
+            onClick={() => setLive(!live)}
+            className={`px-4 py-2 text-white rounded-md focus:outline-none focus:ring-2 ${
+              live ? 'bg-red-600 hover:bg-red-700 focus:ring-red-500' : 'bg-green-600 hover:bg-green-700 focus:ring-green-500'
+            }`}
+          >
+            {live ? 'Parar ao vivo' : 'Ao vivo'}
+          </button>
           <button
             onClick={clearFilters}
             className="px-4 py-2 bg-gray-600 text-white rounded-md hover:bg-gray-700 focus:outline-none focus:ring-2 focus:ring-gray-500"
@@ -170,6 +236,10 @@ const LogsViewer: React.FC<LogsViewerProps> = ({ className = '' }) => {
 
       {/* Conteúdo */}
       <div className="p-6">
+        <div className="mb-6">
+          <LogStats accessStats={accessStats} cacheLogs={cacheLogs} trafficSeries={trafficSeries} />
+        </div>
+
         {error && (
           <div className="mb-4 p-4 bg-red-50 border border-red-200 rounded-md">
             <p className="text-red-800">{error}</p>
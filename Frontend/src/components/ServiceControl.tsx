@@ -24,9 +24,22 @@ export function ServiceControl({ onActionComplete, onStatusUpdate }: ServiceCont
   const handleServiceAction = async (action: 'start' | 'stop' | 'restart', actionName: string) => {
     setLoading(action);
     try {
-      if (action === 'start') await systemApi.startService();
-      else if (action === 'stop') await systemApi.stopService();
-      else await systemApi.restartService();
+      const response = action === 'start'
+        ? await systemApi.startService()
+        : action === 'stop'
+          ? await systemApi.stopService()
+          : await systemApi.restartService();
+
+      // A operação roda em segundo plano; aguarda o job terminar
+      if (response.data.status === 'accepted') {
+        let job = (await systemApi.getJob(response.data.job_id)).data;
+        while (job.status === 'pending' || job.status === 'running') {
+          job = (await systemApi.getJob(response.data.job_id)).data;
+        }
+        if (job.status === 'failed') {
+          throw new Error(job.error || 'Falha na operação');
+        }
+      }
       
       onActionComplete('success', `Serviço ${actionName.toLowerCase()} com sucesso!`);
       
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { SystemStatus, BlocklistResponse, AccessLogResponse, CacheLogResponse, RawLogResponse, LogFilters } from '../types';
+import { SystemStatus, ServiceActionResponse, ServiceJob, BlocklistResponse, BlocklistQuery, AccessLogResponse, AccessLogStatsResponse, TrafficSeriesResponse, CacheLogResponse, RawLogResponse, LogFilters } from '../types';
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api/v1/squid';
 
@@ -10,13 +10,22 @@ const api = axios.create({
 
 export const systemApi = {
   getStatus: () => api.get<SystemStatus>('/status'),
-  startService: () => api.post('/service/start'),
-  stopService: () => api.post('/service/stop'),
-  restartService: () => api.post('/service/restart'),
+  startService: () => api.post<ServiceActionResponse>('/service/start'),
+  stopService: () => api.post<ServiceActionResponse>('/service/stop'),
+  restartService: () => api.post<ServiceActionResponse>('/service/restart'),
+  // Aguarda até `wait` segundos pela conclusão do job no servidor
+  getJob: (jobId: string, wait: number = 30) => api.get<ServiceJob>(`/jobs/${jobId}?wait=${wait}`),
 };
 
 export const blocklistApi = {
-  getBlocklist: () => api.get<BlocklistResponse>('/blocklist'),
+  getBlocklist: (query: BlocklistQuery = {}) => {
+    const params = new URLSearchParams();
+    if (query.limit) params.append('limit', query.limit.toString());
+    if (query.cursor) params.append('cursor', query.cursor);
+    if (query.search) params.append('search', query.search);
+    if (query.prefix) params.append('prefix', query.prefix);
+    return api.get<BlocklistResponse>(`/blocklist?${params.toString()}`);
+  },
   addUrl: (url: string) => api.post('/blocklist', { url }),
   removeUrl: (url: string) => api.delete('/blocklist', { data: { url } }),
   addBulkFromTxt: (file: File) => {
@@ -41,6 +50,20 @@ export const logsApi = {
     return api.get<AccessLogResponse>(`/logs/access?${params.toString()}`);
   },
 
+  // Estatísticas agregadas dos Logs de Acesso
+  getAccessStats: (window: { lines?: number; since?: string; until?: string } = {}) => {
+    const params = new URLSearchParams();
+    if (window.lines) params.append('lines', window.lines.toString());
+    if (window.since) params.append('since', window.since);
+    if (window.until) params.append('until', window.until);
+    return api.get<AccessLogStatsResponse>(`/logs/stats?${params.toString()}`);
+  },
+
+  // Requisições, taxa de acerto do cache e p50/p95/p99 da duração por minuto
+  getTrafficSeries: (minutes: number = 60) => {
+    return api.get<TrafficSeriesResponse>(`/traffic/series?minutes=${minutes}`);
+  },
+
   // Logs de Cache Parseados
   getCacheLogs: (filters: LogFilters = {}) => {
     const params = new URLSearchParams();
@@ -55,6 +78,11 @@ export const logsApi = {
     return api.get<RawLogResponse>(`/logs/raw/access?lines=${lines}`);
   },
 
+  // URL da transmissão (SSE) das linhas novas; `lines` inclui as últimas N antes
+  getStreamUrl: (type: 'access' | 'cache', lines: number = 0) => {
+    return `${API_BASE_URL}/logs/stream/${type}?lines=${lines}`;
+  },
+
   // Logs Brutos de Cache
   getRawCacheLogs: (lines: number = 100) => {
     return api.get<RawLogResponse>(`/logs/raw/cache?lines=${lines}`);
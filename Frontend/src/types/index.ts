@@ -8,8 +8,39 @@ export interface SystemStatus {
   overall_status: string;
 }
 
+export interface ServiceActionResponse {
+  status: 'success' | 'accepted';
+  message: string;
+  job_id: string;
+}
+
+export interface ServiceJob {
+  job_id: string;
+  kind: string;
+  status: 'pending' | 'running' | 'succeeded' | 'failed';
+  created_at: number;
+  started_at: number | null;
+  finished_at: number | null;
+  result: unknown;
+  error: string | null;
+}
+
 export interface BlocklistResponse {
   blocked_urls: string[];
+  total: number;
+  version: number;
+  // Presentes só nas consultas paginadas ou filtradas
+  matched?: number;
+  offset?: number;
+  next_cursor?: string | null;
+}
+
+// Parâmetros da listagem paginada da lista de bloqueio
+export interface BlocklistQuery {
+  limit?: number;
+  cursor?: string;
+  search?: string;
+  prefix?: string;
 }
 
 export interface ApiResponse<T> {
@@ -48,9 +79,59 @@ export interface AccessLogResponse {
     ip?: string;
     url?: string;
   };
+  cursor: string | null;
+  dropped?: number | null;
   logs: AccessLogEntry[];
 }
 
+export interface AccessLogStats {
+  total_requests: number;
+  unparsed_lines: number;
+  unique_ips: number;
+  unique_urls: number;
+  total_bytes: number;
+  avg_duration_ms: number;
+  success_count: number;
+  error_count: number;
+  status_codes: Record<string, number>;
+  result_codes: Record<string, number>;
+}
+
+export interface AccessLogStatsResponse {
+  status: string;
+  log_type: string;
+  window: {
+    from: number | null;
+    to: number | null;
+  };
+  stats: AccessLogStats;
+}
+
+// Percentis e taxa de acerto do cache derivados do access.log
+export interface DurationQuantiles {
+  mean?: number;
+  min?: number;
+  max?: number;
+  p50?: number;
+  p95?: number;
+  p99?: number;
+}
+
+export interface TrafficSeriesPoint {
+  minute?: number;
+  requests: number;
+  cache_hit_ratio: number | null;
+  byte_hit_ratio: number | null;
+  duration_ms: DurationQuantiles;
+}
+
+export interface TrafficSeriesResponse {
+  status: string;
+  minutes: number;
+  total: TrafficSeriesPoint;
+  points: TrafficSeriesPoint[];
+}
+
 // Tipos para Logs de Cache
 export interface CacheLogEntry {
   timestamp: string;
@@ -68,6 +149,8 @@ export interface CacheLogResponse {
     level?: string;
     message?: string;
   };
+  cursor: string | null;
+  dropped?: number | null;
   logs: CacheLogEntry[];
 }
 
@@ -77,6 +160,8 @@ export interface RawLogResponse {
   log_type: string;
   lines_requested: number;
   lines_returned: number;
+  cursor: string | null;
+  dropped?: number | null;
   raw_logs: string[];
 }
 